@@ -0,0 +1,100 @@
+import gc
+import glob
+import json
+import time
+import tracemalloc
+
+from models.records import ContributorSummary, RepoStatsRecord
+from models.schemas import GitHubRepoResponse
+
+# An org-sized batch: every sample payload repeated until there are this many repositories
+REPOSITORIES = 20000
+
+
+def dict_path(payloads):
+    """What the pipeline did before: per-repo dicts rebuilt element by element for the response"""
+    return [
+        (
+            {
+                "stars": p["stats"]["stars"], "forks": p["stats"]["forks"],
+                "open_issues": p["stats"]["open_issues"], "license": p["stats"]["license"]
+            },
+            {
+                "total_commits": p["commit_activity"]["total_commits"],
+                "last_30_days": p["commit_activity"]["last_30_days"],
+                "weekly_data": [
+                    {"week": week["week"], "commits": week["commits"]}
+                    for week in p["commit_activity"]["weekly_data"]
+                ]
+            },
+            {
+                "total_contributors": p["contributors"]["total_contributors"],
+                "active_contributors": p["contributors"]["active_contributors"],
+                "top_contributors": [dict(c) for c in p["contributors"]["top_contributors"]]
+            }
+        )
+        for p in payloads
+    ]
+
+
+def record_path(payloads):
+    """As gather_inputs and _build_response do now: stats and contributors as records, the series as cached"""
+    results = []
+    for p in payloads:
+        stats = RepoStatsRecord(**p["stats"])
+        contributors = ContributorSummary.from_dict(p["contributors"])
+        results.append((stats.to_dict(), p["commit_activity"], contributors.to_dict()))
+    return results
+
+
+def validate(sections):
+    """The Pydantic edge both paths end in"""
+    return [
+        GitHubRepoResponse(
+            owner="acme", repo="widget", stats=stats, languages={"languages": {}},
+            commit_activity=commit_activity, contributors=contributors,
+            links={"repo_url": "", "owner_url": ""}, ai_insights=AI_INSIGHTS
+        ).model_dump()
+        for stats, commit_activity, contributors in sections
+    ]
+
+
+AI_INSIGHTS = {
+    name: {"content": "", "generated_at": ""}
+    for name in ("repository_summary", "language_analysis", "contribution_patterns")
+}
+
+
+def measure(label, func, *args):
+    # Timed without tracemalloc, which slows allocation-heavy code several fold
+    gc.collect()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    result = func(*args)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<24} {elapsed * 1000:9.1f} ms  retained {retained / 1e6:8.1f} MB  peak {peak / 1e6:8.1f} MB")
+    return result
+
+
+def main():
+    samples = [json.load(open(path)) for path in sorted(glob.glob("test_response_*.json"))]
+    # Give every sample a full year of weeks so the series are realistically sized
+    for sample in samples:
+        weeks = sample["commit_activity"]["weekly_data"]
+        while weeks and len(weeks) < 52:
+            weeks.extend(dict(week) for week in weeks[:52 - len(weeks)])
+    payloads = [samples[i % len(samples)] for i in range(REPOSITORIES)]
+    points = sum(len(p["commit_activity"]["weekly_data"]) for p in payloads)
+    print(f"{REPOSITORIES:,} repositories, {points:,} weekly points")
+
+    sections = measure("dicts", dict_path, payloads)
+    measure("records", record_path, payloads)
+    measure("Pydantic response", validate, sections)
+
+
+if __name__ == "__main__":
+    main()
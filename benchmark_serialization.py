@@ -0,0 +1,66 @@
+import glob
+import gzip
+import json
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+
+from models.schemas import GitHubRepoResponse
+from utils.compression import brotli, compress
+from utils.serialization import dumps, orjson
+
+ITERATIONS = 2000
+
+
+def default_path(payload: dict) -> bytes:
+    """What FastAPI does for response_model routes: build, re-validate, encode, json.dumps"""
+    model = GitHubRepoResponse(**payload)
+    revalidated = GitHubRepoResponse.model_validate(model.model_dump())
+    return json.dumps(
+        jsonable_encoder(revalidated), ensure_ascii=False, allow_nan=False,
+        indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def fast_path(payload: dict) -> bytes:
+    """The analyze route now: validate once, dump, encode with orjson"""
+    return dumps(GitHubRepoResponse(**payload).model_dump())
+
+
+def bench(label: str, func, payload) -> float:
+    number = ITERATIONS // len(payload) if isinstance(payload, list) else ITERATIONS
+    seconds = timeit.timeit(lambda: func(payload), number=number)
+    per_call_us = seconds / number * 1_000_000
+    print(f"  {label:<28} {per_call_us:9.1f} us/op")
+    return per_call_us
+
+
+def main():
+    print(f"orjson: {'yes' if orjson else 'no (stdlib fallback)'}, brotli: {'yes' if brotli else 'no'}")
+    payloads = {path: json.load(open(path)) for path in sorted(glob.glob("test_response_*.json"))}
+    # A batch-style response: the sample payloads repeated, as org listings would be
+    batch = list(payloads.values()) * 17
+    payloads[f"batch of {len(batch)}"] = batch
+
+    for name, payload in payloads.items():
+        print(f"\n{name}")
+        if isinstance(payload, list):
+            slow = bench("default (per item)", lambda items: [default_path(p) for p in items], payload)
+            fast = bench("fast (per item)", lambda items: [fast_path(p) for p in items], payload)
+            body = dumps(payload)
+        else:
+            slow = bench("default path", default_path, payload)
+            fast = bench("fast path", fast_path, payload)
+            body = fast_path(payload)
+        bench("stdlib json.dumps only", lambda p: json.dumps(p).encode(), payload)
+        bench("orjson/fast dumps only", dumps, payload)
+        print(f"  speedup                      {slow / fast:9.2f}x")
+
+        sizes = [f"raw {len(body):,} B", f"gzip {len(gzip.compress(body, 6)):,} B"]
+        if brotli is not None:
+            sizes.append(f"br {len(compress(body, 'br')):,} B")
+        print("  bytes: " + ", ".join(sizes))
+
+
+if __name__ == "__main__":
+    main()
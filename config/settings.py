@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,9 +8,132 @@ class Settings:
     # GitHub API
     GITHUB_API_BASE_URL = "https://api.github.com"
     GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")  # Optional: for higher rate limits
+    README_MAX_BYTES = int(os.getenv("README_MAX_BYTES", "100000"))
+    README_CACHE_SIZE = int(os.getenv("README_CACHE_SIZE", "512"))
+    GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "10"))
+    
+    # Per-repo data context shared by /analyze and the sub-endpoints
+    REPO_CONTEXT_TTL = float(os.getenv("REPO_CONTEXT_TTL", "120"))
+    REPO_CONTEXT_MAX_ENTRIES = int(os.getenv("REPO_CONTEXT_MAX_ENTRIES", "1000"))
+    ANALYSIS_TTL = float(os.getenv("ANALYSIS_TTL", "900"))
+    NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "300"))
+    NEGATIVE_CACHE_MAX_ENTRIES = int(os.getenv("NEGATIVE_CACHE_MAX_ENTRIES", "10000"))
+    
+    # GitHub webhooks: precise invalidation allows long TTLs for hooked repos
+    GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
+    WEBHOOK_SECTION_TTL = float(os.getenv("WEBHOOK_SECTION_TTL", "21600"))
+    WEBHOOK_HOOKED_WINDOW = float(os.getenv("WEBHOOK_HOOKED_WINDOW", str(7 * 86400)))
+    
+    # Cross-process shared cache tier (multi-worker deployments)
+    SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")
+    SHARED_CACHE_MMAP_BYTES = int(os.getenv("SHARED_CACHE_MMAP_BYTES", str(256 * 1024 * 1024)))
+    SHARED_CACHE_L1_TTL = float(os.getenv("SHARED_CACHE_L1_TTL", "5"))
+    SHARED_LOCK_TIMEOUT = float(os.getenv("SHARED_LOCK_TIMEOUT", "60"))
+    
+    # Popularity-driven prefetch and cache warming
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "True").lower() == "true"
+    PREFETCH_HOT_COUNT = int(os.getenv("PREFETCH_HOT_COUNT", "20"))
+    PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "60"))
+    PREFETCH_LEAD_TIME = float(os.getenv("PREFETCH_LEAD_TIME", "120"))
+    PREFETCH_HALF_LIFE = float(os.getenv("PREFETCH_HALF_LIFE", "3600"))
+    PREFETCH_TRACKED_MAX = int(os.getenv("PREFETCH_TRACKED_MAX", "10000"))
+    PREFETCH_QUOTA_SHARE = float(os.getenv("PREFETCH_QUOTA_SHARE", "0.2"))
+    PREFETCH_SEED_REPOS = os.getenv("PREFETCH_SEED_REPOS", "")
     
     # AI API
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30"))
+    GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+    
+    # Resilience: circuit breakers and load shedding
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", "30"))
+    MAX_IN_FLIGHT_REQUESTS = int(os.getenv("MAX_IN_FLIGHT_REQUESTS", "64"))
+    LOAD_SHED_RETRY_AFTER = int(os.getenv("LOAD_SHED_RETRY_AFTER", "5"))
+    
+    # Adaptive (AIMD) concurrency limits per upstream host
+    GITHUB_CONCURRENCY_INITIAL = int(os.getenv("GITHUB_CONCURRENCY_INITIAL", "10"))
+    GITHUB_CONCURRENCY_MAX = int(os.getenv("GITHUB_CONCURRENCY_MAX", "100"))
+    GROQ_CONCURRENCY_INITIAL = int(os.getenv("GROQ_CONCURRENCY_INITIAL", "3"))
+    GROQ_CONCURRENCY_MAX = int(os.getenv("GROQ_CONCURRENCY_MAX", "20"))
+    CONCURRENCY_BACKOFF = float(os.getenv("CONCURRENCY_BACKOFF", "0.9"))
+    CONCURRENCY_LATENCY_TOLERANCE = float(os.getenv("CONCURRENCY_LATENCY_TOLERANCE", "2.0"))
+    # Share of queued upstream slots each priority lane gets while both are waiting
+    PRIORITY_INTERACTIVE_WEIGHT = float(os.getenv("PRIORITY_INTERACTIVE_WEIGHT", "8"))
+    PRIORITY_BACKGROUND_WEIGHT = float(os.getenv("PRIORITY_BACKGROUND_WEIGHT", "1"))
+    # Comma-separated X-API-Key values that identify a client; any other key is ignored
+    CLIENT_API_KEYS = frozenset(key.strip() for key in os.getenv("CLIENT_API_KEYS", "").split(",") if key.strip())
+    # Reverse proxies in front of the app (1 on Render); the client IP is read from X-Forwarded-For past them
+    TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+    
+    # Star/fork growth tracking
+    GROWTH_MAX_REPOS = int(os.getenv("GROWTH_MAX_REPOS", "50000"))
+    GROWTH_MAX_SAMPLES = int(os.getenv("GROWTH_MAX_SAMPLES", "168"))
+    GROWTH_MIN_INTERVAL = int(os.getenv("GROWTH_MIN_INTERVAL", "3600"))
+    GROWTH_TRENDING_WINDOW = int(os.getenv("GROWTH_TRENDING_WINDOW", str(7 * 86400)))
+    
+    # Persistent history (issues/PRs, commits) synced incrementally from GitHub
+    HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join(tempfile.gettempdir(), "github-analyzer-history.sqlite3"))
+    ISSUE_SYNC_MAX_PAGES = int(os.getenv("ISSUE_SYNC_MAX_PAGES", "10"))
+    ISSUE_ANALYTICS_TTL = float(os.getenv("ISSUE_ANALYTICS_TTL", "600"))
+    ISSUE_ANALYTICS_WINDOW_DAYS = int(os.getenv("ISSUE_ANALYTICS_WINDOW_DAYS", "90"))
+    STALE_PR_DAYS = int(os.getenv("STALE_PR_DAYS", "30"))
+    COMMIT_SYNC_MAX_PAGES = int(os.getenv("COMMIT_SYNC_MAX_PAGES", "10"))
+    COMMIT_HISTORY_WEEKS = int(os.getenv("COMMIT_HISTORY_WEEKS", "156"))
+    # Rows encoded per streamed chunk (Arrow record batch / Parquet row group) by /export
+    EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))
+    # README characters indexed per analysis by /search
+    SEARCH_README_CHARS = int(os.getenv("SEARCH_README_CHARS", "4000"))
+    
+    # Directory of local mirrors laid out as <owner>/<repo>[.git]; those repos are analyzed with git
+    LOCAL_REPOS_ROOT = os.getenv("LOCAL_REPOS_ROOT", "")
+    
+    # Repository structure from git trees (cached by commit SHA, bounded by total files held)
+    TREE_CACHE_MAX_FILES = int(os.getenv("TREE_CACHE_MAX_FILES", "2000000"))
+    STRUCTURE_TTL = float(os.getenv("STRUCTURE_TTL", "900"))
+    # Dependency manifests found in that tree; blobs are cached by content SHA
+    DEPENDENCY_MAX_MANIFESTS = int(os.getenv("DEPENDENCY_MAX_MANIFESTS", "25"))
+    DEPENDENCY_MANIFEST_MAX_BYTES = int(os.getenv("DEPENDENCY_MANIFEST_MAX_BYTES", "1000000"))
+    BLOB_CACHE_MAX_BYTES = int(os.getenv("BLOB_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    
+    # WebSocket live updates: one conditional-request poller per subscribed repository
+    LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "30"))
+    LIVE_MAX_SUBSCRIPTIONS = int(os.getenv("LIVE_MAX_SUBSCRIPTIONS", "50"))
+    # Repositories watched at once per worker, across all connections
+    LIVE_MAX_CHANNELS = int(os.getenv("LIVE_MAX_CHANNELS", "500"))
+    LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+    
+    # Reuse of a parent fork's (or README mirror's) AI insights
+    FORK_REUSE_MAX_AGE = float(os.getenv("FORK_REUSE_MAX_AGE", str(7 * 86400)))
+    README_REUSE_SIMILARITY = float(os.getenv("README_REUSE_SIMILARITY", "0.9"))
+    FORK_LANGUAGE_TOLERANCE = float(os.getenv("FORK_LANGUAGE_TOLERANCE", "1.0"))
+    README_INDEX_MAX_ENTRIES = int(os.getenv("README_INDEX_MAX_ENTRIES", "50000"))
+    # README characters shingled per signature; the head is enough to recognise a mirror
+    README_SIGNATURE_CHARS = int(os.getenv("README_SIGNATURE_CHARS", "20000"))
+    
+    # Response encoding
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+    BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+    
+    # Tracing: "jsonl" appends spans to TRACE_JSONL_PATH, "otlp" posts OTLP/JSON to a collector
+    TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "")
+    TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "traces.jsonl")
+    TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "1.0"))
+    TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "github-analyzer")
+    TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "2"))
+    # Whether an incoming traceparent's sampled flag is taken as is (set only behind a gateway that
+    # makes the sampling decision); otherwise it still has to pass TRACE_SAMPLE_RATIO
+    TRACE_TRUST_REMOTE_SAMPLING = os.getenv("TRACE_TRUST_REMOTE_SAMPLING", "false").lower() == "true"
+    
+    # Profiling: ?profile=1 / X-Profile needs X-Admin-Token to match ADMIN_TOKEN (unset disables it)
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "github-analyzer-profiles"))
+    PROFILE_MAX_ARTIFACTS = int(os.getenv("PROFILE_MAX_ARTIFACTS", "50"))
+    PROFILE_SAMPLING_ENABLED = os.getenv("PROFILE_SAMPLING_ENABLED", "False").lower() == "true"
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+    PROFILE_SLOW_PERCENTILE = float(os.getenv("PROFILE_SLOW_PERCENTILE", "99"))
     
     # App settings
     APP_NAME = "GitHub Repository Analyzer"
@@ -0,0 +1,17 @@
+import multiprocessing
+import os
+import tempfile
+
+# Multi-worker deployment: gunicorn supervises N uvicorn workers that share one cache tier.
+#   gunicorn main:app -c gunicorn.conf.py
+workers = int(os.environ.get("WEB_CONCURRENCY", min(4, multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Without a shared tier every worker would keep its own cold cache and multiply upstream traffic.
+# Workers are forked after this file runs, so they all inherit the same path.
+if workers > 1 and not os.environ.get("SHARED_CACHE_PATH"):
+    os.environ["SHARED_CACHE_PATH"] = os.path.join(tempfile.gettempdir(), "github-analyzer-cache.sqlite3")
@@ -1,16 +1,46 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers.github_routes import router as github_router
+from routers.github_routes import router as github_router, live_updates, prefetch_scheduler
+from routers.webhook_routes import router as webhook_router
+from routers.admin_routes import router as admin_router
 from config.settings import settings
+from services.concurrency import PriorityMiddleware
+from services.load_shedding import AdmissionControlMiddleware
+from services.profiling import ProfilingMiddleware
+from services.tracing import TracingMiddleware, tracer
+from utils.compression import CompressionMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm seed repos and keep hot analyses refreshed in the background
+    prefetch_scheduler.start()
+    yield
+    await prefetch_scheduler.stop()
+    await live_updates.stop()
+    tracer.flush()
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
-    description="A comprehensive GitHub repository analyzer with AI-powered insights"
+    description="A comprehensive GitHub repository analyzer with AI-powered insights",
+    lifespan=lifespan
 )
 
+# Compress large buffered responses (innermost, so shed 503s stay tiny)
+app.add_middleware(CompressionMiddleware)
+
+# Opt-in profiling wraps compression so encoding cost shows up in profiles
+app.add_middleware(ProfilingMiddleware)
+
+# Lane and client key for the upstream concurrency limiters' fair queues
+app.add_middleware(PriorityMiddleware)
+
+# Shed load before accepting work we cannot finish (added first so CORS wraps the 503s)
+app.add_middleware(AdmissionControlMiddleware)
+
 # Add CORS middleware for production
 app.add_middleware(
     CORSMiddleware,
@@ -20,8 +50,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so request spans include time spent queued behind the other middleware
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
 # Include routers
 app.include_router(github_router)
+app.include_router(webhook_router)
+app.include_router(admin_router)
 
 @app.get("/")
 async def root():
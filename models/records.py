@@ -0,0 +1,60 @@
+# Compact internal records for the analysis pipeline; converted to the Pydantic schemas only at the edge
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class RepoStatsRecord:
+    stars: int
+    forks: int
+    open_issues: int
+    license: Optional[str]
+
+    @classmethod
+    def from_repo_info(cls, repo_info: Dict[str, Any]) -> "RepoStatsRecord":
+        license_info = repo_info.get("license")
+        return cls(
+            stars=repo_info.get("stargazers_count", 0),
+            forks=repo_info.get("forks_count", 0),
+            open_issues=repo_info.get("open_issues_count", 0),
+            license=license_info.get("name") if license_info else None
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stars": self.stars, "forks": self.forks, "open_issues": self.open_issues, "license": self.license}
+
+
+@dataclass(frozen=True, slots=True)
+class ContributorRecord:
+    username: str
+    commits: int
+    avatar_url: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"username": self.username, "commits": self.commits, "avatar_url": self.avatar_url}
+
+
+@dataclass(frozen=True, slots=True)
+class ContributorSummary:
+    total_contributors: int
+    active_contributors: int
+    top_contributors: Tuple[ContributorRecord, ...]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ContributorSummary":
+        """From the contributors section shape (also the analysis response's)"""
+        return cls(
+            total_contributors=data.get("total_contributors", 0),
+            active_contributors=data.get("active_contributors", 0),
+            top_contributors=tuple(
+                ContributorRecord(c["username"], c["commits"], c["avatar_url"])
+                for c in data.get("top_contributors", [])
+            )
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_contributors": self.total_contributors,
+            "active_contributors": self.active_contributors,
+            "top_contributors": [contributor.to_dict() for contributor in self.top_contributors]
+        }
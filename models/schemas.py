@@ -1,10 +1,21 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+# GitHub naming rules: owners are alphanumeric/hyphen (max 39), repos add "." and "_" (max 100)
+OWNER_PATTERN = r"^[A-Za-z0-9][A-Za-z0-9-]{0,38}$"
+REPO_PATTERN = r"^[A-Za-z0-9._-]{1,100}$"
+
 class GitHubRepoRequest(BaseModel):
-    owner: str
-    repo: str
+    owner: str = Field(..., pattern=OWNER_PATTERN)
+    repo: str = Field(..., pattern=REPO_PATTERN)
+    
+    @field_validator("repo")
+    @classmethod
+    def repo_not_dot_path(cls, value: str) -> str:
+        if value in (".", ".."):
+            raise ValueError("Invalid repository name")
+        return value
 
 class RepoStats(BaseModel):
     stars: int
@@ -38,9 +49,30 @@ class RepoLinks(BaseModel):
     repo_url: str
     owner_url: str
 
+class ManifestSummary(BaseModel):
+    path: str
+    ecosystem: str
+    dependencies: int
+    dev_dependencies: int
+
+class Dependency(BaseModel):
+    name: str
+    version: str
+    ecosystem: str
+    dev: bool
+
+class DependencySummary(BaseModel):
+    manifests: List[ManifestSummary]
+    ecosystems: Dict[str, int]  # ecosystem: unique dependencies
+    total: int
+    dependencies: List[Dependency]
+    truncated: bool
+
 class AIInsightItem(BaseModel):
     content: str
     generated_at: str
+    source: str = "llm"  # llm, fallback, or reused
+    reused_from: Optional[str] = None
 
 class AIInsights(BaseModel):
     repository_summary: AIInsightItem
@@ -56,6 +88,7 @@ class GitHubRepoResponse(BaseModel):
     contributors: ContributorData
     links: RepoLinks
     ai_insights: AIInsights
+    dependencies: Optional[DependencySummary] = None
     
 class ErrorResponse(BaseModel):
     error: str
@@ -0,0 +1,40 @@
+import pstats
+from io import StringIO
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from config.settings import settings
+from services.profiling import admin_token_valid, profile_store
+
+async def require_admin(x_admin_token: str = Header(None)):
+    """Guard admin endpoints with the X-Admin-Token header"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin token not configured")
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+router = APIRouter(prefix="/api/v1/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/profiles")
+async def list_profiles():
+    """List stored profiles, newest first"""
+    return {"profiles": profile_store.list()}
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str, format: str = Query("raw", pattern="^(raw|text)$"),
+                           limit: int = Query(40, ge=1, le=500)):
+    """Download a profile artifact, or a cumulative-time summary of a pstats file with ?format=text"""
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if format == "text":
+        if not name.endswith(".pstats"):
+            raise HTTPException(status_code=400, detail="Text summaries are only available for pstats profiles")
+        output = StringIO()
+        pstats.Stats(path, stream=output).sort_stats("cumulative").print_stats(limit)
+        return PlainTextResponse(output.getvalue())
+    
+    media_type = "application/octet-stream" if name.endswith(".pstats") else "application/json"
+    return FileResponse(path, media_type=media_type, filename=name)
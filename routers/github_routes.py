@@ -1,14 +1,61 @@
-from fastapi import APIRouter, HTTPException
-from models.schemas import GitHubRepoRequest, GitHubRepoResponse, ErrorResponse
+import asyncio
+import re
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from models.schemas import GitHubRepoRequest, GitHubRepoResponse, ErrorResponse, OWNER_PATTERN, REPO_PATTERN
+from routers.admin_routes import require_admin
 from services.github_service import GitHubService
 from services.ai_service import AIService
-from datetime import datetime
-import asyncio
+from services.analyzer import RepositoryAnalyzer, RepositoryNotFoundError
+from services.circuit_breaker import CircuitOpenError, breakers
+from services.concurrency import limiters
+from services.dependency_analyzer import DependencyAnalyzer
+from services.exporter import DATASETS, MEDIA_TYPES, ExportFilters, ExportFormatUnavailableError, Exporter
+from services.commit_history import CommitHistory
+from services.growth_tracker import METRICS, GrowthTracker
+from services.history_store import create_history_store
+from services.insight_reuse import InsightReuse
+from services.issue_analytics import HistoryUnavailableError, IssueAnalytics
+from services.live_updates import LiveCapacityError, LiveUpdates, basic_stats
+from services.local_git_service import LocalSectionUnavailableError, create_local_git_service
+from services.prefetch import AccessTracker, PrefetchScheduler
+from services.repo_context import RepoContextStore
+from services.search import AnalysisSearch
+from services.shared_cache import create_shared_cache
+from services.tracing import tracer
+from services.tree_analyzer import TreeAnalyzer
+from utils.http_cache import cached_json_response
+from utils.serialization import FastJSONResponse, dumps, loads
+from datetime import datetime, timezone
 
 router = APIRouter(prefix="/api/v1", tags=["GitHub Analysis"])
 
 github_service = GitHubService()
 ai_service = AIService()
+repo_contexts = RepoContextStore(github_service, shared_cache=create_shared_cache())
+growth_tracker = GrowthTracker()
+
+def _record_growth(context, section, value):
+    """Sample star/fork/issue counts every time fresh repo info arrives"""
+    if section == "repo_info" and isinstance(value, dict):
+        growth_tracker.record(value)
+
+repo_contexts.listeners.append(_record_growth)
+
+insight_reuse = InsightReuse(repo_contexts)
+analyzer = RepositoryAnalyzer(repo_contexts, ai_service, insight_reuse)
+history_store = create_history_store()
+issue_analytics = IssueAnalytics(github_service, history_store, repo_contexts)
+commit_history = CommitHistory(github_service, history_store, repo_contexts)
+exporter = Exporter(history_store, growth_tracker, repo_contexts)
+analysis_search = AnalysisSearch(history_store, repo_contexts)
+# Wraps the fetchers registered above, so it must come last
+local_git_service = create_local_git_service(repo_contexts)
+tree_analyzer = TreeAnalyzer(github_service, local_git_service, repo_contexts)
+dependency_analyzer = DependencyAnalyzer(github_service, local_git_service, tree_analyzer, repo_contexts)
+live_updates = LiveUpdates(github_service, repo_contexts, local_git_service)
+access_tracker = AccessTracker()
+prefetch_scheduler = PrefetchScheduler(analyzer, github_service, access_tracker, ai_service)
 
 @router.get("/health")
 async def health_check():
@@ -16,142 +63,287 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "ai_available": ai_service.is_available()
+        "ai_available": ai_service.is_available(),
+        "circuits": {name: breaker.snapshot() for name, breaker in breakers.items()},
+        "concurrency": {host: limiter.snapshot() for host, limiter in limiters.items()},
+        "prefetch": prefetch_scheduler.snapshot(),
+        "live_updates": live_updates.snapshot()
     }
 
+def _upstream_unavailable(error: CircuitOpenError) -> HTTPException:
+    """503 telling the client when the tripped upstream will be probed again"""
+    return HTTPException(
+        status_code=503,
+        detail="Upstream service temporarily unavailable",
+        headers={"Retry-After": str(max(1, int(error.retry_after)))}
+    )
+
 @router.post("/analyze", response_model=GitHubRepoResponse)
 async def analyze_repository(request: GitHubRepoRequest):
     """Analyze a GitHub repository and return comprehensive data"""
     try:
-        # Fetch all GitHub data concurrently
-        repo_info_task = github_service.get_repo_info(request.owner, request.repo)
-        languages_task = github_service.get_repo_languages(request.owner, request.repo)
-        commits_task = github_service.get_commit_activity(request.owner, request.repo)
-        readme_task = github_service.get_repo_readme(request.owner, request.repo)
-        contributors_task = github_service.get_contributors(request.owner, request.repo)
-        
-        # Wait for all tasks to complete
-        repo_info, languages_raw, commit_data, readme_content, contributor_data = await asyncio.gather(
-            repo_info_task, languages_task, commits_task, readme_task, contributors_task,
-            return_exceptions=True
-        )
-        
-        # Handle errors
-        if isinstance(repo_info, Exception):
-            raise HTTPException(status_code=404, detail="Repository not found")
-        
-        # Process language data
-        if isinstance(languages_raw, Exception):
-            languages_raw = {}
-            
-        total_bytes = sum(languages_raw.values()) if languages_raw else 1
-        language_percentages = {
-            lang: round((bytes_count / total_bytes) * 100, 2)
-            for lang, bytes_count in languages_raw.items()
-        } if languages_raw else {"Unknown": 100.0}
-        
-        # Process commit data
-        if isinstance(commit_data, Exception):
-            commit_data = {
-                "total_commits": 0, 
-                "last_30_days": 0,
-                "weekly_data": []
-            }
-        
-        # Process contributor data
-        if isinstance(contributor_data, Exception):
-            contributor_data = {
-                "total_contributors": 0,
-                "active_contributors": 0,
-                "top_contributors": []
-            }
-        
-        # Process README
-        if isinstance(readme_content, Exception):
-            readme_content = "README not available"
-        
-        # Generate enhanced AI insights
-        ai_insights = await ai_service.generate_three_insights(
-            repo_info, readme_content, {"languages": language_percentages}, contributor_data
-        )
-        
-        # Build response with enhanced structure
-        response = GitHubRepoResponse(
-            owner=request.owner,
-            repo=request.repo,
-            stats={
-                "stars": repo_info.get("stargazers_count", 0),
-                "forks": repo_info.get("forks_count", 0),
-                "open_issues": repo_info.get("open_issues_count", 0),
-                "license": repo_info.get("license", {}).get("name") if repo_info.get("license") else None
-            },
-            languages={
-                "languages": language_percentages
-            },
-            commit_activity={
-                "total_commits": commit_data.get("total_commits", 0),
-                "last_30_days": commit_data.get("last_30_days", 0),
-                "weekly_data": [
-                    {"week": week["week"], "commits": week["commits"]}
-                    for week in commit_data.get("weekly_data", [])
-                ]
-            },
-            contributors={
-                "total_contributors": contributor_data.get("total_contributors", 0),
-                "active_contributors": contributor_data.get("active_contributors", 0),
-                "top_contributors": [
-                    {
-                        "username": contrib["username"],
-                        "commits": contrib["commits"],
-                        "avatar_url": contrib["avatar_url"]
-                    }
-                    for contrib in contributor_data.get("top_contributors", [])
-                ]
-            },
-            links={
-                "repo_url": repo_info.get("html_url", f"https://github.com/{request.owner}/{request.repo}"),
-                "owner_url": repo_info.get("owner", {}).get("html_url", f"https://github.com/{request.owner}")
-            },
-            ai_insights=ai_insights
-        )
-        
-        return response
-        
-    except HTTPException:
-        raise
+        with tracer.span("analyze_repository", owner=request.owner, repo=request.repo):
+            analysis = await analyzer.analyze(request.owner, request.repo)
+    except RepositoryNotFoundError:
+        raise HTTPException(status_code=404, detail="Repository not found")
+    except CircuitOpenError as e:
+        raise _upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    access_tracker.hit(request.owner, request.repo)
+    
+    # Validated once when built; returning a Response skips FastAPI's second validation pass
+    return FastJSONResponse(content=analysis)
+
+STREAM_EVENTS = {"delta": "insight.delta", "reset": "insight.reset", "done": "insight.done", "analysis": "done"}
+
+def _stream_frame(event: str, data: dict, fmt: str) -> bytes:
+    """Frame one event as Server-Sent Events or as a line of NDJSON"""
+    if fmt == "ndjson":
+        return dumps({"event": event, **data}) + b"\n"
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+@router.get("/repo/{owner}/{repo}/insights/stream")
+async def stream_insights(owner: str = Path(..., pattern=OWNER_PATTERN),
+                          repo: str = Path(..., pattern=REPO_PATTERN),
+                          format: str = Query("sse", pattern="^(sse|ndjson)$")):
+    """Stream AI insights token by token, finishing with the full analysis"""
+    analysis = analyzer.cached_analysis(owner, repo)
+    stream = None
+    try:
+        if analysis is None:
+            # A client already streaming this repository: replay its tokens and share the rest
+            stream = analyzer.insight_stream(owner, repo)
+        if analysis is None and stream is None and analyzer.analysis_in_flight(owner, repo):
+            # Someone is already generating it; join that rather than paying for a second run
+            analysis = await analyzer.analyze(owner, repo)
+        elif analysis is None and stream is None:
+            # GitHub errors surface here, before the response status is committed
+            inputs = await analyzer.gather_inputs(owner, repo)
+            stream = analyzer.stream_analysis(owner, repo, inputs)
+    except RepositoryNotFoundError:
+        raise HTTPException(status_code=404, detail="Repository not found")
+    except CircuitOpenError as e:
+        raise _upstream_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    access_tracker.hit(owner, repo)
+    
+    async def events():
+        if stream is None:
+            for name, insight in analysis["ai_insights"].items():
+                yield _stream_frame("insight.done", {"insight": name, "content": insight["content"]}, format)
+            yield _stream_frame("done", analysis, format)
+            return
+        async for event, name, payload in stream.subscribe():
+            if event == "analysis":
+                yield _stream_frame("done", payload, format)
+            else:
+                key = "delta" if event == "delta" else "content"
+                yield _stream_frame(STREAM_EVENTS[event], {"insight": name, key: payload}, format)
+    
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson" if format == "ndjson" else "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/repo/{owner}/{repo}/stats")
-async def get_basic_stats(owner: str, repo: str):
+async def get_basic_stats(request: Request, owner: str = Path(..., pattern=OWNER_PATTERN),
+                          repo: str = Path(..., pattern=REPO_PATTERN)):
     """Get basic repository statistics only"""
     try:
-        repo_info = await github_service.get_repo_info(owner, repo)
-        return {
-            "stars": repo_info.get("stargazers_count", 0),
-            "forks": repo_info.get("forks_count", 0),
-            "open_issues": repo_info.get("open_issues_count", 0),
-            "license": repo_info.get("license", {}).get("name") if repo_info.get("license") else None,
-            "created_at": repo_info.get("created_at"),
-            "updated_at": repo_info.get("updated_at")
-        }
+        repo_info = await repo_contexts.get(owner, repo, "repo_info")
+        stats = basic_stats(repo_info)
+    except CircuitOpenError as e:
+        raise _upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=404, detail="Repository not found")
+    access_tracker.hit(owner, repo)
+    return cached_json_response(request, stats, "stats")
 
 @router.get("/repo/{owner}/{repo}/contributors")
-async def get_contributors(owner: str, repo: str):
+async def get_contributors(request: Request, owner: str = Path(..., pattern=OWNER_PATTERN),
+                           repo: str = Path(..., pattern=REPO_PATTERN)):
     """Get repository contributor information"""
     try:
-        contributor_data = await github_service.get_contributors(owner, repo)
-        return contributor_data
+        await analyzer.ensure_exists(owner, repo)
+        contributor_data = await repo_contexts.get(owner, repo, "contributors")
+    except CircuitOpenError as e:
+        raise _upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=404, detail="Repository not found")
+    access_tracker.hit(owner, repo)
+    return cached_json_response(request, contributor_data, "contributors")
 
 @router.get("/repo/{owner}/{repo}/commits/activity")
-async def get_commit_activity(owner: str, repo: str):
+async def get_commit_activity(request: Request, owner: str = Path(..., pattern=OWNER_PATTERN),
+                              repo: str = Path(..., pattern=REPO_PATTERN)):
     """Get detailed commit activity with weekly breakdown"""
     try:
-        commit_data = await github_service.get_commit_activity(owner, repo)
-        return commit_data
+        await analyzer.ensure_exists(owner, repo)
+        commit_data = await repo_contexts.get(owner, repo, "commit_activity")
+    except CircuitOpenError as e:
+        raise _upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=404, detail="Repository not found")
+    access_tracker.hit(owner, repo)
+    return cached_json_response(request, commit_data, "commit_activity")
+
+@router.get("/repo/{owner}/{repo}/issues/analytics")
+async def get_issue_analytics(request: Request, owner: str = Path(..., pattern=OWNER_PATTERN),
+                              repo: str = Path(..., pattern=REPO_PATTERN)):
+    """Get issue and pull request throughput: response times, merge latency, open/close rates"""
+    try:
+        await analyzer.ensure_exists(owner, repo)
+        analytics = await repo_contexts.get(owner, repo, "issue_analytics")
+    except CircuitOpenError as e:
+        raise _upstream_unavailable(e)
+    except HistoryUnavailableError:
+        raise HTTPException(status_code=503, detail="History store unavailable")
+    except LocalSectionUnavailableError:
+        raise HTTPException(status_code=501, detail="Issue analytics need the GitHub API and are not available for local mirrors")
+    except Exception as e:
+        raise HTTPException(status_code=404, detail="Repository not found")
+    access_tracker.hit(owner, repo)
+    return cached_json_response(request, analytics, "issue_analytics")
+
+@router.get("/repo/{owner}/{repo}/structure")
+async def get_repo_structure(request: Request, owner: str = Path(..., pattern=OWNER_PATTERN),
+                             repo: str = Path(..., pattern=REPO_PATTERN)):
+    """Get repository layout: directory sizes, file types, test-to-source ratio, largest files"""
+    try:
+        await analyzer.ensure_exists(owner, repo)
+        structure = await repo_contexts.get(owner, repo, "structure")
+    except CircuitOpenError as e:
+        raise _upstream_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail="Repository not found")
+    access_tracker.hit(owner, repo)
+    return cached_json_response(request, structure, "structure")
+
+@router.get("/trending")
+async def get_trending(
+    limit: int = Query(20, ge=1, le=100),
+    metric: str = Query("stars", pattern="^(" + "|".join(METRICS) + ")$"),
+    window_hours: int = Query(None, ge=1, le=24 * 90)
+):
+    """Rank tracked repositories by growth velocity over a time window"""
+    window = window_hours * 3600 if window_hours else None
+    return {
+        "metric": metric,
+        "window_hours": (window or growth_tracker.window) // 3600,
+        "repositories": growth_tracker.trending(limit=limit, metric=metric, window=window)
+    }
+
+async def _live_subscription(subscriber, message) -> dict:
+    """Apply one subscribe/unsubscribe message; returns the reply to send"""
+    action, owner, repo = message.get("action"), message.get("owner"), message.get("repo")
+    if action not in ("subscribe", "unsubscribe"):
+        return {"type": "error", "detail": "action must be subscribe or unsubscribe"}
+    if not isinstance(owner, str) or not isinstance(repo, str) or not (
+            re.match(OWNER_PATTERN, owner) and re.match(REPO_PATTERN, repo)):
+        return {"type": "error", "detail": "Invalid owner or repo"}
+    full_name = f"{owner}/{repo}"
+    if action == "unsubscribe":
+        live_updates.unsubscribe(subscriber, owner, repo)
+        return {"type": "unsubscribed", "repo": full_name}
+    
+    if repo_contexts.key(owner, repo) not in subscriber.repos and len(subscriber.repos) >= live_updates.max_subscriptions:
+        return {"type": "error", "repo": full_name, "detail": "Too many subscriptions on this connection"}
+    try:
+        snapshot = await live_updates.subscribe(subscriber, owner, repo)
+    except RepositoryNotFoundError:
+        return {"type": "error", "repo": full_name, "detail": "Repository not found"}
+    except CircuitOpenError:
+        return {"type": "error", "repo": full_name, "detail": "Upstream service temporarily unavailable"}
+    except LiveCapacityError:
+        return {"type": "error", "repo": full_name, "detail": "Too many repositories are being watched; try again later"}
+    access_tracker.hit(owner, repo)
+    return snapshot
+
+@router.websocket("/live")
+async def live_updates_socket(websocket: WebSocket):
+    """Subscribe to repositories and receive a snapshot, then only what changes in stats, commits or contributors"""
+    await websocket.accept()
+    subscriber = live_updates.subscriber()
+    
+    async def send():
+        async for message in live_updates.messages(subscriber):
+            await websocket.send_text(dumps(message).decode())
+    
+    sender = asyncio.create_task(send())
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = loads(text)
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                subscriber.push({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            subscriber.push(await _live_subscription(subscriber, message))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        live_updates.close(subscriber)
+
+@router.get("/search")
+async def search_analyses(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    org: str = Query(None, pattern=OWNER_PATTERN),
+    language: str = Query(None, max_length=100)
+):
+    """Find already analyzed repositories by name, description, topics, language, README or AI insights"""
+    try:
+        results = await analysis_search.search(q, limit=limit, offset=offset, org=org, language=language)
+    except HistoryUnavailableError:
+        raise HTTPException(status_code=503, detail="History store unavailable")
+    if results is None:
+        raise HTTPException(status_code=400, detail="Query has no searchable terms")
+    return results
+
+EXPORT_EXTENSIONS = {"ndjson": "ndjson", "csv": "csv", "arrow": "arrows", "parquet": "parquet"}
+
+def _epoch(moment: datetime) -> float:
+    """Naive datetimes are taken as UTC"""
+    return (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).timestamp()
+
+@router.get("/export", dependencies=[Depends(require_admin)])
+async def export_data(
+    dataset: str = Query("analyses", pattern="^(" + "|".join(DATASETS) + ")$"),
+    format: str = Query("ndjson", pattern="^(" + "|".join(MEDIA_TYPES) + ")$"),
+    org: str = Query(None, pattern=OWNER_PATTERN),
+    language: str = Query(None, max_length=100),
+    since: datetime = Query(None),
+    until: datetime = Query(None)
+):
+    """Stream stored analyses, weekly commits, contributors or star histories as NDJSON, CSV, Arrow or Parquet
+
+    Admin only: stored analyses include local mirrors, whose links are server paths.
+
+    `commits` covers all commit history synced for each analyzed repository. `contributors` only
+    has each repository's top contributors as of its latest stored analysis, not their history.
+    """
+    filters = ExportFilters(
+        org=org, language=language,
+        since=_epoch(since) if since else None, until=_epoch(until) if until else None
+    )
+    try:
+        chunks = exporter.stream(dataset, format, filters)
+    except HistoryUnavailableError:
+        raise HTTPException(status_code=503, detail="History store unavailable")
+    except ExportFormatUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{EXPORT_EXTENSIONS[format]}"'}
+    )
@@ -0,0 +1,36 @@
+import json
+
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from config.settings import settings
+from routers.github_routes import history_store, repo_contexts
+from services.webhooks import WebhookProcessor, verify_signature
+
+router = APIRouter(prefix="/api/v1/webhooks", tags=["Webhooks"])
+
+# CommitHistory replaces the commit_activity fetcher whenever the history store is available
+webhook_processor = WebhookProcessor(repo_contexts, incremental_commits=history_store is not None)
+
+@router.post("/github")
+async def github_webhook(
+    request: Request,
+    x_github_event: str = Header(...),
+    x_hub_signature_256: str = Header(None)
+):
+    """Receive GitHub webhooks and invalidate only the cached sections they affect"""
+    if not settings.GITHUB_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook secret not configured")
+    
+    body = await request.body()
+    if not verify_signature(settings.GITHUB_WEBHOOK_SECRET, body, x_hub_signature_256):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    
+    if x_github_event == "ping":
+        return {"status": "pong"}
+    
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    
+    return await webhook_processor.handle(x_github_event, payload)
@@ -1,17 +1,25 @@
 import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
-from groq import Groq
+from typing import Dict, Any, AsyncIterator, Optional, Tuple
+from groq import AsyncGroq
 from config.settings import settings
+from models.records import ContributorSummary
+from services.circuit_breaker import CircuitOpenError, get_breaker
+from services.concurrency import get_limiter
+from services.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
 class AIService:
     def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        # Retries are handled here so the circuit breaker sees every failure
+        self.client = AsyncGroq(api_key=settings.GROQ_API_KEY, timeout=settings.GROQ_TIMEOUT, max_retries=0)
         self.model_name = "llama-3.1-8b-instant"
         self.max_retries = 3
+        self.breaker = get_breaker("groq")
+        self.limiter = get_limiter("api.groq.com")
         
     def is_available(self) -> bool:
         """Check if AI service is available"""
@@ -20,121 +28,228 @@ class AIService:
     async def _call_groq_api(self, prompt: str) -> str:
         """Make API call to Groq with retries and error handling"""
         for attempt in range(self.max_retries):
+            # Add delay between attempts to avoid rate limiting
+            if attempt > 0:
+                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+            
+            # Fail fast instead of retrying against a degraded upstream
+            probing = self.breaker.check()
             try:
-                # Add delay between attempts to avoid rate limiting
-                if attempt > 0:
-                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
-                
-                completion = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.7,
-                    max_tokens=1000,
-                    top_p=1,
-                    stream=False,
-                    stop=None
-                )
+                with tracer.span("ai.llm_call", kind="client", model=self.model_name, attempt=attempt + 1,
+                                 prompt_chars=len(prompt)) as span:
+                    async with self.limiter.acquire():
+                        completion = await self.client.chat.completions.create(
+                            **self._completion_params(prompt),
+                            stream=False
+                        )
+                    if getattr(completion, "usage", None) is not None:
+                        span.set_attribute("completion_tokens", completion.usage.completion_tokens)
                 
+                self.breaker.record_success()
                 return completion.choices[0].message.content
                 
             except Exception as e:
+                self.breaker.record_failure()
                 logger.warning(f"Groq API attempt {attempt + 1} failed: {str(e)}")
                 if attempt == self.max_retries - 1:
                     logger.error(f"All Groq API attempts failed: {str(e)}")
                     return f"AI service unavailable after retries"
+            finally:
+                if probing:
+                    # A cancelled call records nothing; without this the breaker would stay half-open forever
+                    self.breaker.release_probe()
                     
         return "AI service temporarily unavailable"
 
+    def _completion_params(self, prompt: str) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.7,
+            "max_tokens": 1000,
+            "top_p": 1,
+            "stop": None
+        }
+
+    async def _stream_groq_api(self, prompt: str) -> AsyncIterator[str]:
+        """Stream completion tokens from Groq as they are generated"""
+        # No retries once tokens may have reached the client; the caller falls back instead
+        probing = self.breaker.check()
+        try:
+            # Not made current: the consumer runs between tokens, and its spans are not children of this call
+            with tracer.span("ai.llm_call", kind="client", activate=False, model=self.model_name, stream=True,
+                             prompt_chars=len(prompt)) as span:
+                async with self.limiter.acquire() as sample:
+                    started = time.monotonic()
+                    stream = await self.client.chat.completions.create(
+                        **self._completion_params(prompt),
+                        stream=True
+                    )
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            if sample.latency is None:
+                                # A stream's length tracks the answer, not upstream load; time to first token does
+                                sample.latency = time.monotonic() - started
+                                span.add_event("first_token")
+                            yield chunk.choices[0].delta.content
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.warning(f"Groq streaming call failed: {str(e)}")
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            if probing:
+                # Consumers that stop early close the stream with GeneratorExit, which records nothing
+                self.breaker.release_probe()
+
+    async def stream_three_insights(self, repo_data: dict, readme_content: str, language_data: dict,
+                                    contributor_data: ContributorSummary,
+                                    reuse: dict = None) -> AsyncIterator[Tuple[str, str, str]]:
+        """Yield (event, insight, text) tuples: "delta" per token, "reset" on fallback, "done" per insight"""
+        reuse = reuse or {}
+        prompts = [
+            ("repository_summary", lambda: self._build_repository_summary_prompt(repo_data, readme_content)),
+            ("language_analysis", lambda: self._build_language_analysis_prompt(repo_data, language_data)),
+            ("contribution_patterns", lambda: self._build_contribution_patterns_prompt(repo_data, contributor_data)),
+        ]
+        
+        if not self.is_available() or self.breaker.state == self.breaker.OPEN:
+            fallback = await self.generate_three_insights(
+                repo_data, readme_content, language_data, contributor_data, reuse
+            )
+            for name, _ in prompts:
+                if name not in reuse:
+                    yield "reset", name, fallback[name]["content"]
+                yield "done", name, fallback[name]["content"]
+            return
+        
+        fallback = None
+        streamed = False
+        for name, build_prompt in prompts:
+            if name in reuse:
+                yield "done", name, reuse[name]["content"]
+                continue
+            if streamed:
+                # Same spacing as generate_three_insights to stay under the rate limit
+                await asyncio.sleep(1)
+            streamed = True
+            parts = []
+            try:
+                with tracer.span("ai.prompt_build", insight=name):
+                    prompt = build_prompt()
+                async for delta in self._stream_groq_api(prompt):
+                    parts.append(delta)
+                    yield "delta", name, delta
+                content = "".join(parts)
+            except Exception:
+                fallback = fallback or self._fallback_insights(repo_data, language_data, contributor_data)
+                content = fallback[name]["content"]
+                # Tell the client to replace whatever partial text it rendered
+                yield "reset", name, content
+            yield "done", name, content
+
     async def generate_three_insights(self, repo_data: dict, readme_content: str, 
-                                    language_data: dict, contributor_data: dict) -> dict:
-        """Generate three distinct AI insights as required"""
+                                    language_data: dict, contributor_data: ContributorSummary,
+                                    reuse: dict = None) -> dict:
+        """Generate three distinct AI insights as required, skipping any supplied in `reuse`"""
+        reuse = reuse or {}
         if not self.is_available():
             return {
-                "repository_summary": {
-                    "content": "AI service not configured. Please add GROQ_API_KEY to environment variables.",
-                    "generated_at": datetime.now().isoformat()
-                },
-                "language_analysis": {
-                    "content": "AI service not configured.",
-                    "generated_at": datetime.now().isoformat()
+                **{
+                    name: {
+                        "content": message,
+                        "generated_at": datetime.now().isoformat(),
+                        "source": "fallback"
+                    }
+                    for name, message in (
+                        ("repository_summary", "AI service not configured. Please add GROQ_API_KEY to environment variables."),
+                        ("language_analysis", "AI service not configured."),
+                        ("contribution_patterns", "AI service not configured.")
+                    )
                 },
-                "contribution_patterns": {
-                    "content": "AI service not configured.",
-                    "generated_at": datetime.now().isoformat()
-                }
+                **reuse
             }
         
+        if self.breaker.state == self.breaker.OPEN:
+            logger.info("Groq circuit open, serving heuristic insights")
+            return {**self._fallback_insights(repo_data, language_data, contributor_data), **reuse}
+        
+        generators = [
+            ("repository_summary", lambda: self._generate_repository_summary(repo_data, readme_content)),
+            ("language_analysis", lambda: self._generate_language_analysis(repo_data, language_data)),
+            ("contribution_patterns", lambda: self._generate_contribution_patterns(repo_data, contributor_data)),
+        ]
         try:
-            # Generate all three insights with delays to avoid rate limiting
-            logger.info("Generating repository summary...")
-            repository_summary = await self._generate_repository_summary(repo_data, readme_content)
-            
-            # Add delay between API calls
-            await asyncio.sleep(1)
-            
-            logger.info("Generating language analysis...")
-            language_analysis = await self._generate_language_analysis(repo_data, language_data)
-            
-            # Add delay between API calls
-            await asyncio.sleep(1)
-            
-            logger.info("Generating contribution patterns...")
-            contribution_patterns = await self._generate_contribution_patterns(repo_data, contributor_data)
-            
-            return {
-                "repository_summary": {
-                    "content": repository_summary,
-                    "generated_at": datetime.now().isoformat()
-                },
-                "language_analysis": {
-                    "content": language_analysis,
-                    "generated_at": datetime.now().isoformat()
-                },
-                "contribution_patterns": {
-                    "content": contribution_patterns,
-                    "generated_at": datetime.now().isoformat()
+            insights = {}
+            for name, generate in generators:
+                if name in reuse:
+                    insights[name] = reuse[name]
+                    continue
+                if any(generated not in reuse for generated in insights):
+                    # Add delay between API calls to avoid rate limiting
+                    await asyncio.sleep(1)
+                logger.info(f"Generating {name.replace('_', ' ')}...")
+                insights[name] = {
+                    "content": await generate(),
+                    "generated_at": datetime.now().isoformat(),
+                    "source": "llm"
                 }
-            }
+            return insights
+        except CircuitOpenError:
+            logger.info("Groq circuit opened mid-analysis, serving heuristic insights")
+            return {**self._fallback_insights(repo_data, language_data, contributor_data), **reuse}
         except Exception as e:
             logger.error(f"Error generating AI insights: {str(e)}")
-            # Return meaningful fallback responses based on actual data
-            repo_name = repo_data.get('name', 'Unknown repository')
-            repo_desc = repo_data.get('description', 'A GitHub repository')
-            primary_lang = repo_data.get('language', 'Unknown')
-            stars = repo_data.get('stargazers_count', 0)
-            
-            # Get primary language from language data
-            languages = language_data.get('languages', {})
-            if languages:
-                main_lang = max(languages.keys(), key=lambda k: languages[k])
-            else:
-                main_lang = primary_lang
-                
-            total_contrib = contributor_data.get('total_contributors', 0)
-            active_contrib = contributor_data.get('active_contributors', 0)
+            return {**self._fallback_insights(repo_data, language_data, contributor_data), **reuse}
+    
+    def _fallback_insights(self, repo_data: dict, language_data: dict, contributor_data: ContributorSummary) -> dict:
+        """Build meaningful fallback insights from the repository data alone"""
+        repo_name = repo_data.get('name', 'Unknown repository')
+        repo_desc = repo_data.get('description', 'A GitHub repository')
+        primary_lang = repo_data.get('language', 'Unknown')
+        stars = repo_data.get('stargazers_count', 0)
+        
+        # Get primary language from language data
+        languages = language_data.get('languages', {})
+        if languages:
+            main_lang = max(languages.keys(), key=lambda k: languages[k])
+        else:
+            main_lang = primary_lang
             
-            return {
-                "repository_summary": {
-                    "content": f"• Repository: {repo_name} - {repo_desc[:100] if repo_desc else 'GitHub repository'}\n• Stars: {stars:,} | Language: {main_lang}\n• This appears to be a {main_lang} project with development focus",
-                    "generated_at": datetime.now().isoformat()
-                },
-                "language_analysis": {
-                    "content": f"• Primary Language: {main_lang}\n• Technology Focus: {'Web development' if main_lang in ['JavaScript', 'TypeScript'] else 'Software development'}\n• Language composition indicates modern development practices",
-                    "generated_at": datetime.now().isoformat()
-                },
-                "contribution_patterns": {
-                    "content": f"• Total Contributors: {total_contrib}\n• Active Contributors: {active_contrib}\n• Project Scale: {'Large open-source' if total_contrib > 50 else 'Medium-scale' if total_contrib > 10 else 'Small/Personal'} project",
-                    "generated_at": datetime.now().isoformat()
-                }
+        total_contrib = contributor_data.total_contributors
+        active_contrib = contributor_data.active_contributors
+        
+        return {
+            "repository_summary": {
+                "content": f"• Repository: {repo_name} - {repo_desc[:100] if repo_desc else 'GitHub repository'}\n• Stars: {stars:,} | Language: {main_lang}\n• This appears to be a {main_lang} project with development focus",
+                "generated_at": datetime.now().isoformat(),
+                "source": "fallback"
+            },
+            "language_analysis": {
+                "content": f"• Primary Language: {main_lang}\n• Technology Focus: {'Web development' if main_lang in ['JavaScript', 'TypeScript'] else 'Software development'}\n• Language composition indicates modern development practices",
+                "generated_at": datetime.now().isoformat(),
+                "source": "fallback"
+            },
+            "contribution_patterns": {
+                "content": f"• Total Contributors: {total_contrib}\n• Active Contributors: {active_contrib}\n• Project Scale: {'Large open-source' if total_contrib > 50 else 'Medium-scale' if total_contrib > 10 else 'Small/Personal'} project",
+                "generated_at": datetime.now().isoformat(),
+                "source": "fallback"
             }
+        }
 
     async def _generate_repository_summary(self, repo_data: dict, readme_content: str) -> str:
         """Generate detailed repository summary with bullet points"""
+        with tracer.span("ai.prompt_build", insight="repository_summary"):
+            prompt = self._build_repository_summary_prompt(repo_data, readme_content)
+        return await self._call_groq_api(prompt)
+
+    def _build_repository_summary_prompt(self, repo_data: dict, readme_content: str) -> str:
         repo_name = repo_data.get('name', 'Unknown')
         description = repo_data.get('description', '')
         stars = repo_data.get('stargazers_count', 0)
@@ -160,41 +275,63 @@ Provide a comprehensive repository summary with the following bullet points:
 
 Keep each bullet point detailed but concise. Focus on technical aspects and project significance.
 """
-        
-        return await self._call_groq_api(prompt)
+        return prompt
 
     async def _generate_language_analysis(self, repo_data: dict, language_data: dict) -> str:
         """Generate detailed language and technology analysis with bullet points"""
+        with tracer.span("ai.prompt_build", insight="language_analysis"):
+            prompt = self._build_language_analysis_prompt(repo_data, language_data)
+        return await self._call_groq_api(prompt)
+
+    def _build_language_analysis_prompt(self, repo_data: dict, language_data: dict) -> str:
         languages = language_data.get('languages', {})
         primary_lang = repo_data.get('language', 'Unknown')
+        dependencies = self._format_dependencies(language_data.get('dependencies'))
         
         prompt = f"""
 Analyze the technology stack and programming languages used in this repository:
 
 Primary Language: {primary_lang}
 Language Breakdown: {dict(list(languages.items())[:10]) if languages else 'No data'}
+Declared Dependencies (from manifest files):
+{dependencies or 'No manifests found'}
 
 Provide a detailed technical analysis with the following bullet points:
 • Technology Stack Overview (what the language choices indicate)
 • Development Focus (web, mobile, backend, data science, etc.)
-• Architecture Implications (based on language mix)
+• Architecture Implications (based on language mix and the frameworks/libraries depended on)
 • Modern Development Practices (type safety, frameworks, etc.)
 • Ecosystem and Tooling (what this tech stack enables)
 
 Focus on technical insights about the project's technological approach and development philosophy.
-Keep each point informative and specific to the language composition.
+Keep each point informative and specific to the language composition and dependencies.
 """
-        
-        return await self._call_groq_api(prompt)
+        return prompt
 
-    async def _generate_contribution_patterns(self, repo_data: dict, contributor_data: dict) -> str:
+    @staticmethod
+    def _format_dependencies(summary: Optional[dict], per_ecosystem: int = 15) -> Optional[str]:
+        """One line per ecosystem naming its first runtime dependencies"""
+        if not summary or not summary.get('total'):
+            return None
+        lines = []
+        for ecosystem, count in summary['ecosystems'].items():
+            names = [d['name'] for d in summary['dependencies'] if d['ecosystem'] == ecosystem and not d['dev']]
+            lines.append(f"- {ecosystem} ({count} total): {', '.join(names[:per_ecosystem]) or 'dev/test only'}")
+        return "\n".join(lines)
+
+    async def _generate_contribution_patterns(self, repo_data: dict, contributor_data: ContributorSummary) -> str:
         """Generate detailed contribution and collaboration analysis with bullet points"""
-        total_contributors = contributor_data.get('total_contributors', 0)
-        active_contributors = contributor_data.get('active_contributors', 0)
-        top_contributors = contributor_data.get('top_contributors', [])
+        with tracer.span("ai.prompt_build", insight="contribution_patterns"):
+            prompt = self._build_contribution_patterns_prompt(repo_data, contributor_data)
+        return await self._call_groq_api(prompt)
+
+    def _build_contribution_patterns_prompt(self, repo_data: dict, contributor_data: ContributorSummary) -> str:
+        total_contributors = contributor_data.total_contributors
+        active_contributors = contributor_data.active_contributors
+        top_contributors = contributor_data.top_contributors
         
         # Calculate collaboration metrics
-        top_contrib_commits = sum([c.get('commits', 0) for c in top_contributors[:3]])
+        top_contrib_commits = sum(c.commits for c in top_contributors[:3])
         avg_commits_per_top = top_contrib_commits / 3 if len(top_contributors) >= 3 else 0
         
         prompt = f"""
@@ -216,5 +353,4 @@ Provide a detailed collaboration analysis with the following bullet points:
 Focus on insights about the development community, project governance, and collaboration dynamics.
 Make each point specific to the contribution data provided.
 """
-        
-        return await self._call_groq_api(prompt)
+        return prompt
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from models.records import ContributorSummary, RepoStatsRecord
+from models.schemas import GitHubRepoResponse
+from services.ai_service import AIService
+from services.circuit_breaker import CircuitOpenError
+from services.github_service import RepositoryNotFoundError
+from services.insight_reuse import InsightReuse
+from services.repo_context import SECTIONS, RepoContextStore
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+StreamEvent = Tuple[str, Optional[str], Any]
+
+
+class InsightStream:
+    """One streaming analysis run, replayed to and then shared with every client that joins it"""
+
+    def __init__(self):
+        self.events: List[StreamEvent] = []
+        self.error: Optional[BaseException] = None
+        self.finished = False
+        self._queues: Set["asyncio.Queue"] = set()
+
+    def publish(self, event: StreamEvent) -> None:
+        self.events.append(event)
+        for queue in self._queues:
+            queue.put_nowait(event)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.error = error
+        self.finished = True
+        for queue in self._queues:
+            queue.put_nowait(None)
+
+    async def subscribe(self) -> AsyncIterator[StreamEvent]:
+        """Every event so far, then the rest as they are produced"""
+        queue: "asyncio.Queue" = asyncio.Queue()
+        backlog = list(self.events)
+        if not self.finished:
+            self._queues.add(queue)
+        else:
+            queue.put_nowait(None)
+        try:
+            for event in backlog:
+                yield event
+            while (event := await queue.get()) is not None:
+                yield event
+            if self.error is not None:
+                raise self.error
+        finally:
+            self._queues.discard(queue)
+
+
+class RepositoryAnalyzer:
+    """Full analysis pipeline: GitHub fan-out, AI insights and response building"""
+
+    def __init__(self, contexts: RepoContextStore, ai_service: AIService, reuse: Optional[InsightReuse] = None):
+        self.contexts = contexts
+        self.ai_service = ai_service
+        # Finds a parent fork or README mirror whose insights can stand in for fresh LLM calls
+        self.reuse = reuse
+        # Analyses are cached (and single-flighted) as a section of the repo context
+        contexts.fetchers["analysis"] = self._build_analysis
+        # Streaming runs in flight by repo key, so later streams join rather than start their own
+        self._streams: Dict[str, InsightStream] = {}
+
+    async def analyze(self, owner: str, repo: str, refresh: bool = False) -> Dict[str, Any]:
+        """Return the analysis for a repository, computing it if not cached"""
+        return await self.contexts.get(owner, repo, "analysis", force=refresh)
+
+    async def ensure_exists(self, owner: str, repo: str) -> None:
+        """Confirm the repository exists before fanning out, unless it is already known"""
+        context = self.contexts.peek(owner, repo)
+        if context is None or context.repo_info is None:
+            # Cold repo: one request settles existence; typos and bots stop here (and get cached)
+            await self.contexts.get(owner, repo, "repo_info")
+
+    def cached_analysis(self, owner: str, repo: str) -> Optional[Dict[str, Any]]:
+        """Return the locally cached analysis if it is still fresh"""
+        context = self.contexts.peek(owner, repo)
+        if context is not None and self.contexts.is_fresh(context, "analysis"):
+            return context.analysis
+        return None
+
+    def analysis_in_flight(self, owner: str, repo: str) -> bool:
+        context = self.contexts.peek(owner, repo)
+        return context is not None and "analysis" in context.inflight
+
+    async def _build_analysis(self, owner: str, repo: str) -> Dict[str, Any]:
+        with tracer.span("analysis.build", owner=owner, repo=repo):
+            inputs = await self.gather_inputs(owner, repo)
+            reuse = await self.reusable_insights(owner, repo, inputs)
+            
+            # Generate enhanced AI insights
+            with tracer.span("ai.insights"):
+                ai_insights = await self.ai_service.generate_three_insights(
+                    inputs["repo_info"], inputs["readme"], self._language_data(inputs), inputs["contributors"], reuse
+                )
+            return self._build_response(owner, repo, inputs, ai_insights)
+
+    def insight_stream(self, owner: str, repo: str) -> Optional[InsightStream]:
+        """The streaming run in flight for a repository, if any"""
+        return self._streams.get(RepoContextStore.key(owner, repo))
+
+    def stream_analysis(self, owner: str, repo: str, inputs: Dict[str, Any]) -> InsightStream:
+        """Start streaming AI insights for a repository, or join the run already doing so"""
+        key = RepoContextStore.key(owner, repo)
+        stream = self._streams.get(key)
+        if stream is not None:
+            return stream
+        stream = self._streams[key] = InsightStream()
+        context = self.contexts.context(owner, repo)
+        joined = context.inflight.get("analysis")
+        task = asyncio.create_task(self._produce_stream(context, inputs, stream, joined))
+        if joined is None:
+            # Blocking /analyze calls arriving meanwhile join this run through the section's in-flight map
+            context.inflight["analysis"] = task
+        task.add_done_callback(lambda _: self._stream_done(context, key, task))
+        return stream
+
+    def _stream_done(self, context, key: str, task: "asyncio.Task") -> None:
+        self._streams.pop(key, None)
+        if not task.cancelled():
+            # Subscribers receive any failure through the stream; mark it retrieved
+            task.exception()
+        if context.inflight.get("analysis") is task:
+            context.inflight.pop("analysis")
+
+    async def _produce_stream(self, context, inputs: Dict[str, Any], stream: InsightStream,
+                              joined: Optional["asyncio.Task"]) -> Dict[str, Any]:
+        """Run the LLM stream once, publishing every event; returns the analysis"""
+        try:
+            if joined is not None:
+                # A blocking analysis started while this stream gathered its inputs
+                analysis = await asyncio.shield(joined)
+                for name, insight in analysis["ai_insights"].items():
+                    stream.publish(("done", name, insight["content"]))
+            else:
+                analysis = await self._stream_insights(context, inputs, stream)
+            stream.publish(("analysis", None, analysis))
+            stream.finish()
+            return analysis
+        except BaseException as e:
+            stream.finish(e)
+            raise
+
+    async def _stream_insights(self, context, inputs: Dict[str, Any], stream: InsightStream) -> Dict[str, Any]:
+        owner, repo = context.owner, context.repo
+        generation = context.generations.get("analysis", 0)
+        reuse = await self.reusable_insights(owner, repo, inputs)
+        ai_insights = {}
+        fallbacks = set()
+        async for event, name, text in self.ai_service.stream_three_insights(
+            inputs["repo_info"], inputs["readme"], self._language_data(inputs), inputs["contributors"], reuse
+        ):
+            if event == "reset":
+                fallbacks.add(name)
+            elif event == "done":
+                ai_insights[name] = reuse.get(name) or {
+                    "content": text,
+                    "generated_at": datetime.now().isoformat(),
+                    "source": "fallback" if name in fallbacks else "llm"
+                }
+            stream.publish((event, name, text))
+        
+        analysis = self._build_response(owner, repo, inputs, ai_insights)
+        # Same rule as the fetch path: an invalidation mid-stream keeps the result stale
+        if context.generations.get("analysis", 0) == generation:
+            await self.contexts.store(context, "analysis", analysis)
+        return analysis
+
+    async def reusable_insights(self, owner: str, repo: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Insights that a related repository's cached analysis already answers"""
+        if self.reuse is None:
+            return {}
+        try:
+            return await self.reuse.find(owner, repo, inputs)
+        except Exception as e:
+            # Reuse only saves LLM calls; never let it fail an analysis
+            logger.warning(f"Insight reuse lookup for {owner}/{repo} failed: {str(e)}")
+            return {}
+
+    async def gather_inputs(self, owner: str, repo: str) -> Dict[str, Any]:
+        """Fetch and normalise everything the analysis is built from"""
+        with tracer.span("analysis.fetch_sections"):
+            await self.ensure_exists(owner, repo)
+            
+            # Fetch all GitHub data concurrently through the shared repo context
+            sections = await self.contexts.get_many(owner, repo, (*SECTIONS, "dependencies"))
+        repo_info = sections["repo_info"]
+        languages_raw = sections["languages"]
+        commit_data = sections["commit_activity"]
+        readme_content = sections["readme"]
+        contributor_data = sections["contributors"]
+        dependencies = sections["dependencies"]
+        
+        # Handle errors
+        if isinstance(repo_info, (CircuitOpenError, RepositoryNotFoundError)):
+            raise repo_info
+        if isinstance(repo_info, Exception):
+            raise RepositoryNotFoundError(f"{owner}/{repo}")
+        
+        # Process language data
+        if isinstance(languages_raw, Exception):
+            languages_raw = {}
+            
+        total_bytes = sum(languages_raw.values()) if languages_raw else 1
+        language_percentages = {
+            lang: round((bytes_count / total_bytes) * 100, 2)
+            for lang, bytes_count in languages_raw.items()
+        } if languages_raw else {"Unknown": 100.0}
+        
+        # Process commit data
+        if isinstance(commit_data, Exception):
+            commit_data = {"total_commits": 0, "last_30_days": 0, "weekly_data": []}
+        
+        # Process contributor data
+        if isinstance(contributor_data, Exception):
+            contributor_data = {}
+        
+        # Process README
+        if isinstance(readme_content, Exception):
+            readme_content = "README not available"
+        
+        # Dependencies are optional: the analysis goes ahead without them
+        if isinstance(dependencies, Exception):
+            dependencies = None
+        
+        # Stats and contributors become small records for the prompts; the weekly series is
+        # only ever read by the response, so the cached section goes into it uncopied
+        return {
+            "repo_info": repo_info,
+            "stats": RepoStatsRecord.from_repo_info(repo_info),
+            "languages": language_percentages,
+            "commit_activity": commit_data,
+            "readme": readme_content,
+            "contributors": ContributorSummary.from_dict(contributor_data),
+            "dependencies": dependencies
+        }
+
+    @staticmethod
+    def _language_data(inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return {"languages": inputs["languages"], "dependencies": inputs["dependencies"]}
+
+    def _build_response(self, owner: str, repo: str, inputs: Dict[str, Any],
+                        ai_insights: Dict[str, Any]) -> Dict[str, Any]:
+        repo_info = inputs["repo_info"]
+        
+        # Build response with enhanced structure (validated once, here)
+        with tracer.span("analysis.build_response"):
+            response = GitHubRepoResponse(
+                owner=owner,
+                repo=repo,
+                stats=inputs["stats"].to_dict(),
+                languages={
+                    "languages": inputs["languages"]
+                },
+                commit_activity=inputs["commit_activity"],
+                contributors=inputs["contributors"].to_dict(),
+                links={
+                    "repo_url": repo_info.get("html_url", f"https://github.com/{owner}/{repo}"),
+                    "owner_url": repo_info.get("owner", {}).get("html_url", f"https://github.com/{owner}")
+                },
+                ai_insights=ai_insights,
+                dependencies=inputs["dependencies"]
+            )
+        
+            return response.model_dump()
@@ -0,0 +1,110 @@
+import logging
+import time
+from typing import Dict
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because its upstream is unhealthy"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for a single upstream dependency"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5,
+                 recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will let a probe request through"""
+        if self._state != self.OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed, reserving a probe slot when half-open"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return True
+        return False
+
+    def check(self) -> bool:
+        """Raise CircuitOpenError if the call is not allowed; True when the call holds a probe slot"""
+        probing = self.state == self.HALF_OPEN
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_after() or self.recovery_timeout)
+        return probing
+
+    def release_probe(self) -> None:
+        """Give back a probe slot whose call ended (cancelled, closed early) without recording an outcome"""
+        # After record_success/record_failure the breaker has left HALF_OPEN and there is nothing to give back
+        if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info(f"Circuit '{self.name}' closed after successful probe")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._half_open_calls = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning(f"Circuit '{self.name}' opened after {self._failures} failures")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._half_open_calls = 0
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "retry_after": round(self.retry_after(), 1)
+        }
+
+
+# One breaker per upstream, shared by every request in the process
+breakers: Dict[str, CircuitBreaker] = {
+    name: CircuitBreaker(
+        name,
+        failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout=settings.CIRCUIT_RECOVERY_TIMEOUT
+    )
+    for name in ("github_rest", "github_raw", "groq")
+}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    return breakers[name]
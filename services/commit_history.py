@@ -0,0 +1,132 @@
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+from services.github_service import GitHubService, RepositoryNotFoundError
+from services.history_store import HistoryStore
+from services.repo_context import RepoContextStore
+
+logger = logging.getLogger(__name__)
+
+# Epoch day 3 (1970-01-04) was a Sunday; GitHub's commit statistics weeks start on Sunday
+SUNDAY_OFFSET = 3
+
+
+def _day(timestamp: str) -> int:
+    return int(datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()) // 86400
+
+
+def _week_start(day: int) -> int:
+    return day - (day - SUNDAY_OFFSET) % 7
+
+
+class CommitHistory:
+    """Commit activity from persisted daily buckets, topped up with the commits added since the last head seen"""
+
+    def __init__(self, github_service: GitHubService, history: Optional[HistoryStore], contexts: RepoContextStore):
+        self.github_service = github_service
+        self.history = history
+        self.max_pages = settings.COMMIT_SYNC_MAX_PAGES
+        self.history_weeks = settings.COMMIT_HISTORY_WEEKS
+        if history is not None:
+            # Replaces the stateless 52-week fetch for the commit_activity section
+            contexts.fetchers["commit_activity"] = self.get_commit_activity
+
+    async def get_commit_activity(self, owner: str, repo: str) -> Dict[str, Any]:
+        """Same shape as GitHubService.get_commit_activity, derived from the local store"""
+        key = RepoContextStore.key(owner, repo)
+        try:
+            cursor, _ = await self.history.get_cursor(key, "commits")
+            if cursor is None or not await self._ingest_new(owner, repo, key, json.loads(cursor)):
+                if not await self._bootstrap(owner, repo, key):
+                    # GitHub is still computing the statistics (202); answer statelessly this time
+                    return await self.github_service.get_commit_activity(owner, repo)
+            return await self._summarize(key)
+        except RepositoryNotFoundError:
+            raise
+        except Exception as e:
+            logger.warning(f"Incremental commit sync for {key} failed, using a full fetch: {str(e)}")
+            return await self.github_service.get_commit_activity(owner, repo)
+
+    async def _bootstrap(self, owner: str, repo: str, key: str) -> bool:
+        """Seed daily buckets from the 52-week statistics and remember the current head commit"""
+        weeks = await self.github_service.get_commit_stats(owner, repo)
+        if weeks is None:
+            return False
+        head, _ = await self.github_service.get_commits_page(owner, repo, per_page=1)
+
+        counts = {}
+        for week in weeks:
+            for offset, commits in enumerate(week.get("days") or []):
+                if commits:
+                    counts[week["week"] // 86400 + offset] = commits
+        from_day = weeks[0]["week"] // 86400 if weeks else int(time.time() // 86400)
+        # A zero row marks where known history starts, so quiet early weeks still get reported
+        counts.setdefault(from_day, 0)
+        # Later syncs walk the commits reachable from the new head but not this one
+        cursor = {"sha": head[0]["sha"] if head else None}
+        await self.history.replace_commit_days(key, counts, from_day, json.dumps(cursor))
+        return True
+
+    async def _ingest_new(self, owner: str, repo: str, key: str, cursor: Dict[str, Any]) -> bool:
+        """Count commits added since the cursor's head; False if it must be rebuilt from the statistics"""
+        base = cursor.get("sha")
+        if not base:
+            # An empty repository at bootstrap, or a cursor from before heads were recorded
+            return False
+        head = await self.github_service.get_head_sha(owner, repo)
+        if head is None:
+            return False
+        if head == base:
+            return True
+        counts: Counter = Counter()
+        url = None
+        pages = 0
+        while True:
+            comparison, url = await self.github_service.get_compare_page(owner, repo, base, head, url=url)
+            # Unreachable after a force push, or history was rewritten under it: the old counts no longer hold
+            if comparison is None or comparison.get("status") != "ahead":
+                return False
+            pages += 1
+            # Merged branches bring older commits with them: walking the graph counts them, a date filter would not
+            for item in comparison.get("commits") or []:
+                counts[_day(item["commit"]["committer"]["date"])] += 1
+            if url is None:
+                break
+            if pages >= self.max_pages:
+                return False
+
+        await self.history.add_commit_days(key, dict(counts), json.dumps({"sha": head}))
+        return True
+
+    async def _summarize(self, key: str) -> Dict[str, Any]:
+        today = int(time.time() // 86400)
+        first_week = _week_start(today) - (self.history_weeks - 1) * 7
+        rows = await self.history.commit_days(key, first_week)
+
+        weekly: Dict[int, int] = {}
+        last_30_days = 0
+        for day, commits in rows:
+            week = _week_start(day)
+            weekly[week] = weekly.get(week, 0) + commits
+            if day > today - 30:
+                last_30_days += commits
+
+        # Zero-fill from the oldest week we actually hold; older history is unknown, not empty
+        start = min(weekly) if weekly else _week_start(today)
+        weekly_data = [
+            {
+                "week": datetime.fromtimestamp(week * 86400, tz=timezone.utc).strftime("%Y-%m-%d"),
+                "commits": weekly.get(week, 0)
+            }
+            for week in range(start, _week_start(today) + 1, 7)
+        ]
+        return {
+            "total_commits": sum(weekly.values()),
+            "last_30_days": last_30_days,
+            "weekly_data": weekly_data
+        }
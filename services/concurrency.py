@@ -0,0 +1,249 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Weight of each new sample in the smoothed baseline latency
+BASELINE_ALPHA = 0.05
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+LANE_WEIGHTS = {
+    INTERACTIVE: settings.PRIORITY_INTERACTIVE_WEIGHT,
+    BACKGROUND: settings.PRIORITY_BACKGROUND_WEIGHT,
+}
+
+# Set per request by PriorityMiddleware and per job by background tasks; tasks inherit them
+request_lane: ContextVar[str] = ContextVar("request_lane", default=INTERACTIVE)
+client_key: ContextVar[str] = ContextVar("client_key", default="anonymous")
+
+# Idle flows are forgotten once this many are being tracked
+MAX_TRACKED_FLOWS = 1024
+
+
+def set_priority(lane: str, key: str) -> None:
+    """Mark the current task (and tasks it spawns) as belonging to a lane and client"""
+    request_lane.set(lane)
+    client_key.set(key)
+
+
+class FairQueue:
+    """Weighted fair queue of waiters: lanes share by weight, clients within a lane equally"""
+
+    def __init__(self, weights: Dict[str, float] = None):
+        self.weights = weights or LANE_WEIGHTS
+        # Self-clocked fair queuing: virtual time is the finish tag of the last waiter served
+        self._virtual = 0.0
+        self._finish: Dict[Tuple[str, str], float] = {}
+        self._heap: List[Tuple[float, int, asyncio.Future, str]] = []
+        self._seq = itertools.count()
+
+    def __bool__(self) -> bool:
+        while self._heap and self._heap[0][2].done():
+            heapq.heappop(self._heap)
+        return bool(self._heap)
+
+    def push(self, waiter: asyncio.Future, lane: str, key: str) -> None:
+        flow = (lane, key)
+        # Each client is its own flow, so one client's backlog only delays that client
+        finish = max(self._virtual, self._finish.get(flow, 0.0)) + 1.0 / self.weights.get(lane, 1.0)
+        self._finish[flow] = finish
+        heapq.heappush(self._heap, (finish, next(self._seq), waiter, lane))
+
+    def pop(self) -> Optional[asyncio.Future]:
+        """Next live waiter in finish-tag order; cancelled waiters are skipped"""
+        while self._heap:
+            finish, _, waiter, _ = heapq.heappop(self._heap)
+            if waiter.done():
+                continue
+            self._virtual = finish
+            if len(self._finish) > MAX_TRACKED_FLOWS:
+                self._finish = {flow: tag for flow, tag in self._finish.items() if tag > self._virtual}
+            return waiter
+        return None
+
+    def queued_by_lane(self) -> Dict[str, int]:
+        counts = {lane: 0 for lane in self.weights}
+        for _, _, waiter, lane in self._heap:
+            if not waiter.done():
+                counts[lane] = counts.get(lane, 0) + 1
+        return counts
+
+
+class LimiterSample:
+    """Outcome of one limited call; callers flag upstream pushback or override the latency"""
+
+    __slots__ = ("dropped", "latency")
+
+    def __init__(self):
+        self.dropped = False
+        self.latency: Optional[float] = None
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for one upstream host, shared by every caller in the process"""
+
+    def __init__(self, name: str, initial: int, max_limit: int, min_limit: int = 1,
+                 backoff: float = None, tolerance: float = None):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff or settings.CONCURRENCY_BACKOFF
+        self.tolerance = tolerance or settings.CONCURRENCY_LATENCY_TOLERANCE
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._waiters = FairQueue()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[LimiterSample]:
+        """Hold one slot for the duration of an upstream call"""
+        await self._acquire()
+        sample = LimiterSample()
+        start = time.monotonic()
+        # Cancellation (or an abandoned stream) says nothing about the upstream: no sample
+        latency, dropped = None, False
+        try:
+            yield sample
+            latency = sample.latency if sample.latency is not None else time.monotonic() - start
+            dropped = sample.dropped
+        except Exception:
+            latency, dropped = time.monotonic() - start, True
+            raise
+        finally:
+            self._release(latency, dropped)
+
+    async def _acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.push(waiter, request_lane.get(), client_key.get())
+        # Only cancelled waiters may be ahead of us, in which case this grants the slot now
+        self._wake()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on
+                self.in_flight -= 1
+                self._wake()
+            raise
+
+    def _release(self, latency: Optional[float], dropped: bool) -> None:
+        self.in_flight -= 1
+        if latency is not None:
+            self._update(latency, dropped)
+        self._wake()
+
+    def _update(self, latency: float, dropped: bool) -> None:
+        # Additive increase while latency stays near its baseline; multiplicative decrease on
+        # upstream pushback (429/5xx/errors) or latency beyond tolerance x baseline
+        congested = dropped or (self.baseline is not None and latency > self.baseline * self.tolerance)
+        if not dropped:
+            self.baseline = latency if self.baseline is None else (
+                self.baseline + BASELINE_ALPHA * (latency - self.baseline)
+            )
+
+        if congested:
+            now = time.monotonic()
+            # One decrease per round trip, so a burst of failures is a single congestion signal
+            if now - self._last_decrease >= (self.baseline or 0.0):
+                self._last_decrease = now
+                self.decreases += 1
+                previous = self.limit
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                if int(previous) != int(self.limit):
+                    logger.info(f"Concurrency limit '{self.name}' lowered to {int(self.limit)}")
+        elif self.in_flight + 1 >= self.limit / 2:
+            # Only grow while the limit is actually being used
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    def _wake(self) -> None:
+        while self.in_flight < int(self.limit):
+            waiter = self._waiters.pop()
+            if waiter is None:
+                return
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": self._waiters.queued_by_lane(),
+            "baseline_ms": round(self.baseline * 1000, 1) if self.baseline is not None else None,
+            "decreases": self.decreases
+        }
+
+
+class PriorityMiddleware:
+    """Tag each HTTP request with its priority lane and client key for upstream scheduling"""
+
+    def __init__(self, app, api_keys: frozenset = None, proxy_hops: int = None):
+        self.app = app
+        self.api_keys = settings.CLIENT_API_KEYS if api_keys is None else api_keys
+        self.proxy_hops = settings.TRUSTED_PROXY_HOPS if proxy_hops is None else proxy_hops
+
+    def client_ip(self, scope, headers: Dict[bytes, bytes]) -> str:
+        """Peer address, or the address our own proxies recorded in X-Forwarded-For"""
+        client = scope.get("client")
+        peer = client[0] if client else "unknown"
+        if not self.proxy_hops:
+            return peer
+        forwarded = [hop.strip() for hop in headers.get(b"x-forwarded-for", b"").decode("latin-1").split(",")]
+        forwarded = [hop for hop in forwarded if hop]
+        # Each trusted proxy appends the address it saw; anything further left is client-supplied
+        if len(forwarded) >= self.proxy_hops:
+            return forwarded[-self.proxy_hops]
+        return forwarded[0] if forwarded else peer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        # Bulk clients and cron jobs can opt themselves out of the interactive lane
+        lane = BACKGROUND if headers.get(b"x-priority", b"").lower() == b"background" else INTERACTIVE
+        api_key = headers.get(b"x-api-key", b"").decode("latin-1")
+        # An unverified key would let one client spread its load over as many flows as it likes
+        key = f"key:{api_key}" if api_key in self.api_keys else f"ip:{self.client_ip(scope, headers)}"
+
+        lane_token = request_lane.set(lane)
+        key_token = client_key.set(key)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_lane.reset(lane_token)
+            client_key.reset(key_token)
+
+
+# One limiter per upstream host, shared by every request and background job in the process
+limiters: Dict[str, AdaptiveLimiter] = {
+    "api.github.com": AdaptiveLimiter(
+        "api.github.com",
+        initial=settings.GITHUB_CONCURRENCY_INITIAL,
+        max_limit=settings.GITHUB_CONCURRENCY_MAX
+    ),
+    "api.groq.com": AdaptiveLimiter(
+        "api.groq.com",
+        initial=settings.GROQ_CONCURRENCY_INITIAL,
+        max_limit=settings.GROQ_CONCURRENCY_MAX
+    ),
+}
+
+
+def get_limiter(host: str) -> AdaptiveLimiter:
+    return limiters[host]
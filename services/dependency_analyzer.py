@@ -0,0 +1,259 @@
+import asyncio
+import json
+import logging
+import re
+import tomllib
+import xml.etree.ElementTree as ElementTree
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from services.github_service import GitHubService
+from services.local_git_service import VENDORED_DIRS, LocalGitService
+from services.repo_context import RepoContextStore
+from services.tree_analyzer import CompactTree, TreeAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# (name, version spec, dev/test only)
+Dependency = Tuple[str, str, bool]
+
+# Kept in the response; the rest are only counted
+MAX_LISTED = 100
+
+# "requests[socks] >=2.0 ; python_version<'3.8'" -> ("requests", ">=2.0")
+REQUIREMENT = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*([^;#]*)")
+
+
+def _requirement(line: str, dev: bool = False) -> Optional[Dependency]:
+    match = REQUIREMENT.match(line)
+    if match is None:
+        return None
+    return match.group(1).lower(), match.group(2).strip(), dev
+
+
+def parse_package_json(content: bytes) -> List[Dependency]:
+    manifest = json.loads(content)
+    dependencies = []
+    for field, dev in (("dependencies", False), ("peerDependencies", False), ("devDependencies", True)):
+        for name, version in (manifest.get(field) or {}).items():
+            dependencies.append((name, str(version), dev))
+    return dependencies
+
+
+def parse_requirements(content: bytes) -> List[Dependency]:
+    dependencies = []
+    for line in content.decode("utf-8", errors="replace").splitlines():
+        line = line.strip()
+        # Options (-r, -e, --hash), comments and direct URLs carry no package name we can trust
+        if not line or line.startswith(("#", "-")) or "://" in line:
+            continue
+        dependency = _requirement(line)
+        if dependency:
+            dependencies.append(dependency)
+    return dependencies
+
+
+def parse_pyproject(content: bytes) -> List[Dependency]:
+    data = tomllib.loads(content.decode("utf-8", errors="replace"))
+    project = data.get("project") or {}
+    dependencies = [d for d in map(_requirement, project.get("dependencies") or []) if d]
+    for extras in (project.get("optional-dependencies") or {}).values():
+        dependencies.extend(d for d in (_requirement(line, dev=True) for line in extras) if d)
+
+    # Poetry keeps its own tables
+    poetry = (data.get("tool") or {}).get("poetry") or {}
+    groups = [(poetry.get("dependencies") or {}, False), (poetry.get("dev-dependencies") or {}, True)]
+    groups.extend(((group.get("dependencies") or {}), True) for group in (poetry.get("group") or {}).values())
+    for table, dev in groups:
+        for name, spec in table.items():
+            if name.lower() != "python":
+                version = spec.get("version", "") if isinstance(spec, dict) else str(spec)
+                dependencies.append((name.lower(), version, dev))
+    return dependencies
+
+
+def parse_go_mod(content: bytes) -> List[Dependency]:
+    dependencies = []
+    in_block = False
+    for line in content.decode("utf-8", errors="replace").splitlines():
+        line = line.strip()
+        if line.startswith("require ("):
+            in_block = True
+            continue
+        if in_block and line.startswith(")"):
+            in_block = False
+            continue
+        if line.startswith("require "):
+            line = line[len("require "):]
+        elif not in_block:
+            continue
+        parts = line.split()
+        if len(parts) >= 2 and not parts[0].startswith("//"):
+            # Indirect requirements are pulled in by other modules, not chosen by the project
+            dependencies.append((parts[0], parts[1], "// indirect" in line))
+    return dependencies
+
+
+def parse_cargo_toml(content: bytes) -> List[Dependency]:
+    data = tomllib.loads(content.decode("utf-8", errors="replace"))
+    dependencies = []
+    for table, dev in (("dependencies", False), ("dev-dependencies", True), ("build-dependencies", True)):
+        for name, spec in (data.get(table) or {}).items():
+            version = spec.get("version", "") if isinstance(spec, dict) else str(spec)
+            dependencies.append((name, version, dev))
+    return dependencies
+
+
+def parse_pom_xml(content: bytes) -> List[Dependency]:
+    root = ElementTree.fromstring(content)
+
+    def child(element: ElementTree.Element, name: str) -> Optional[ElementTree.Element]:
+        # Maven POMs are namespaced; match on the local tag name
+        return next((c for c in element if c.tag.rsplit("}", 1)[-1] == name), None)
+
+    def text(element: ElementTree.Element, name: str) -> str:
+        found = child(element, name)
+        return (found.text or "").strip() if found is not None else ""
+
+    dependencies = []
+    # Only the project's own <dependencies>, not <dependencyManagement> or plugin dependencies
+    block = child(root, "dependencies")
+    for dependency in (block if block is not None else []):
+        artifact = text(dependency, "artifactId")
+        if artifact:
+            name = f"{text(dependency, 'groupId')}:{artifact}"
+            dependencies.append((name, text(dependency, "version"), text(dependency, "scope") in ("test", "provided")))
+    return dependencies
+
+
+# Manifest file name -> (ecosystem, parser)
+MANIFEST_PARSERS: Dict[str, Tuple[str, Callable[[bytes], List[Dependency]]]] = {
+    "package.json": ("npm", parse_package_json),
+    "requirements.txt": ("pypi", parse_requirements),
+    "pyproject.toml": ("pypi", parse_pyproject),
+    "go.mod": ("go", parse_go_mod),
+    "Cargo.toml": ("cargo", parse_cargo_toml),
+    "pom.xml": ("maven", parse_pom_xml),
+}
+
+
+def find_manifests(tree: CompactTree, limit: int, max_bytes: int) -> Tuple[List[int], bool]:
+    """Indexes of manifest files, shallowest first, and whether any were left out"""
+    found = []
+    for index, name in enumerate(tree.names()):
+        if name in MANIFEST_PARSERS and tree.sizes[index] <= max_bytes:
+            directory = tree.dirs[tree.file_dir[index]]
+            if not any(f"/{d}" in f"/{directory}/" for d in VENDORED_DIRS):
+                found.append((directory.count("/") + bool(directory), directory, index))
+    found.sort()
+    return [index for _, _, index in found[:limit]], len(found) > limit
+
+
+class DependencyAnalyzer:
+    """Dependencies declared in manifest files at the default branch head, with blobs cached by SHA"""
+
+    def __init__(self, github_service: GitHubService, local: Optional[LocalGitService],
+                 trees: TreeAnalyzer, contexts: RepoContextStore):
+        self.github_service = github_service
+        self.local = local
+        self.trees = trees
+        self.max_manifests = settings.DEPENDENCY_MAX_MANIFESTS
+        self.max_manifest_bytes = settings.DEPENDENCY_MANIFEST_MAX_BYTES
+        self.max_cached_bytes = settings.BLOB_CACHE_MAX_BYTES
+        # Blob content never changes for a SHA, so an unchanged manifest is never fetched twice
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cached_bytes = 0
+        # Forks analysed together share manifests; fetch each blob once
+        self._inflight: Dict[str, "asyncio.Task"] = {}
+        contexts.fetchers["dependencies"] = self._build
+        contexts.ttls["dependencies"] = settings.STRUCTURE_TTL
+
+    async def _build(self, owner: str, repo: str) -> Dict[str, Any]:
+        tree = await self.trees.tree(owner, repo)
+        if tree is None:
+            return self._summarize([], False)
+        indexes, truncated = await asyncio.to_thread(
+            find_manifests, tree, self.max_manifests, self.max_manifest_bytes
+        )
+        manifests = await asyncio.gather(*(
+            self._parse(owner, repo, tree.path(index), tree.blob_sha(index)) for index in indexes
+        ))
+        return self._summarize([m for m in manifests if m is not None], truncated or tree.truncated)
+
+    async def _parse(self, owner: str, repo: str, path: str, sha: str) -> Optional[Dict[str, Any]]:
+        ecosystem, parser = MANIFEST_PARSERS[path.rpartition("/")[2]]
+        try:
+            content = await self._blob(owner, repo, sha)
+            dependencies = parser(content)
+        except Exception as e:
+            # One malformed manifest should not hide the others
+            logger.info(f"Skipping manifest {owner}/{repo}:{path}: {str(e)}")
+            return None
+        return {"path": path, "ecosystem": ecosystem, "dependencies": dependencies}
+
+    async def _blob(self, owner: str, repo: str, sha: str) -> bytes:
+        content = self._blobs.get(sha)
+        if content is not None:
+            self._blobs.move_to_end(sha)
+            return content
+        task = self._inflight.get(sha)
+        if task is None:
+            if self.local is not None and self.local.path_for(owner, repo) is not None:
+                load = self.local.get_blob(owner, repo, sha)
+            else:
+                load = self.github_service.get_blob(owner, repo, sha)
+            task = asyncio.ensure_future(load)
+            self._inflight[sha] = task
+            task.add_done_callback(lambda _: self._inflight.pop(sha, None))
+        # Shielded so one cancelled caller does not abort the fetch for the others
+        content = await asyncio.shield(task)
+        self._remember(sha, content)
+        return content
+
+    def _remember(self, sha: str, content: bytes) -> None:
+        if sha in self._blobs:
+            self._blobs.move_to_end(sha)
+            return
+        self._blobs[sha] = content
+        self._cached_bytes += len(content)
+        while self._cached_bytes > self.max_cached_bytes and len(self._blobs) > 1:
+            _, evicted = self._blobs.popitem(last=False)
+            self._cached_bytes -= len(evicted)
+
+    @staticmethod
+    def _summarize(manifests: List[Dict[str, Any]], truncated: bool) -> Dict[str, Any]:
+        unique: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for manifest in manifests:
+            for name, version, dev in manifest["dependencies"]:
+                key = (manifest["ecosystem"], name)
+                known = unique.get(key)
+                if known is None:
+                    unique[key] = {"name": name, "version": version, "ecosystem": manifest["ecosystem"], "dev": dev}
+                elif known["dev"] and not dev:
+                    # Runtime use anywhere in the repo wins over dev-only use elsewhere
+                    known.update(version=version, dev=False)
+
+        ecosystems: Dict[str, int] = {}
+        for ecosystem, _ in unique:
+            ecosystems[ecosystem] = ecosystems.get(ecosystem, 0) + 1
+        listed = sorted(unique.values(), key=lambda d: (d["dev"], d["ecosystem"], d["name"]))
+        return {
+            "manifests": [
+                {
+                    "path": manifest["path"],
+                    "ecosystem": manifest["ecosystem"],
+                    "dependencies": len([d for d in manifest["dependencies"] if not d[2]]),
+                    "dev_dependencies": len([d for d in manifest["dependencies"] if d[2]])
+                }
+                for manifest in manifests
+            ],
+            "ecosystems": ecosystems,
+            "total": len(unique),
+            "dependencies": listed[:MAX_LISTED],
+            "truncated": truncated
+        }
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"blobs": len(self._blobs), "bytes": self._cached_bytes}
+
@@ -0,0 +1,321 @@
+import asyncio
+import csv
+import io
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from config.settings import settings
+from services.commit_history import SUNDAY_OFFSET
+from services.growth_tracker import GrowthTracker
+from services.history_store import HistoryStore
+from services.issue_analytics import HistoryUnavailableError
+from services.repo_context import RepoContextStore
+from utils.serialization import dumps, loads
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Optional: only the Arrow and Parquet formats need it
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# Columns per dataset as (name, type); every format writes the same columns in this order.
+# Timestamps are epoch seconds in the rows and ISO 8601 (UTC) in the text formats.
+DATASETS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "analyses": (
+        ("repository", "string"), ("owner", "string"), ("language", "string"), ("stars", "int"),
+        ("forks", "int"), ("open_issues", "int"), ("license", "string"), ("total_commits", "int"),
+        ("last_30_days", "int"), ("total_contributors", "int"), ("active_contributors", "int"),
+        ("dependencies", "int"), ("analyzed_at", "timestamp")
+    ),
+    "commits": (("repository", "string"), ("week", "string"), ("commits", "int")),
+    "contributors": (
+        ("repository", "string"), ("username", "string"), ("commits", "int"), ("analyzed_at", "timestamp")
+    ),
+    "stars": (
+        ("repository", "string"), ("sampled_at", "timestamp"), ("stars", "int"), ("forks", "int"),
+        ("open_issues", "int")
+    ),
+}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Stored analyses read from SQLite per query
+PAGE_SIZE = 200
+
+
+class ExportFormatUnavailableError(Exception):
+    """The requested format needs an optional package that is not installed"""
+
+
+@dataclass(frozen=True, slots=True)
+class ExportFilters:
+    org: Optional[str] = None
+    language: Optional[str] = None
+    # Epoch seconds, since inclusive and until exclusive
+    since: Optional[float] = None
+    until: Optional[float] = None
+
+    def in_range(self, timestamp: float) -> bool:
+        return (self.since is None or timestamp >= self.since) and (self.until is None or timestamp < self.until)
+
+
+def primary_language(analysis: Dict[str, Any]) -> Optional[str]:
+    languages = (analysis.get("languages") or {}).get("languages") or {}
+    language = max(languages, key=languages.get, default=None)
+    return None if language == "Unknown" else language
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _week_start(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).date().isoformat()
+
+
+def _sunday(day: int) -> int:
+    """Epoch day of the Sunday starting the week that contains day"""
+    return day - (day - SUNDAY_OFFSET) % 7
+
+
+def _day_label(day: int) -> str:
+    return datetime.fromtimestamp(day * 86400, timezone.utc).date().isoformat()
+
+
+async def _batches(rows: AsyncIterator[Tuple], size: int) -> AsyncIterator[List[Tuple]]:
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def encode_ndjson(columns: Tuple[Tuple[str, str], ...], rows: AsyncIterator[Tuple],
+                        batch_rows: int) -> AsyncIterator[bytes]:
+    names = [name for name, _ in columns]
+    timestamps = [index for index, (_, kind) in enumerate(columns) if kind == "timestamp"]
+    async for batch in _batches(rows, batch_rows):
+        lines = []
+        for row in batch:
+            record = dict(zip(names, row))
+            for index in timestamps:
+                record[names[index]] = _iso(row[index])
+            lines.append(dumps(record))
+        yield b"\n".join(lines) + b"\n"
+
+
+async def encode_csv(columns: Tuple[Tuple[str, str], ...], rows: AsyncIterator[Tuple],
+                     batch_rows: int) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([name for name, _ in columns])
+    timestamps = [index for index, (_, kind) in enumerate(columns) if kind == "timestamp"]
+    async for batch in _batches(rows, batch_rows):
+        for row in batch:
+            if timestamps:
+                row = list(row)
+                for index in timestamps:
+                    row[index] = _iso(row[index])
+            writer.writerow(row)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever the Arrow writers wrote since the last drain"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_schema(columns: Tuple[Tuple[str, str], ...]) -> "pyarrow.Schema":
+    types = {"string": pyarrow.string(), "int": pyarrow.int64(), "timestamp": pyarrow.timestamp("s", tz="UTC")}
+    return pyarrow.schema([(name, types[kind]) for name, kind in columns])
+
+
+async def encode_arrow(columns: Tuple[Tuple[str, str], ...], rows: AsyncIterator[Tuple],
+                       batch_rows: int, parquet: bool = False) -> AsyncIterator[bytes]:
+    """Arrow IPC stream (one record batch per chunk) or Parquet (one row group per chunk)"""
+    schema = _arrow_schema(columns)
+    timestamps = {index for index, (_, kind) in enumerate(columns) if kind == "timestamp"}
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema) if parquet else pyarrow.ipc.new_stream(sink, schema)
+    try:
+        async for batch in _batches(rows, batch_rows):
+            arrays = [
+                [int(value) if value is not None else None for value in values] if index in timestamps else list(values)
+                for index, values in enumerate(zip(*batch))
+            ]
+            record_batch = pyarrow.RecordBatch.from_arrays(
+                [pyarrow.array(values, type=field.type) for values, field in zip(arrays, schema)], schema=schema
+            )
+            writer.write_batch(record_batch)
+            yield sink.drain()
+    finally:
+        # Writes the Parquet footer or the Arrow end-of-stream marker
+        writer.close()
+    yield sink.drain()
+
+
+class Exporter:
+    """Bulk export of stored analyses, weekly commits, contributors and star histories as streamed files"""
+
+    def __init__(self, history: Optional[HistoryStore], growth_tracker: GrowthTracker, contexts: RepoContextStore):
+        self.history = history
+        self.growth_tracker = growth_tracker
+        self.batch_rows = settings.EXPORT_BATCH_ROWS
+        self._pending: Set["asyncio.Task"] = set()
+        if history is not None:
+            contexts.listeners.append(self._archive)
+
+    def _archive(self, context, section, value) -> None:
+        """Persist every new analysis so exports cover more than what is still cached"""
+        if section != "analysis" or not isinstance(value, dict):
+            return
+        key = RepoContextStore.key(context.owner, context.repo)
+        task = asyncio.get_running_loop().create_task(self._save(key, value))
+        # Held until done so the write is not garbage collected mid-flight
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _save(self, key: str, analysis: Dict[str, Any]) -> None:
+        try:
+            await self.history.save_analysis(key, primary_language(analysis), time.time(), dumps(analysis))
+        except Exception as e:
+            logger.warning(f"Could not store analysis of {key} for export: {str(e)}")
+
+    def stream(self, dataset: str, fmt: str, filters: ExportFilters) -> AsyncIterator[bytes]:
+        """Encoded chunks of a dataset; raises before the first chunk if it cannot be produced"""
+        if (dataset != "stars" or filters.language is not None) and self.history is None:
+            raise HistoryUnavailableError(settings.HISTORY_DB_PATH)
+        if fmt in ("arrow", "parquet") and pyarrow is None:
+            raise ExportFormatUnavailableError(f"{fmt} export requires the pyarrow package")
+
+        columns = DATASETS[dataset]
+        if dataset == "stars":
+            rows = self._stars(filters)
+        elif dataset == "commits":
+            rows = self._commits(filters)
+        else:
+            rows = self._stored_rows(dataset, filters)
+        if fmt == "ndjson":
+            return encode_ndjson(columns, rows, self.batch_rows)
+        if fmt == "csv":
+            return encode_csv(columns, rows, self.batch_rows)
+        return encode_arrow(columns, rows, self.batch_rows, parquet=fmt == "parquet")
+
+    async def _analyses(self, filters: ExportFilters, ranged: bool = True) -> AsyncIterator[Tuple[float, Dict[str, Any]]]:
+        """(analyzed_at, analysis) of stored analyses, one page in memory at a time"""
+        after = ""
+        while True:
+            page = await self.history.analyses_page(
+                after, PAGE_SIZE, owner=filters.org, language=filters.language,
+                since=filters.since if ranged else None, until=filters.until if ranged else None
+            )
+            for _, analyzed_at, payload in page:
+                yield analyzed_at, loads(payload)
+            if len(page) < PAGE_SIZE:
+                return
+            after = page[-1][0]
+
+    async def _stored_rows(self, dataset: str, filters: ExportFilters) -> AsyncIterator[Tuple]:
+        async for analyzed_at, analysis in self._analyses(filters):
+            repository = f"{analysis['owner']}/{analysis['repo']}"
+            if dataset == "analyses":
+                stats = analysis.get("stats") or {}
+                activity = analysis.get("commit_activity") or {}
+                contributors = analysis.get("contributors") or {}
+                dependencies = analysis.get("dependencies")
+                yield (
+                    repository, analysis["owner"], primary_language(analysis), stats.get("stars"),
+                    stats.get("forks"), stats.get("open_issues"), stats.get("license"),
+                    activity.get("total_commits"), activity.get("last_30_days"),
+                    contributors.get("total_contributors"), contributors.get("active_contributors"),
+                    dependencies.get("total") if dependencies else None, analyzed_at
+                )
+            else:
+                for contributor in (analysis.get("contributors") or {}).get("top_contributors") or []:
+                    yield repository, contributor["username"], contributor["commits"], analyzed_at
+
+    async def _commits(self, filters: ExportFilters) -> AsyncIterator[Tuple]:
+        """Weekly commits of every analyzed repository from the stored daily counts, its full synced history"""
+        since = _week_start(filters.since) if filters.since is not None else None
+        until = _week_start(filters.until) if filters.until is not None else None
+        from_day = _sunday(int(filters.since // 86400)) if filters.since is not None else 0
+        this_week = _sunday(int(time.time() // 86400))
+        # Weekly series are filtered by week instead of by when the analysis ran
+        async for _, analysis in self._analyses(filters, ranged=False):
+            repository = f"{analysis['owner']}/{analysis['repo']}"
+            days = await self.history.commit_days(RepoContextStore.key(analysis["owner"], analysis["repo"]), from_day)
+            if days:
+                weekly: Dict[int, int] = {}
+                for day, commits in days:
+                    weekly[_sunday(day)] = weekly.get(_sunday(day), 0) + commits
+                # Zero-filled from the oldest week held, as in the commit_activity section
+                weeks = [(_day_label(week), weekly.get(week, 0)) for week in range(min(weekly), this_week + 1, 7)]
+            else:
+                # Never synced (a local mirror, or GitHub statistics still being computed): the analysis' own series
+                weeks = [
+                    (week["week"], week["commits"])
+                    for week in (analysis.get("commit_activity") or {}).get("weekly_data") or []
+                ]
+            for week, commits in weeks:
+                if (since is None or week >= since) and (until is None or week < until):
+                    yield repository, week, commits
+
+    async def _stars(self, filters: ExportFilters) -> AsyncIterator[Tuple]:
+        count = 0
+        async for series in self._tracked(filters):
+            for timestamp, stars, forks, open_issues in series.samples():
+                if filters.in_range(timestamp):
+                    yield series.full_name, timestamp, stars, forks, open_issues
+            count += 1
+            if count % PAGE_SIZE == 0:
+                # Decoding thousands of series is CPU work; let other requests in between
+                await asyncio.sleep(0)
+
+    async def _tracked(self, filters: ExportFilters) -> AsyncIterator[Any]:
+        if filters.language is not None:
+            # Language is only known for analyzed repositories
+            async for _, analysis in self._analyses(filters, ranged=False):
+                series = self.growth_tracker.series(f"{analysis['owner']}/{analysis['repo']}")
+                if series is not None:
+                    yield series
+            return
+        org = filters.org.lower() if filters.org is not None else None
+        for series in self.growth_tracker.all_series():
+            if org is None or series.full_name.partition("/")[0].lower() == org:
+                yield series
@@ -1,6 +1,27 @@
+import base64
 import httpx
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
 from config.settings import settings
+from services.circuit_breaker import get_breaker
+from services.concurrency import get_limiter
+from services.tracing import tracer
+
+class RepositoryNotFoundError(Exception):
+    """Raised when GitHub has no repository at owner/repo"""
+
+# Counts the GitHub requests made by the current task and the tasks it spawns, when set to a [count] list
+request_meter: ContextVar[Optional[List[int]]] = ContextVar("github_request_meter", default=None)
+
+def _meter_request() -> None:
+    meter = request_meter.get()
+    if meter is not None:
+        meter[0] += 1
+
+def is_degraded(value: Any) -> bool:
+    """True for the zero-filled stand-in a fetcher returns when GitHub could not be read"""
+    return isinstance(value, dict) and value.get("degraded") is True
 
 class GitHubService:
     def __init__(self):
@@ -13,37 +34,90 @@ class GitHubService:
         # Add GitHub token if available (for higher rate limits)
         if settings.GITHUB_TOKEN:
             self.headers["Authorization"] = f"token {settings.GITHUB_TOKEN}"
+        
+        # README ETag cache: "owner/repo" -> (etag, content)
+        self._readme_cache: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        
+        # Latest rate-limit headers seen from GitHub
+        self.rate_limit: Dict[str, int] = {}
+        
+        self.rest_breaker = get_breaker("github_rest")
+        self.raw_breaker = get_breaker("github_raw")
+        # REST and raw requests hit the same host, so they share one adaptive limit
+        self.limiter = get_limiter("api.github.com")
+    
+    def _client(self) -> httpx.AsyncClient:
+        """Create an HTTP client with bounded timeouts so a degraded GitHub cannot hang workers"""
+        return httpx.AsyncClient(timeout=httpx.Timeout(settings.GITHUB_TIMEOUT, connect=5.0))
+    
+    @staticmethod
+    def _is_upstream_failure(response: httpx.Response) -> bool:
+        """Server errors and exhausted rate limits count against the breaker; 404s do not"""
+        if response.status_code >= 500 or response.status_code == 429:
+            return True
+        return response.status_code == 403 and response.headers.get("x-ratelimit-remaining") == "0"
+    
+    async def _get(self, client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+        """GET through the GitHub REST circuit breaker"""
+        probing = self.rest_breaker.check()
+        try:
+            with tracer.span("github GET", kind="client", **{"http.url": url}) as span:
+                trace = tracer.httpx_trace(span)
+                if trace is not None:
+                    kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": trace}
+                async with self.limiter.acquire() as sample:
+                    _meter_request()
+                    try:
+                        response = await client.get(url, headers=kwargs.pop("headers", self.headers), **kwargs)
+                    except httpx.HTTPError:
+                        self.rest_breaker.record_failure()
+                        raise
+                    sample.dropped = self._is_upstream_failure(response)
+                span.set_attribute("http.status_code", response.status_code)
+            
+            if self._is_upstream_failure(response):
+                self.rest_breaker.record_failure()
+            else:
+                self.rest_breaker.record_success()
+        finally:
+            if probing:
+                # Cancelled while queued for the limiter, or failed outside httpx: no outcome was recorded
+                self.rest_breaker.release_probe()
+        self._track_rate_limit(response)
+        return response
+    
+    def _track_rate_limit(self, response: httpx.Response) -> None:
+        for header, key in (("x-ratelimit-limit", "limit"), ("x-ratelimit-remaining", "remaining"),
+                            ("x-ratelimit-reset", "reset")):
+            value = response.headers.get(header)
+            if value and value.isdigit():
+                self.rate_limit[key] = int(value)
     
     async def get_repo_info(self, owner: str, repo: str) -> Dict[str, Any]:
         """Get basic repository information"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/repos/{owner}/{repo}",
-                headers=self.headers
-            )
+        async with self._client() as client:
+            response = await self._get(client, f"{self.base_url}/repos/{owner}/{repo}")
+            if response.status_code == 404:
+                raise RepositoryNotFoundError(f"{owner}/{repo}")
             response.raise_for_status()
             return response.json()
     
     async def get_repo_languages(self, owner: str, repo: str) -> Dict[str, int]:
         """Get repository language breakdown"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/repos/{owner}/{repo}/languages",
-                headers=self.headers
-            )
+        async with self._client() as client:
+            response = await self._get(client, f"{self.base_url}/repos/{owner}/{repo}/languages")
             response.raise_for_status()
             return response.json()
     
     async def get_commit_activity(self, owner: str, repo: str) -> Dict[str, Any]:
         """Get repository commit activity with weekly breakdown"""
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             try:
                 from datetime import datetime, timedelta
                 
                 # Get commit activity stats (52 weeks)
-                stats_response = await client.get(
-                    f"{self.base_url}/repos/{owner}/{repo}/stats/commit_activity",
-                    headers=self.headers
+                stats_response = await self._get(
+                    client, f"{self.base_url}/repos/{owner}/{repo}/stats/commit_activity"
                 )
                 
                 weekly_data = []
@@ -67,9 +141,9 @@ class GitHubService:
                 
                 # Get recent commits for last 30 days count
                 since_date = (datetime.now() - timedelta(days=30)).isoformat()
-                recent_response = await client.get(
+                recent_response = await self._get(
+                    client,
                     f"{self.base_url}/repos/{owner}/{repo}/commits",
-                    headers=self.headers,
                     params={"since": since_date, "per_page": 100}
                 )
                 
@@ -77,44 +151,248 @@ class GitHubService:
                 if recent_response.status_code == 200:
                     recent_commits = len(recent_response.json())
                 
-                return {
+                activity = {
                     "total_commits": total_commits or 0,
                     "last_30_days": recent_commits,
                     "weekly_data": weekly_data[-52:]  # Last 52 weeks
                 }
+                # 204 is an empty repository; anything else (202 still computing, errors) is a stand-in
+                if stats_response.status_code not in (200, 204) or recent_response.status_code not in (200, 409):
+                    activity["degraded"] = True
+                return activity
                 
             except Exception:
                 return {
                     "total_commits": 0,
                     "last_30_days": 0,
-                    "weekly_data": []
+                    "weekly_data": [],
+                    "degraded": True
                 }
     
     async def get_repo_readme(self, owner: str, repo: str) -> str:
-        """Get repository README content"""
-        async with httpx.AsyncClient() as client:
+        """Get repository README content using the raw media type"""
+        async with self._client() as client:
             try:
-                response = await client.get(
-                    f"{self.base_url}/repos/{owner}/{repo}/readme",
-                    headers=self.headers
-                )
-                if response.status_code == 200:
-                    readme_data = response.json()
-                    # Get the actual content from download_url
-                    content_response = await client.get(readme_data["download_url"])
-                    if content_response.status_code == 200:
-                        return content_response.text
-                return "README not available"
+                probing = self.raw_breaker.state == self.raw_breaker.HALF_OPEN
+                if self.raw_breaker.allow_request():
+                    try:
+                        readme = await self._get_raw_readme(client, owner, repo)
+                    finally:
+                        if probing:
+                            self.raw_breaker.release_probe()
+                    if readme is not None:
+                        return readme
+                
+                # Raw media type not honoured (or its breaker is open): use the base64 content field
+                return await self._get_readme_from_json(client, owner, repo)
             except Exception:
                 return "README not available"
     
+    async def _get_raw_readme(self, client: httpx.AsyncClient, owner: str, repo: str) -> Optional[str]:
+        """Stream the README body directly; returns None when the JSON fallback is needed"""
+        cache_key = f"{owner}/{repo}"
+        cached = self._readme_cache.get(cache_key)
+        
+        headers = dict(self.headers)
+        headers["Accept"] = "application/vnd.github.raw"
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        
+        url = f"{self.base_url}/repos/{owner}/{repo}/readme"
+        try:
+            with tracer.span("github GET", kind="client", **{"http.url": url, "github.media_type": "raw"}) as span:
+                trace = tracer.httpx_trace(span)
+                async with self.limiter.acquire() as sample, client.stream(
+                    "GET",
+                    url,
+                    headers=headers,
+                    extensions={"trace": trace} if trace is not None else None
+                ) as response:
+                    _meter_request()
+                    span.set_attribute("http.status_code", response.status_code)
+                    if self._is_upstream_failure(response):
+                        sample.dropped = True
+                        self.raw_breaker.record_failure()
+                        return "README not available"
+                    self.raw_breaker.record_success()
+                
+                    if response.status_code == 304 and cached:
+                        self._readme_cache.move_to_end(cache_key)
+                        return cached[1]
+                
+                    if response.status_code == 404:
+                        return "README not available"
+                
+                    if response.status_code == 200 and "json" not in response.headers.get("content-type", ""):
+                        content = await self._read_capped(response, settings.README_MAX_BYTES)
+                        text = content.decode(response.encoding or "utf-8", errors="replace")
+                        self._store_readme(cache_key, response.headers.get("etag"), text)
+                        return text
+                    return None
+        except httpx.HTTPError:
+            self.raw_breaker.record_failure()
+            return "README not available"
+    
+    async def _get_readme_from_json(self, client: httpx.AsyncClient, owner: str, repo: str) -> str:
+        """Decode README content from the JSON metadata response"""
+        response = await self._get(client, f"{self.base_url}/repos/{owner}/{repo}/readme")
+        if response.status_code != 200:
+            return "README not available"
+        
+        readme_data = response.json()
+        if readme_data.get("encoding") != "base64" or not readme_data.get("content"):
+            return "README not available"
+        
+        content = base64.b64decode(readme_data["content"])[:settings.README_MAX_BYTES]
+        # Not cached: this ETag is for the JSON representation, never a match for the raw request
+        return content.decode("utf-8", errors="replace")
+    
+    @staticmethod
+    async def _read_capped(response: httpx.Response, max_bytes: int) -> bytes:
+        """Read a streamed response body, stopping once max_bytes have been received"""
+        chunks = []
+        received = 0
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            received += len(chunk)
+            if received >= max_bytes:
+                break
+        return b"".join(chunks)[:max_bytes]
+    
+    def _store_readme(self, cache_key: str, etag: Optional[str], text: str) -> None:
+        """Remember raw README content by ETag so unchanged READMEs come back as 304s"""
+        if not etag:
+            return
+        self._readme_cache[cache_key] = (etag, text)
+        self._readme_cache.move_to_end(cache_key)
+        while len(self._readme_cache) > settings.README_CACHE_SIZE:
+            self._readme_cache.popitem(last=False)
+    
+    async def get_issues_page(self, owner: str, repo: str, since: Optional[str] = None,
+                              url: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of issues and pull requests, least recently updated first, plus the next page URL"""
+        params = None if url else {
+            "state": "all", "sort": "updated", "direction": "asc", "per_page": 100,
+            **({"since": since} if since else {})
+        }
+        return await self._get_list_page(url or f"{self.base_url}/repos/{owner}/{repo}/issues", owner, repo, params)
+    
+    async def get_issue_comments_page(self, owner: str, repo: str, since: Optional[str] = None,
+                                      url: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of repository-wide issue/PR comments, least recently updated first"""
+        params = None if url else {
+            "sort": "updated", "direction": "asc", "per_page": 100,
+            **({"since": since} if since else {})
+        }
+        return await self._get_list_page(
+            url or f"{self.base_url}/repos/{owner}/{repo}/issues/comments", owner, repo, params
+        )
+    
+    async def get_commits_page(self, owner: str, repo: str, since: Optional[str] = None, url: Optional[str] = None,
+                               per_page: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of default-branch commits, newest first, optionally only those after `since`"""
+        params = None if url else {"per_page": per_page, **({"since": since} if since else {})}
+        return await self._get_list_page(url or f"{self.base_url}/repos/{owner}/{repo}/commits", owner, repo, params)
+
+    async def get_compare_page(self, owner: str, repo: str, base: str, head: str, url: Optional[str] = None
+                               ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """One page of the commits reachable from `head` but not `base`, oldest first; None if either is gone"""
+        async with self._client() as client:
+            response = await self._get(
+                client, url or f"{self.base_url}/repos/{owner}/{repo}/compare/{base}...{head}",
+                params=None if url else {"per_page": 100}
+            )
+            # 404 for a commit that was garbage-collected after a force push
+            if response.status_code in (404, 422):
+                return None, None
+            response.raise_for_status()
+            return response.json(), response.links.get("next", {}).get("url")
+
+    async def get_commit_stats(self, owner: str, repo: str) -> Optional[List[Dict[str, Any]]]:
+        """Last 52 weeks of commit counts with per-day breakdown; None while GitHub is still computing them"""
+        async with self._client() as client:
+            response = await self._get(client, f"{self.base_url}/repos/{owner}/{repo}/stats/commit_activity")
+            if response.status_code == 404:
+                raise RepositoryNotFoundError(f"{owner}/{repo}")
+            if response.status_code != 200:
+                return None
+            return response.json()
+    
+    async def get_head_sha(self, owner: str, repo: str) -> Optional[str]:
+        """SHA of the default branch head; None for an empty repository"""
+        async with self._client() as client:
+            response = await self._get(
+                client, f"{self.base_url}/repos/{owner}/{repo}/commits/HEAD",
+                # The sha media type returns just the 40 hex characters instead of the full commit
+                headers={**self.headers, "Accept": "application/vnd.github.sha"}
+            )
+            if response.status_code == 404:
+                raise RepositoryNotFoundError(f"{owner}/{repo}")
+            if response.status_code in (409, 422):
+                return None
+            response.raise_for_status()
+            return response.text.strip()
+    
+    async def get_tree(self, owner: str, repo: str, sha: str) -> Dict[str, Any]:
+        """Recursive git tree of a commit: {"sha", "tree": [{path, type, size, sha}, ...], "truncated"}"""
+        async with self._client() as client:
+            response = await self._get(
+                client, f"{self.base_url}/repos/{owner}/{repo}/git/trees/{sha}", params={"recursive": 1}
+            )
+            if response.status_code == 404:
+                raise RepositoryNotFoundError(f"{owner}/{repo}")
+            response.raise_for_status()
+            return response.json()
+    
+    async def get_blob(self, owner: str, repo: str, sha: str) -> bytes:
+        """Raw content of a git blob"""
+        async with self._client() as client:
+            response = await self._get(
+                client, f"{self.base_url}/repos/{owner}/{repo}/git/blobs/{sha}",
+                headers={**self.headers, "Accept": "application/vnd.github.raw"}
+            )
+            if response.status_code == 404:
+                raise RepositoryNotFoundError(f"{owner}/{repo}")
+            response.raise_for_status()
+            return response.content
+    
+    async def probe(self, owner: str, repo: str, resource: str, etag: Optional[str],
+                    params: Optional[Dict[str, Any]] = None) -> Tuple[bool, Optional[str], Any]:
+        """Conditional GET of /repos/{owner}/{repo}{resource}: (changed since etag, new etag, body if changed)"""
+        headers = {**self.headers, "If-None-Match": etag} if etag else self.headers
+        async with self._client() as client:
+            response = await self._get(
+                client, f"{self.base_url}/repos/{owner}/{repo}{resource}", headers=headers, params=params
+            )
+            if response.status_code == 404:
+                raise RepositoryNotFoundError(f"{owner}/{repo}")
+            # 304s do not count against the rate limit; 202/204/409 are statistics still being
+            # computed, no contributors and an empty repository, none of which has anything new
+            if response.status_code in (202, 204, 304, 409):
+                return False, etag, None
+            response.raise_for_status()
+            return True, response.headers.get("etag"), response.json()
+    
+    async def _get_list_page(self, url: str, owner: str, repo: str,
+                             params: Optional[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        async with self._client() as client:
+            response = await self._get(client, url, params=params)
+            if response.status_code == 404:
+                raise RepositoryNotFoundError(f"{owner}/{repo}")
+            if response.status_code == 409:
+                # Empty repository: no commits to list
+                return [], None
+            response.raise_for_status()
+            # Follow GitHub's Link header rather than building page numbers ourselves
+            return response.json(), response.links.get("next", {}).get("url")
+    
     async def get_contributors(self, owner: str, repo: str) -> Dict[str, Any]:
         """Get repository contributor statistics"""
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             try:
-                response = await client.get(
+                response = await self._get(
+                    client,
                     f"{self.base_url}/repos/{owner}/{repo}/contributors",
-                    headers=self.headers,
                     params={"per_page": 100}
                 )
                 
@@ -144,11 +422,15 @@ class GitHubService:
                 return {
                     "total_contributors": 0,
                     "active_contributors": 0,
-                    "top_contributors": []
+                    "top_contributors": [],
+                    # 204 means no contributors at all; other statuses are failures shown as zeros
+                    **({} if response.status_code == 204 else {"degraded": True})
                 }
             except Exception:
+                # Zero-filled stand-in for a failed fetch: never cached as if it were the answer
                 return {
                     "total_contributors": 0,
                     "active_contributors": 0,
-                    "top_contributors": []
+                    "top_contributors": [],
+                    "degraded": True
                 }
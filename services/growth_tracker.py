@@ -0,0 +1,227 @@
+import heapq
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+
+METRICS = ("stars", "forks", "open_issues")
+
+
+class RepoSeries:
+    """Append-only (timestamp, stars, forks, open_issues) series stored as delta-encoded arrays"""
+
+    __slots__ = ("repo_id", "full_name", "base", "last", "ts_deltas", "deltas", "anchor_index", "anchor")
+
+    def __init__(self, repo_id: int, full_name: str, timestamp: int, values: Tuple[int, int, int]):
+        self.repo_id = repo_id
+        self.full_name = full_name
+        # Absolute (timestamp, stars, forks, open_issues) of the oldest and newest samples
+        self.base = [timestamp, *values]
+        self.last = [timestamp, *values]
+        # Sample i+1 minus sample i; timestamps are unsigned seconds, counters signed
+        self.ts_deltas = array("I")
+        self.deltas = tuple(array("i") for _ in METRICS)
+        # Sample at the start of the tracker's trending window, advanced forward as time passes
+        self.anchor_index = 0
+        self.anchor = list(self.base)
+
+    def __len__(self) -> int:
+        return len(self.ts_deltas) + 1
+
+    def append(self, timestamp: int, values: Tuple[int, int, int], min_interval: int, max_samples: int) -> None:
+        if self.ts_deltas and timestamp - self.last[0] < min_interval:
+            # Too close to the previous sample: fold into it instead of growing the series
+            elapsed = timestamp - self.last[0]
+            self.ts_deltas[-1] += elapsed
+            for column, value, previous in zip(self.deltas, values, self.last[1:]):
+                column[-1] += value - previous
+        else:
+            self.ts_deltas.append(max(0, timestamp - self.last[0]))
+            for column, value, previous in zip(self.deltas, values, self.last[1:]):
+                column.append(value - previous)
+        self.last = [max(timestamp, self.last[0]), *values]
+        if self.anchor_index == len(self.ts_deltas):
+            self.anchor = list(self.last)
+
+        if len(self) > max_samples:
+            self._compact(len(self) - max_samples)
+
+    def _compact(self, drop: int) -> None:
+        """Fold the oldest samples into the base so memory stays bounded"""
+        self.base[0] += sum(self.ts_deltas[:drop])
+        del self.ts_deltas[:drop]
+        for index, column in enumerate(self.deltas, start=1):
+            self.base[index] += sum(column[:drop])
+            del column[:drop]
+        if self.anchor_index < drop:
+            self.anchor_index = 0
+            self.anchor = list(self.base)
+        else:
+            self.anchor_index -= drop
+
+    def value_at(self, timestamp: int) -> List[int]:
+        """Latest sample at or before timestamp (or the oldest sample), walking back from the end"""
+        current = list(self.last)
+        for i in range(len(self.ts_deltas) - 1, -1, -1):
+            if current[0] <= timestamp:
+                break
+            current[0] -= self.ts_deltas[i]
+            for index, column in enumerate(self.deltas, start=1):
+                current[index] -= column[i]
+        return current
+
+    def samples(self) -> List[Tuple[int, int, int, int]]:
+        """Decode the full series, oldest first"""
+        current = list(self.base)
+        decoded = [tuple(current)]
+        for i, ts_delta in enumerate(self.ts_deltas):
+            current[0] += ts_delta
+            for index, column in enumerate(self.deltas, start=1):
+                current[index] += column[i]
+            decoded.append(tuple(current))
+        return decoded
+
+    def advance_anchor(self, window_start: int) -> List[int]:
+        """Move the window anchor forward to the latest sample at or before window_start"""
+        while self.anchor_index < len(self.ts_deltas):
+            next_ts = self.anchor[0] + self.ts_deltas[self.anchor_index]
+            if next_ts > window_start:
+                break
+            self.anchor[0] = next_ts
+            for index, column in enumerate(self.deltas, start=1):
+                self.anchor[index] += column[self.anchor_index]
+            self.anchor_index += 1
+        return self.anchor
+
+    def growth(self, metric: str, window: int, now: int, start: Optional[List[int]] = None) -> Tuple[int, float]:
+        """Absolute growth and growth per day of a metric over the trailing window"""
+        index = METRICS.index(metric) + 1
+        if start is None:
+            start = self.value_at(now - window)
+        elapsed = self.last[0] - start[0]
+        if elapsed <= 0:
+            return 0, 0.0
+        gained = self.last[index] - start[index]
+        return gained, gained * 86400 / elapsed
+
+
+class GrowthTracker:
+    """Bounded in-memory store of repo growth series with an incrementally maintained top-k"""
+
+    def __init__(self, max_repos: int = None, max_samples: int = None,
+                 min_interval: int = None, window: int = None, top_k: int = 100):
+        self.max_repos = max_repos or settings.GROWTH_MAX_REPOS
+        self.max_samples = max_samples or settings.GROWTH_MAX_SAMPLES
+        self.min_interval = min_interval if min_interval is not None else settings.GROWTH_MIN_INTERVAL
+        self.window = window or settings.GROWTH_TRENDING_WINDOW
+        self.top_k = top_k
+
+        self._series: "OrderedDict[int, RepoSeries]" = OrderedDict()
+        self._ids_by_name: Dict[str, int] = {}
+        # Star velocity over the default window, updated on every append
+        self._velocity: Dict[int, float] = {}
+        self._top: List[Tuple[float, int]] = []
+        self._top_dirty = False
+        # When velocities were last recomputed for every series, not just the ones sampled since
+        self._refreshed_at = 0
+
+    def record(self, repo_info: Dict[str, Any], timestamp: Optional[int] = None) -> None:
+        """Append a sample from a GitHub repository payload"""
+        repo_id = repo_info.get("id")
+        full_name = repo_info.get("full_name")
+        if repo_id is None or not full_name:
+            return
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        values = (
+            repo_info.get("stargazers_count", 0) or 0,
+            repo_info.get("forks_count", 0) or 0,
+            repo_info.get("open_issues_count", 0) or 0
+        )
+
+        series = self._series.get(repo_id)
+        if series is None:
+            series = RepoSeries(repo_id, full_name, timestamp, values)
+            self._series[repo_id] = series
+            self._ids_by_name[full_name.lower()] = repo_id
+            self._evict()
+        else:
+            series.append(timestamp, values, self.min_interval, self.max_samples)
+            self._series.move_to_end(repo_id)
+        self._update_velocity(series, timestamp)
+
+    def series(self, full_name: str) -> Optional[RepoSeries]:
+        repo_id = self._ids_by_name.get(full_name.lower())
+        return self._series.get(repo_id) if repo_id is not None else None
+
+    def all_series(self) -> List[RepoSeries]:
+        """Every tracked series, least recently sampled first (a snapshot, safe to iterate across awaits)"""
+        return list(self._series.values())
+
+    def trending(self, limit: int = 20, metric: str = "stars", window: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Rank tracked repos by growth per day over the window"""
+        window = window or self.window
+        now = int(time.time())
+        if metric == "stars" and window == self.window and limit <= self.top_k:
+            self._refresh_velocities(now)
+            ranked_ids = [repo_id for _, repo_id in self._top_entries()[:limit]]
+        else:
+            # Non-default ranking: one bounded-heap pass over all series
+            ranked = heapq.nlargest(
+                limit,
+                ((s.growth(metric, window, now)[1], repo_id) for repo_id, s in self._series.items())
+            )
+            ranked_ids = [repo_id for _, repo_id in ranked]
+
+        results = []
+        for repo_id in ranked_ids:
+            series = self._series[repo_id]
+            gained, per_day = series.growth(metric, window, now)
+            results.append({
+                "repo": series.full_name,
+                "repo_id": repo_id,
+                "stars": series.last[1],
+                "forks": series.last[2],
+                "open_issues": series.last[3],
+                "growth": gained,
+                "growth_per_day": round(per_day, 2),
+                "samples": len(series)
+            })
+        return results
+
+    def _update_velocity(self, series: RepoSeries, now: int) -> None:
+        start = series.advance_anchor(now - self.window)
+        _, per_day = series.growth("stars", self.window, now, start=start)
+        previous = self._velocity.get(series.repo_id)
+        self._velocity[series.repo_id] = per_day
+        if self._top_dirty:
+            return
+        floor = self._top[-1][0] if len(self._top) >= self.top_k else float("-inf")
+        # Only changes that can reorder the cached top-k force a rebuild
+        if per_day >= floor or (previous is not None and previous >= floor):
+            self._top_dirty = True
+
+    def _refresh_velocities(self, now: int) -> None:
+        """Re-evaluate cached velocities against now, so repos that stopped being sampled decay out of the top"""
+        # Samples are folded at min_interval granularity, so refreshing more often changes nothing worth the pass
+        if now - self._refreshed_at < max(self.min_interval, 1):
+            return
+        self._refreshed_at = now
+        for series in self._series.values():
+            start = series.advance_anchor(now - self.window)
+            self._velocity[series.repo_id] = series.growth("stars", self.window, now, start=start)[1]
+        self._top_dirty = True
+
+    def _top_entries(self) -> List[Tuple[float, int]]:
+        if self._top_dirty:
+            self._top = heapq.nlargest(self.top_k, ((v, k) for k, v in self._velocity.items()))
+            self._top_dirty = False
+        return self._top
+
+    def _evict(self) -> None:
+        while len(self._series) > self.max_repos:
+            repo_id, series = self._series.popitem(last=False)
+            self._ids_by_name.pop(series.full_name.lower(), None)
+            if self._velocity.pop(repo_id, None) is not None:
+                self._top_dirty = True
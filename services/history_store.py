@@ -0,0 +1,305 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_cursors (
+    repo TEXT NOT NULL,
+    stream TEXT NOT NULL,
+    cursor TEXT,
+    complete INTEGER NOT NULL DEFAULT 0,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (repo, stream)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS issues (
+    repo TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    is_pr INTEGER NOT NULL,
+    open INTEGER NOT NULL,
+    author TEXT,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    closed_at INTEGER,
+    merged_at INTEGER,
+    first_response_at INTEGER,
+    PRIMARY KEY (repo, number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS commit_days (
+    repo TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    commits INTEGER NOT NULL,
+    PRIMARY KEY (repo, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS analyses (
+    repo TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    language TEXT,
+    analyzed_at REAL NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_owner ON analyses (owner, repo);
+CREATE VIRTUAL TABLE IF NOT EXISTS analysis_search USING fts5 (
+    repo UNINDEXED, name, description, topics, language, readme, insights,
+    tokenize = 'porter unicode61', prefix = '2 3'
+);
+"""
+
+# Indexed text of each analysis, with the bm25 weight of a match in that column
+SEARCH_COLUMNS = (("name", 10.0), ("description", 5.0), ("topics", 6.0), ("language", 3.0),
+                  ("readme", 1.0), ("insights", 2.0))
+
+# Column order used by upsert_issues records
+ISSUE_COLUMNS = ("number", "is_pr", "open", "author", "created_at", "updated_at", "closed_at", "merged_at")
+
+
+class HistoryStore:
+    """Persistent per-repo history (issues, daily commit counts, latest analyses and their search index, sync cursors) in a local SQLite file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, as in the shared cache
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    # Synchronous primitives (run in a worker thread by the async wrappers below)
+
+    def get_cursor_sync(self, repo: str, stream: str) -> Tuple[Optional[str], bool]:
+        """Return (cursor, complete) for a sync stream; (None, False) before the first sync"""
+        row = self._connect().execute(
+            "SELECT cursor, complete FROM sync_cursors WHERE repo = ? AND stream = ?", (repo, stream)
+        ).fetchone()
+        return (row[0], bool(row[1])) if row else (None, False)
+
+    def set_cursor_sync(self, repo: str, stream: str, cursor: Optional[str], complete: bool) -> None:
+        self._set_cursor(self._connect(), repo, stream, cursor, complete)
+
+    @staticmethod
+    def _set_cursor(connection: sqlite3.Connection, repo: str, stream: str, cursor: Optional[str],
+                    complete: bool) -> None:
+        connection.execute(
+            "INSERT OR REPLACE INTO sync_cursors (repo, stream, cursor, complete, synced_at) VALUES (?, ?, ?, ?, ?)",
+            (repo, stream, cursor, int(complete), time.time())
+        )
+
+    def upsert_issues_sync(self, repo: str, records: Iterable[Tuple]) -> None:
+        """Insert or refresh issue records, keeping any first response already recorded"""
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                """
+                INSERT INTO issues (repo, number, is_pr, open, author, created_at, updated_at, closed_at, merged_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(repo, number) DO UPDATE SET
+                    is_pr = excluded.is_pr, open = excluded.open, author = excluded.author,
+                    updated_at = excluded.updated_at, closed_at = excluded.closed_at, merged_at = excluded.merged_at
+                """,
+                [(repo, *record) for record in records]
+            )
+
+    def record_responses_sync(self, repo: str, responses: Iterable[Tuple[int, str, int]]) -> None:
+        """Apply (issue number, commenter, created_at) comments as first responses where earlier"""
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                """
+                UPDATE issues SET first_response_at = ?3
+                WHERE repo = ?4 AND number = ?1 AND (author IS NULL OR author != ?2)
+                  AND (first_response_at IS NULL OR first_response_at > ?3)
+                """,
+                [(number, commenter, created_at, repo) for number, commenter, created_at in responses]
+            )
+
+    def replace_commit_days_sync(self, repo: str, counts: Dict[int, int], from_day: int, cursor: str) -> None:
+        """Overwrite daily commit counts from from_day onwards and move the cursor, atomically"""
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM commit_days WHERE repo = ? AND day >= ?", (repo, from_day))
+            connection.executemany(
+                "INSERT INTO commit_days (repo, day, commits) VALUES (?, ?, ?)",
+                [(repo, day, commits) for day, commits in counts.items()]
+            )
+            self._set_cursor(connection, repo, "commits", cursor, True)
+
+    def add_commit_days_sync(self, repo: str, counts: Dict[int, int], cursor: str) -> None:
+        """Add newly seen commits to their days and move the cursor in the same transaction"""
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                """
+                INSERT INTO commit_days (repo, day, commits) VALUES (?, ?, ?)
+                ON CONFLICT(repo, day) DO UPDATE SET commits = commits + excluded.commits
+                """,
+                [(repo, day, commits) for day, commits in counts.items()]
+            )
+            self._set_cursor(connection, repo, "commits", cursor, True)
+
+    def commit_days_sync(self, repo: str, from_day: int) -> List[Tuple[int, int]]:
+        return self._connect().execute(
+            "SELECT day, commits FROM commit_days WHERE repo = ? AND day >= ? ORDER BY day", (repo, from_day)
+        ).fetchall()
+
+    def issue_window_sync(self, repo: str, since: int, stale_before: int) -> Dict[str, Any]:
+        """Counts and raw latencies for items active since `since` (epoch seconds)"""
+        connection = self._connect()
+        counts = connection.execute(
+            """
+            SELECT
+                COALESCE(SUM(is_pr = 0 AND created_at >= ?2), 0),
+                COALESCE(SUM(is_pr = 1 AND created_at >= ?2), 0),
+                COALESCE(SUM(is_pr = 0 AND closed_at >= ?2), 0),
+                COALESCE(SUM(is_pr = 1 AND closed_at >= ?2 AND merged_at IS NULL), 0),
+                COALESCE(SUM(is_pr = 1 AND merged_at >= ?2), 0),
+                COALESCE(SUM(is_pr = 0 AND open = 1), 0),
+                COALESCE(SUM(is_pr = 1 AND open = 1), 0),
+                COALESCE(SUM(is_pr = 1 AND open = 1 AND updated_at < ?3), 0),
+                COALESCE(SUM(open = 1 AND created_at >= ?2 AND first_response_at IS NULL), 0),
+                COUNT(*)
+            FROM issues WHERE repo = ?1
+            """,
+            (repo, since, stale_before)
+        ).fetchone()
+        first_responses = [row[0] for row in connection.execute(
+            "SELECT first_response_at - created_at FROM issues"
+            " WHERE repo = ? AND created_at >= ? AND first_response_at IS NOT NULL",
+            (repo, since)
+        )]
+        merge_latencies = [row[0] for row in connection.execute(
+            "SELECT merged_at - created_at FROM issues WHERE repo = ? AND is_pr = 1 AND merged_at >= ?",
+            (repo, since)
+        )]
+        keys = ("issues_opened", "prs_opened", "issues_closed", "prs_closed_unmerged", "prs_merged",
+                "open_issues", "open_prs", "stale_prs", "awaiting_response", "tracked")
+        return {**dict(zip(keys, counts)), "first_responses": first_responses, "merge_latencies": merge_latencies}
+
+    def save_analysis_sync(self, repo: str, language: Optional[str], analyzed_at: float, payload: bytes) -> None:
+        """Keep the latest analysis of a repository (JSON payload) for bulk export"""
+        self._connect().execute(
+            "INSERT OR REPLACE INTO analyses (repo, owner, language, analyzed_at, payload) VALUES (?, ?, ?, ?, ?)",
+            (repo, repo.partition("/")[0], language, analyzed_at, payload)
+        )
+
+    def analyses_page_sync(self, after: str, limit: int, owner: Optional[str] = None,
+                           language: Optional[str] = None, since: Optional[float] = None,
+                           until: Optional[float] = None) -> List[Tuple[str, float, bytes]]:
+        """Up to `limit` (repo, analyzed_at, payload) rows after `after` in repo order, filtered"""
+        clauses, params = ["repo > ?"], [after]
+        if owner is not None:
+            clauses.append("owner = ?")
+            params.append(owner.lower())
+        if language is not None:
+            clauses.append("language = ? COLLATE NOCASE")
+            params.append(language)
+        if since is not None:
+            clauses.append("analyzed_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("analyzed_at < ?")
+            params.append(until)
+        # Keyset pagination: each page is one short indexed query, however large the table
+        return self._connect().execute(
+            f"SELECT repo, analyzed_at, payload FROM analyses WHERE {' AND '.join(clauses)} ORDER BY repo LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+
+    def index_analysis_sync(self, repo: str, document: Dict[str, str]) -> None:
+        """Replace a repository's full-text search document"""
+        # FTS5 rows are keyed by rowid only, so derive a stable one from the repo key
+        rowid = int.from_bytes(hashlib.blake2b(repo.encode(), digest_size=8).digest(), "big", signed=True)
+        names = [name for name, _ in SEARCH_COLUMNS]
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM analysis_search WHERE rowid = ?", (rowid,))
+            connection.execute(
+                f"INSERT INTO analysis_search (rowid, repo, {', '.join(names)}) VALUES (?, ?{', ?' * len(names)})",
+                (rowid, repo, *(document.get(name, "") for name in names))
+            )
+
+    def search_sync(self, match: str, limit: int, offset: int = 0, owner: Optional[str] = None,
+                    language: Optional[str] = None) -> List[Tuple[str, str, str, float, str]]:
+        """(full name, description, language, bm25 rank, snippet) of documents matching an FTS5 query, best first"""
+        clauses, params = ["analysis_search MATCH ?"], [match]
+        if owner is not None:
+            # Keys starting "owner/": "0" is the character after "/"
+            clauses.append("repo >= ? AND repo < ?")
+            params.extend((f"{owner.lower()}/", f"{owner.lower()}0"))
+        if language is not None:
+            clauses.append("language = ? COLLATE NOCASE")
+            params.append(language)
+        weights = ", ".join(str(weight) for _, weight in SEARCH_COLUMNS)
+        return self._connect().execute(
+            f"""
+            SELECT name, description, language, bm25(analysis_search, 0, {weights}) AS rank,
+                   snippet(analysis_search, -1, '**', '**', '…', 16)
+            FROM analysis_search WHERE {' AND '.join(clauses)}
+            ORDER BY rank LIMIT ? OFFSET ?
+            """,
+            (*params, limit, offset)
+        ).fetchall()
+
+    # Async wrappers keep SQLite I/O off the event loop
+
+    async def get_cursor(self, repo: str, stream: str) -> Tuple[Optional[str], bool]:
+        return await asyncio.to_thread(self.get_cursor_sync, repo, stream)
+
+    async def set_cursor(self, repo: str, stream: str, cursor: Optional[str], complete: bool) -> None:
+        await asyncio.to_thread(self.set_cursor_sync, repo, stream, cursor, complete)
+
+    async def upsert_issues(self, repo: str, records: List[Tuple]) -> None:
+        await asyncio.to_thread(self.upsert_issues_sync, repo, records)
+
+    async def record_responses(self, repo: str, responses: List[Tuple[int, str, int]]) -> None:
+        await asyncio.to_thread(self.record_responses_sync, repo, responses)
+
+    async def replace_commit_days(self, repo: str, counts: Dict[int, int], from_day: int, cursor: str) -> None:
+        await asyncio.to_thread(self.replace_commit_days_sync, repo, counts, from_day, cursor)
+
+    async def add_commit_days(self, repo: str, counts: Dict[int, int], cursor: str) -> None:
+        await asyncio.to_thread(self.add_commit_days_sync, repo, counts, cursor)
+
+    async def commit_days(self, repo: str, from_day: int) -> List[Tuple[int, int]]:
+        return await asyncio.to_thread(self.commit_days_sync, repo, from_day)
+
+    async def issue_window(self, repo: str, since: int, stale_before: int) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.issue_window_sync, repo, since, stale_before)
+
+    async def save_analysis(self, repo: str, language: Optional[str], analyzed_at: float, payload: bytes) -> None:
+        await asyncio.to_thread(self.save_analysis_sync, repo, language, analyzed_at, payload)
+
+    async def index_analysis(self, repo: str, document: Dict[str, str]) -> None:
+        await asyncio.to_thread(self.index_analysis_sync, repo, document)
+
+    async def search(self, match: str, limit: int, offset: int = 0, owner: Optional[str] = None,
+                     language: Optional[str] = None) -> List[Tuple[str, str, str, float, str]]:
+        return await asyncio.to_thread(self.search_sync, match, limit, offset, owner, language)
+
+    async def analyses_page(self, after: str, limit: int, owner: Optional[str] = None,
+                            language: Optional[str] = None, since: Optional[float] = None,
+                            until: Optional[float] = None) -> List[Tuple[str, float, bytes]]:
+        return await asyncio.to_thread(self.analyses_page_sync, after, limit, owner, language, since, until)
+
+
+def create_history_store() -> Optional[HistoryStore]:
+    """Open the history database; None (history features off) if it cannot be opened"""
+    try:
+        return HistoryStore(settings.HISTORY_DB_PATH)
+    except sqlite3.Error as e:
+        logger.error(f"History store unavailable at {settings.HISTORY_DB_PATH}: {str(e)}")
+        return None
@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import random
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config.settings import settings
+from models.records import ContributorSummary
+from services.repo_context import RepoContextStore
+from services.tracing import tracer
+
+# MinHash over 5-word shingles, indexed with LSH as 16 bands of 4 rows: pairs above ~0.8
+# similarity almost always share a band, pairs below ~0.3 rarely do
+SHINGLE_WORDS = 5
+BANDS = 16
+ROWS = 4
+_rng = random.Random(0x5EED)
+_masks = [_rng.getrandbits(64) for _ in range(BANDS * ROWS)]
+WORD = re.compile(r"\w+")
+README_MISSING = "README not available"
+
+
+def readme_signature(readme: Optional[str], max_chars: Optional[int] = None) -> Optional[Tuple[int, ...]]:
+    """MinHash signature of a README's word shingles (of its first max_chars); None when there is no README"""
+    if not readme or readme == README_MISSING:
+        return None
+    words = WORD.findall(readme[:max_chars].lower())
+    if not words:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles]
+    # XOR with a fixed random mask stands in for a family of independent hash functions
+    return tuple(min(map(mask.__xor__, hashes)) for mask in _masks)
+
+
+def similarity(a: Optional[Tuple[int, ...]], b: Optional[Tuple[int, ...]]) -> float:
+    """Estimated Jaccard similarity of the two shingle sets"""
+    if a is None or b is None:
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class ReadmeIndex:
+    """Bounded LSH index from README signatures to the repositories that have them"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._signatures: "OrderedDict[str, Tuple[int, ...]]" = OrderedDict()
+        self._bands: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+
+    @staticmethod
+    def _band_keys(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+    def add(self, key: str, signature: Tuple[int, ...]) -> None:
+        self.remove(key)
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._bands.setdefault(band_key, set()).add(key)
+        while len(self._signatures) > self.max_entries:
+            self.remove(next(iter(self._signatures)))
+
+    def remove(self, key: str) -> None:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(signature):
+            keys = self._bands.get(band_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._bands[band_key]
+
+    def get(self, key: str) -> Optional[Tuple[int, ...]]:
+        return self._signatures.get(key)
+
+    def candidates(self, signature: Tuple[int, ...]) -> Set[str]:
+        found: Set[str] = set()
+        for band_key in self._band_keys(signature):
+            found |= self._bands.get(band_key, set())
+        return found
+
+
+class InsightReuse:
+    """Find an already analyzed parent fork or README mirror whose AI insights still apply"""
+
+    INSIGHTS = ("repository_summary", "language_analysis", "contribution_patterns")
+
+    def __init__(self, contexts: RepoContextStore):
+        self.contexts = contexts
+        self.index = ReadmeIndex(settings.README_INDEX_MAX_ENTRIES)
+        self.max_age = settings.FORK_REUSE_MAX_AGE
+        self.min_similarity = settings.README_REUSE_SIMILARITY
+        self.language_tolerance = settings.FORK_LANGUAGE_TOLERANCE
+        self.signature_chars = settings.README_SIGNATURE_CHARS
+
+    async def find(self, owner: str, repo: str, inputs: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Reusable insights by name (possibly none); also indexes this repo's README for later lookups"""
+        with tracer.span("analysis.reuse") as span:
+            key = RepoContextStore.key(owner, repo)
+            signature = await asyncio.to_thread(readme_signature, inputs["readme"], self.signature_chars)
+            if signature is not None:
+                self.index.add(key, signature)
+
+            repo_info = inputs["repo_info"]
+            related = []
+            if repo_info.get("fork"):
+                # GitHub includes the direct parent and the root of the fork network
+                for upstream in (repo_info.get("parent"), repo_info.get("source")):
+                    if upstream and upstream.get("full_name"):
+                        related.append(upstream["full_name"].lower())
+            candidates = dict.fromkeys(related)
+            if signature is not None:
+                candidates.update(dict.fromkeys(sorted(self.index.candidates(signature))))
+            candidates.pop(key, None)
+
+            best: Dict[str, Dict[str, Any]] = {}
+            for candidate in candidates:
+                theirs = self.index.get(candidate)
+                if theirs is None and candidate in related:
+                    # Parent analyzed before this process started indexing: use its cached README
+                    readme = await self.contexts.cached(*candidate.split("/", 1), "readme", self.max_age)
+                    theirs = await asyncio.to_thread(readme_signature, readme, self.signature_chars)
+                    if theirs is not None:
+                        self.index.add(candidate, theirs)
+                score = similarity(signature, theirs)
+                # Unrelated repos must prove they are mirrors; forks are related by definition
+                if candidate not in related and score < self.min_similarity:
+                    continue
+                analysis = await self.contexts.cached(*candidate.split("/", 1), "analysis", self.max_age)
+                if analysis is None:
+                    continue
+                their_info = await self.contexts.cached(*candidate.split("/", 1), "repo_info", self.max_age)
+                reusable = self._reusable(candidate, inputs, analysis, score, their_info)
+                if len(reusable) > len(best):
+                    best = reusable
+            span.set_attribute("reused", len(best))
+            return best
+
+    def _reusable(self, source: str, inputs: Dict[str, Any], analysis: Dict[str, Any],
+                  score: float, their_info: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        insights = analysis.get("ai_insights") or {}
+        usable = {
+            # The summary is written from the README and the metadata quoted in its prompt
+            "repository_summary": score >= self.min_similarity
+                                  and their_info is not None
+                                  and _summary_metadata(inputs["repo_info"]) == _summary_metadata(their_info),
+            "language_analysis": self._languages_match(inputs["languages"], analysis["languages"]["languages"])
+                                 and _dependency_names(inputs.get("dependencies")) == _dependency_names(
+                                     analysis.get("dependencies")),
+            "contribution_patterns": inputs["contributors"] == ContributorSummary.from_dict(analysis["contributors"]),
+        }
+        reused = {}
+        for name in self.INSIGHTS:
+            item = insights.get(name)
+            # Heuristic fallbacks are cheap to rebuild and would hide a real LLM answer
+            if usable[name] and item and item.get("source") in ("llm", "reused"):
+                reused[name] = {**item, "source": "reused", "reused_from": item.get("reused_from") or source}
+        return reused
+
+    def _languages_match(self, ours: Dict[str, float], theirs: Dict[str, float]) -> bool:
+        return all(
+            abs(ours.get(language, 0.0) - theirs.get(language, 0.0)) <= self.language_tolerance
+            for language in set(ours) | set(theirs)
+        )
+
+
+def _summary_metadata(repo_info: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Repository fields the summary prompt quotes besides the README (stars aside, which always drift)"""
+    return (
+        repo_info.get("name"), repo_info.get("description"), repo_info.get("language"),
+        tuple(repo_info.get("topics") or [])
+    )
+
+
+def _dependency_names(summary: Optional[Dict[str, Any]]) -> Set[Tuple[str, str]]:
+    if not summary:
+        return set()
+    return {(d["ecosystem"], d["name"]) for d in summary.get("dependencies", []) if not d["dev"]}
+
@@ -0,0 +1,150 @@
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from services.github_service import GitHubService
+from services.history_store import HistoryStore
+from services.repo_context import RepoContextStore
+
+PageFetcher = Callable[..., Awaitable[Tuple[List[Dict[str, Any]], Optional[str]]]]
+
+
+class HistoryUnavailableError(Exception):
+    """Raised when the history database could not be opened"""
+
+
+def _epoch(timestamp: Optional[str]) -> Optional[int]:
+    if not timestamp:
+        return None
+    return int(datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp())
+
+
+def _percentile_hours(seconds: List[int], q: float) -> Optional[float]:
+    if not seconds:
+        return None
+    ordered = sorted(seconds)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] / 3600, 1)
+
+
+class IssueAnalytics:
+    """Issue/PR throughput metrics over a locally synced history, refreshed with `since` cursors"""
+
+    def __init__(self, github_service: GitHubService, history: Optional[HistoryStore], contexts: RepoContextStore):
+        self.github_service = github_service
+        self.history = history
+        self.max_pages = settings.ISSUE_SYNC_MAX_PAGES
+        # Cached and single-flighted as a repo context section, like the analysis
+        contexts.fetchers["issue_analytics"] = self._build
+        contexts.ttls["issue_analytics"] = settings.ISSUE_ANALYTICS_TTL
+
+    async def _build(self, owner: str, repo: str) -> Dict[str, Any]:
+        if self.history is None:
+            raise HistoryUnavailableError(settings.HISTORY_DB_PATH)
+        key = RepoContextStore.key(owner, repo)
+        requests, complete = await self.sync(owner, repo)
+        return await self.compute(key, requests, complete)
+
+    async def sync(self, owner: str, repo: str) -> Tuple[int, bool]:
+        """Bring the stored history up to date; returns (GitHub requests made, backfill complete)"""
+        key = RepoContextStore.key(owner, repo)
+        requests, issues_complete = await self._sync_stream(
+            owner, repo, key, "issues", self.github_service.get_issues_page, self._apply_issues, self.max_pages
+        )
+        if not issues_complete:
+            # Comments are only attributed to issues we already hold, so wait for the backfill
+            return requests, False
+        comment_requests, comments_complete = await self._sync_stream(
+            owner, repo, key, "issue_comments", self.github_service.get_issue_comments_page,
+            self._apply_comments, self.max_pages - requests
+        )
+        return requests + comment_requests, comments_complete
+
+    async def _sync_stream(self, owner: str, repo: str, key: str, stream: str, fetch_page: PageFetcher,
+                           apply: Callable[[str, List[Dict[str, Any]]], Awaitable[None]],
+                           max_pages: int) -> Tuple[int, bool]:
+        # Items come oldest update first, so the last item's updated_at is a resumable cursor
+        cursor, _ = await self.history.get_cursor(key, stream)
+        url = None
+        pages = 0
+        while pages < max(1, max_pages):
+            items, url = await fetch_page(owner, repo, since=cursor, url=url)
+            pages += 1
+            if items:
+                await apply(key, items)
+                cursor = items[-1].get("updated_at") or cursor
+            if url is None:
+                break
+            await self.history.set_cursor(key, stream, cursor, False)
+        # Out of pages with more to read: behind again, however complete an earlier backfill was
+        complete = url is None
+        await self.history.set_cursor(key, stream, cursor, complete)
+        return pages, complete
+
+    async def _apply_issues(self, key: str, items: List[Dict[str, Any]]) -> None:
+        records = []
+        for item in items:
+            pull_request = item.get("pull_request")
+            records.append((
+                item["number"],
+                int(pull_request is not None),
+                int(item.get("state") == "open"),
+                (item.get("user") or {}).get("login"),
+                _epoch(item.get("created_at")),
+                _epoch(item.get("updated_at")),
+                _epoch(item.get("closed_at")),
+                _epoch(pull_request.get("merged_at")) if pull_request else None
+            ))
+        await self.history.upsert_issues(key, records)
+
+    async def _apply_comments(self, key: str, items: List[Dict[str, Any]]) -> None:
+        responses = []
+        for item in items:
+            user = item.get("user") or {}
+            # Bot acknowledgements are not a human response
+            if user.get("type") == "Bot" or not item.get("issue_url"):
+                continue
+            number = item["issue_url"].rsplit("/", 1)[-1]
+            if number.isdigit():
+                responses.append((int(number), user.get("login"), _epoch(item.get("created_at"))))
+        await self.history.record_responses(key, responses)
+
+    async def compute(self, key: str, requests: int = 0, complete: bool = True) -> Dict[str, Any]:
+        now = int(time.time())
+        window_days = settings.ISSUE_ANALYTICS_WINDOW_DAYS
+        window = await self.history.issue_window(
+            key, now - window_days * 86400, now - settings.STALE_PR_DAYS * 86400
+        )
+        weeks = window_days / 7
+        return {
+            "window_days": window_days,
+            "issues": {
+                "open": window["open_issues"],
+                "opened": window["issues_opened"],
+                "closed": window["issues_closed"],
+                "opened_per_week": round(window["issues_opened"] / weeks, 2),
+                "closed_per_week": round(window["issues_closed"] / weeks, 2)
+            },
+            "pull_requests": {
+                "open": window["open_prs"],
+                "opened": window["prs_opened"],
+                "merged": window["prs_merged"],
+                "closed_unmerged": window["prs_closed_unmerged"],
+                "merged_per_week": round(window["prs_merged"] / weeks, 2),
+                "median_merge_hours": _percentile_hours(window["merge_latencies"], 0.5),
+                "p90_merge_hours": _percentile_hours(window["merge_latencies"], 0.9),
+                "stale": window["stale_prs"],
+                "stale_after_days": settings.STALE_PR_DAYS
+            },
+            "responsiveness": {
+                "median_first_response_hours": _percentile_hours(window["first_responses"], 0.5),
+                "p90_first_response_hours": _percentile_hours(window["first_responses"], 0.9),
+                "awaiting_response": window["awaiting_response"]
+            },
+            "sync": {
+                "tracked_items": window["tracked"],
+                # False while a large repo is still being backfilled, a few pages per refresh
+                "complete": complete,
+                "github_requests": requests
+            }
+        }
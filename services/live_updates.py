@@ -0,0 +1,271 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Set
+
+from config.settings import settings
+from services.circuit_breaker import CircuitOpenError
+from services.concurrency import BACKGROUND, set_priority
+from services.github_service import GitHubService, RepositoryNotFoundError
+from services.local_git_service import LocalGitService
+from services.repo_context import RepoContextStore
+
+logger = logging.getLogger(__name__)
+
+
+def basic_stats(repo_info: Dict[str, Any]) -> Dict[str, Any]:
+    """The /stats view of a repo_info section"""
+    return {
+        "stars": repo_info.get("stargazers_count", 0),
+        "forks": repo_info.get("forks_count", 0),
+        "open_issues": repo_info.get("open_issues_count", 0),
+        "license": repo_info.get("license", {}).get("name") if repo_info.get("license") else None,
+        "created_at": repo_info.get("created_at"),
+        "updated_at": repo_info.get("updated_at")
+    }
+
+
+class Topic(NamedTuple):
+    # Context section the topic is built from
+    section: str
+    # Cheap resource whose ETag changes whenever the section would
+    resource: str
+    params: Optional[Dict[str, Any]]
+    view: Callable[[Dict[str, Any]], Dict[str, Any]]
+    # The probed resource is the section itself, so a changed probe needs no second request
+    probe_is_section: bool = False
+
+
+TOPICS: Dict[str, Topic] = {
+    "stats": Topic("repo_info", "", None, basic_stats, probe_is_section=True),
+    # The newest commit on the default branch; a new one changes the weekly counts
+    "commits": Topic("commit_activity", "/commits", {"per_page": 1}, dict),
+    "contributors": Topic("contributors", "/contributors", {"per_page": 100}, dict),
+}
+SECTION_TOPICS = {topic.section: name for name, topic in TOPICS.items()}
+
+
+def diff(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of new that differ from old; a weekly series is cut down to the weeks that changed"""
+    if old is None:
+        return dict(new)
+    changes = {}
+    for key, value in new.items():
+        if old.get(key) == value:
+            continue
+        if key == "weekly_data":
+            before = {week["week"]: week["commits"] for week in old.get(key) or []}
+            value = [week for week in value if before.get(week["week"]) != week["commits"]]
+        changes[key] = value
+    return changes
+
+
+class LiveCapacityError(Exception):
+    """This worker is already watching as many repositories as it may"""
+
+
+class Subscriber:
+    """Outbox of one WebSocket connection, multiplexing every repository it is subscribed to"""
+
+    def __init__(self, max_queued: int):
+        self.repos: Set[str] = set()
+        self.queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(max_queued)
+        self.overflowed = False
+
+    def push(self, message: Dict[str, Any]) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A slow client gets fresh snapshots instead of an ever-growing backlog of diffs
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Channel:
+    """Subscribers of one repository, its poller and the last state they were sent"""
+
+    __slots__ = ("owner", "repo", "subscribers", "state", "etags", "task")
+
+    def __init__(self, owner: str, repo: str):
+        self.owner = owner
+        self.repo = repo
+        self.subscribers: Set[Subscriber] = set()
+        self.state: Dict[str, Dict[str, Any]] = {}
+        self.etags: Dict[str, Optional[str]] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.owner}/{self.repo}"
+
+
+class LiveUpdates:
+    """Push stats, commit and contributor changes to subscribers, with one poller per repository however many watch it"""
+
+    def __init__(self, github_service: GitHubService, contexts: RepoContextStore,
+                 local: Optional[LocalGitService] = None):
+        self.github_service = github_service
+        self.contexts = contexts
+        self.local = local
+        self.interval = settings.LIVE_POLL_INTERVAL
+        self.max_subscriptions = settings.LIVE_MAX_SUBSCRIPTIONS
+        self.max_channels = settings.LIVE_MAX_CHANNELS
+        self.max_queued = settings.LIVE_QUEUE_SIZE
+        self._channels: Dict[str, Channel] = {}
+        # Every refresh reaches subscribers, whether it came from a poller, a request or a webhook
+        contexts.listeners.append(self._on_update)
+
+    def subscriber(self) -> Subscriber:
+        return Subscriber(self.max_queued)
+
+    async def subscribe(self, subscriber: Subscriber, owner: str, repo: str) -> Dict[str, Any]:
+        """Start receiving a repository's changes; returns a snapshot of every topic to apply them to"""
+        key = RepoContextStore.key(owner, repo)
+        channel = self._channels.get(key)
+        if channel is None:
+            if len(self._channels) >= self.max_channels:
+                raise LiveCapacityError(key)
+            channel = Channel(owner, repo)
+            self._channels[key] = channel
+            channel.task = asyncio.create_task(self._poll(channel))
+        channel.subscribers.add(subscriber)
+        subscriber.repos.add(key)
+
+        values = await self.contexts.get_many(owner, repo, [topic.section for topic in TOPICS.values()])
+        for value in values.values():
+            if isinstance(value, (RepositoryNotFoundError, CircuitOpenError)):
+                self.unsubscribe(subscriber, owner, repo)
+                raise value
+        for name, topic in TOPICS.items():
+            value = values[topic.section]
+            # The listener has already recorded anything fetched just now
+            if name not in channel.state and isinstance(value, dict):
+                channel.state[name] = topic.view(value)
+        return self._snapshot_message(channel)
+
+    def unsubscribe(self, subscriber: Subscriber, owner: str, repo: str) -> None:
+        key = RepoContextStore.key(owner, repo)
+        subscriber.repos.discard(key)
+        channel = self._channels.get(key)
+        if channel is None:
+            return
+        channel.subscribers.discard(subscriber)
+        if not channel.subscribers:
+            # Last viewer gone: stop polling
+            channel.task.cancel()
+            del self._channels[key]
+
+    def close(self, subscriber: Subscriber) -> None:
+        for key in list(subscriber.repos):
+            self.unsubscribe(subscriber, *key.split("/", 1))
+
+    @staticmethod
+    def _snapshot_message(channel: Channel) -> Dict[str, Any]:
+        return {"type": "snapshot", "repo": channel.full_name, "data": dict(channel.state)}
+
+    async def messages(self, subscriber: Subscriber) -> AsyncIterator[Dict[str, Any]]:
+        """Messages to send, in order; after an overflow, a fresh snapshot of each subscribed repository"""
+        while True:
+            message = await subscriber.queue.get()
+            if message is not None:
+                yield message
+                continue
+            subscriber.overflowed = False
+            for key in list(subscriber.repos):
+                channel = self._channels.get(key)
+                if channel is not None:
+                    yield self._snapshot_message(channel)
+
+    def _on_update(self, context, section, value) -> None:
+        name = SECTION_TOPICS.get(section)
+        if name is None or not isinstance(value, dict):
+            return
+        channel = self._channels.get(RepoContextStore.key(context.owner, context.repo))
+        if channel is None:
+            return
+        view = TOPICS[name].view(value)
+        previous = channel.state.get(name)
+        channel.state[name] = view
+        # Without a previous state the topic goes out in the subscription snapshot instead
+        changes = diff(previous, view) if previous is not None else None
+        if changes:
+            self._broadcast(channel, {"type": "update", "repo": channel.full_name, "topic": name, "changes": changes})
+
+    @staticmethod
+    def _broadcast(channel: Channel, message: Dict[str, Any]) -> None:
+        for subscriber in list(channel.subscribers):
+            subscriber.push(message)
+
+    @staticmethod
+    def _lease_key(channel: Channel) -> str:
+        return f"live:{RepoContextStore.key(channel.owner, channel.repo)}"
+
+    async def _poll(self, channel: Channel) -> None:
+        # Polls queue behind interactive requests for GitHub slots
+        set_priority(BACKGROUND, "live")
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.poll_once(channel)
+                except CircuitOpenError as e:
+                    await asyncio.sleep(e.retry_after)
+                except RepositoryNotFoundError:
+                    self._broadcast(channel, {"type": "error", "repo": channel.full_name, "detail": "Repository not found"})
+                except Exception as e:
+                    logger.warning(f"Live update poll of {channel.full_name} failed: {str(e)}")
+        finally:
+            if self.contexts.shared is not None:
+                # Let a worker that still has viewers take over without waiting for the lease to lapse
+                await self.contexts.shared.release_lease(self._lease_key(channel))
+
+    async def poll_once(self, channel: Channel) -> List[str]:
+        """Refresh the topics that changed upstream; returns their names"""
+        owner, repo = channel.owner, channel.repo
+        context = self.contexts.context(owner, repo)
+        refreshed = []
+        if self.local is not None and self.local.path_for(owner, repo) is not None:
+            # A local mirror costs nothing to re-read and has no ETags
+            for name, topic in TOPICS.items():
+                await self.contexts.get(owner, repo, topic.section, force=True)
+                refreshed.append(name)
+            return refreshed
+        shared = self.contexts.shared
+        if shared is not None and not await shared.acquire_lease(self._lease_key(channel), self.interval * 3):
+            # Another worker polls this repository; pick up what it published to the shared cache
+            for name, topic in TOPICS.items():
+                if await self.contexts.adopt_shared(owner, repo, topic.section):
+                    refreshed.append(name)
+            return refreshed
+        for name, topic in TOPICS.items():
+            if context.hooked:
+                # Webhooks keep the section current; only refill what they invalidated
+                await self.contexts.get(owner, repo, topic.section)
+                continue
+            changed, channel.etags[name], body = await self.github_service.probe(
+                owner, repo, topic.resource, channel.etags.get(name), topic.params
+            )
+            if not changed:
+                continue
+            if topic.probe_is_section and isinstance(body, dict):
+                await self.contexts.store(context, topic.section, body)
+            else:
+                await self.contexts.get(owner, repo, topic.section, force=True)
+            refreshed.append(name)
+        return refreshed
+
+    async def stop(self) -> None:
+        tasks = [channel.task for channel in self._channels.values()]
+        self._channels.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "repositories": len(self._channels),
+            "subscriptions": sum(len(channel.subscribers) for channel in self._channels.values())
+        }
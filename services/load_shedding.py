@@ -0,0 +1,53 @@
+import json
+import logging
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Cheap endpoints that must keep answering while the service is shedding load
+EXEMPT_PATHS = {"/", "/api/v1/health", "/docs", "/openapi.json"}
+
+
+class AdmissionControlMiddleware:
+    """Reject new HTTP requests with 503 once too many are already in flight"""
+
+    def __init__(self, app, max_in_flight: int = None, retry_after: int = None):
+        self.app = app
+        self.max_in_flight = max_in_flight or settings.MAX_IN_FLIGHT_REQUESTS
+        self.retry_after = retry_after or settings.LOAD_SHED_RETRY_AFTER
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            logger.warning(f"Shedding request to {scope['path']}: {self.in_flight} requests in flight")
+            await self._reject(send)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def _reject(self, send):
+        body = json.dumps({
+            "error": "overloaded",
+            "message": "Server is at capacity, please retry later"
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
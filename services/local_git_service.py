@@ -0,0 +1,294 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from services.github_service import RepositoryNotFoundError
+from services.repo_context import SECTION_FETCHERS, RepoContextStore
+
+logger = logging.getLogger(__name__)
+
+# Extension -> language for the byte breakdown (a small subset of what GitHub's linguist knows)
+EXTENSION_LANGUAGES = {
+    ".py": "Python", ".pyx": "Cython", ".js": "JavaScript", ".mjs": "JavaScript", ".cjs": "JavaScript",
+    ".jsx": "JavaScript", ".ts": "TypeScript", ".tsx": "TypeScript", ".java": "Java", ".kt": "Kotlin",
+    ".scala": "Scala", ".go": "Go", ".rs": "Rust", ".c": "C", ".h": "C", ".cc": "C++", ".cpp": "C++",
+    ".cxx": "C++", ".hpp": "C++", ".cs": "C#", ".rb": "Ruby", ".php": "PHP", ".swift": "Swift",
+    ".m": "Objective-C", ".mm": "Objective-C++", ".sh": "Shell", ".bash": "Shell", ".ps1": "PowerShell",
+    ".html": "HTML", ".htm": "HTML", ".css": "CSS", ".scss": "SCSS", ".vue": "Vue", ".svelte": "Svelte",
+    ".dart": "Dart", ".lua": "Lua", ".r": "R", ".jl": "Julia", ".hs": "Haskell", ".ex": "Elixir",
+    ".exs": "Elixir", ".erl": "Erlang", ".clj": "Clojure", ".ml": "OCaml", ".sql": "SQL",
+    ".ipynb": "Jupyter Notebook", ".dockerfile": "Dockerfile", ".tf": "HCL", ".zig": "Zig",
+}
+SPECIAL_FILES = {"Dockerfile": "Dockerfile", "Makefile": "Makefile", "CMakeLists.txt": "CMake"}
+# Third-party code GitHub also leaves out of the breakdown
+VENDORED_DIRS = ("node_modules/", "vendor/", "third_party/", "dist/")
+
+
+def _week_label(timestamp: int) -> str:
+    """Sunday-based week, matching GitHub's commit statistics"""
+    day = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    week_start = day - timedelta(days=(day.weekday() + 1) % 7)
+    return week_start.strftime("%Y-%m-%d")
+
+
+class LocalGitError(Exception):
+    """Raised when a git command against a local repository fails"""
+
+
+class LocalSectionUnavailableError(LocalGitError):
+    """Raised for sections only the GitHub API can answer (issues, pull requests) on a local mirror"""
+
+
+# Derived sections built from GitHub-only data; a local mirror has nothing to build them from
+API_ONLY_SECTIONS = ("issue_analytics",)
+
+
+class LocalGitService:
+    """GitHubService-compatible data source that reads repositories from disk with git"""
+
+    def __init__(self, root: str, contexts: Optional[RepoContextStore] = None):
+        self.root = os.path.realpath(root)
+        if contexts is not None:
+            # Mirrored repositories are read from disk; everything else still goes to GitHub
+            for section, method in SECTION_FETCHERS.items():
+                contexts.fetchers[section] = self._prefer_local(getattr(self, method), contexts.fetchers[section])
+            for section in API_ONLY_SECTIONS:
+                if section in contexts.fetchers:
+                    contexts.fetchers[section] = self._prefer_local(self._unavailable(section), contexts.fetchers[section])
+
+    def path_for(self, owner: str, repo: str) -> Optional[str]:
+        """Local path for owner/repo (working tree or bare `repo.git`), or None if not mirrored"""
+        for name in (repo, f"{repo}.git"):
+            path = os.path.realpath(os.path.join(self.root, owner, name))
+            # realpath + commonpath keeps symlinks and ".." from escaping the root
+            if os.path.commonpath([self.root, path]) == self.root and os.path.isdir(path):
+                return path
+        return None
+
+    def _require(self, owner: str, repo: str) -> str:
+        path = self.path_for(owner, repo)
+        if path is None:
+            raise RepositoryNotFoundError(f"{owner}/{repo}")
+        return path
+
+    async def _stream(self, path: str, *args: str) -> AsyncIterator[str]:
+        """Yield git output line by line so huge histories are never held in memory"""
+        process = await asyncio.create_subprocess_exec(
+            "git", "-C", path, *args,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            async for line in process.stdout:
+                yield line.decode("utf-8", errors="replace").rstrip("\n")
+            stderr = await process.stderr.read()
+            if await process.wait() != 0:
+                raise LocalGitError(stderr.decode("utf-8", errors="replace").strip())
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    async def _lines(self, path: str, *args: str) -> List[str]:
+        return [line async for line in self._stream(path, *args)]
+
+    async def _has_commits(self, path: str) -> bool:
+        try:
+            await self._lines(path, "rev-parse", "--verify", "--quiet", "HEAD")
+            return True
+        except LocalGitError:
+            return False
+
+    async def get_repo_info(self, owner: str, repo: str) -> Dict[str, Any]:
+        """Repository metadata in the shape of GET /repos/{owner}/{repo}"""
+        path = self._require(owner, repo)
+        created_at = updated_at = None
+        default_branch = None
+        if await self._has_commits(path):
+            updated = await self._lines(path, "log", "-1", "--format=%cI", "HEAD")
+            created = await self._lines(path, "log", "--reverse", "--max-parents=0", "--format=%cI", "HEAD")
+            updated_at = updated[0] if updated else None
+            created_at = created[0] if created else None
+            branch = await self._lines(path, "rev-parse", "--abbrev-ref", "HEAD")
+            default_branch = branch[0] if branch else None
+
+        description = None
+        description_path = os.path.join(path, "description")
+        if os.path.isfile(description_path):
+            with open(description_path, encoding="utf-8", errors="replace") as handle:
+                text = handle.read().strip()
+            # git's placeholder for bare repositories
+            if text and not text.startswith("Unnamed repository"):
+                description = text
+
+        languages = await self.get_repo_languages(owner, repo)
+        return {
+            "name": repo,
+            "full_name": f"{owner}/{repo}",
+            "description": description,
+            "language": max(languages, key=languages.get) if languages else None,
+            "default_branch": default_branch,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "stargazers_count": 0,
+            "forks_count": 0,
+            "open_issues_count": 0,
+            "license": None,
+            "html_url": f"file://{path}",
+            "owner": {"login": owner, "html_url": f"file://{os.path.dirname(path)}"},
+            "source": "local_git"
+        }
+
+    async def get_repo_languages(self, owner: str, repo: str) -> Dict[str, int]:
+        """Bytes per language at HEAD, as GET /repos/{owner}/{repo}/languages reports them"""
+        path = self._require(owner, repo)
+        if not await self._has_commits(path):
+            return {}
+        languages: Dict[str, int] = {}
+        # "<mode> <type> <object> <size>\t<path>" per blob
+        async for line in self._stream(path, "ls-tree", "-r", "-l", "--full-tree", "HEAD"):
+            meta, _, file_path = line.partition("\t")
+            parts = meta.split()
+            if len(parts) != 4 or parts[1] != "blob" or not parts[3].isdigit():
+                continue
+            if file_path.startswith(VENDORED_DIRS) or any(f"/{d}" in file_path for d in VENDORED_DIRS):
+                continue
+            name = file_path.rsplit("/", 1)[-1]
+            language = SPECIAL_FILES.get(name) or EXTENSION_LANGUAGES.get(os.path.splitext(name)[1].lower())
+            if language:
+                languages[language] = languages.get(language, 0) + int(parts[3])
+        return dict(sorted(languages.items(), key=lambda item: item[1], reverse=True))
+
+    async def get_commit_activity(self, owner: str, repo: str) -> Dict[str, Any]:
+        """Weekly commit counts for the last 52 weeks, in GitHubService.get_commit_activity's shape"""
+        path = self._require(owner, repo)
+        if not await self._has_commits(path):
+            return {"total_commits": 0, "last_30_days": 0, "weekly_data": []}
+
+        now = int(time.time())
+        first_week = _week_label(now - 51 * 7 * 86400)
+        weeks: Dict[str, int] = {}
+        last_30_days = 0
+        async for line in self._stream(path, "log", f"--since={now - 52 * 7 * 86400}", "--format=%ct", "HEAD"):
+            if not line.isdigit():
+                continue
+            timestamp = int(line)
+            label = _week_label(timestamp)
+            if label >= first_week:
+                weeks[label] = weeks.get(label, 0) + 1
+            if timestamp >= now - 30 * 86400:
+                last_30_days += 1
+
+        labels = [_week_label(now - offset * 7 * 86400) for offset in range(51, -1, -1)]
+        weekly_data = [{"week": label, "commits": weeks.get(label, 0)} for label in labels]
+        return {
+            "total_commits": sum(week["commits"] for week in weekly_data),
+            "last_30_days": last_30_days,
+            "weekly_data": weekly_data
+        }
+
+    async def get_repo_readme(self, owner: str, repo: str) -> str:
+        """README text at HEAD, capped like the GitHub raw README fetch"""
+        path = self._require(owner, repo)
+        try:
+            if not await self._has_commits(path):
+                return "README not available"
+            names = await self._lines(path, "ls-tree", "--name-only", "HEAD")
+            readme = next((name for name in sorted(names) if name.lower().startswith("readme")), None)
+            if readme is None:
+                return "README not available"
+            process = await asyncio.create_subprocess_exec(
+                "git", "-C", path, "cat-file", "blob", f"HEAD:{readme}",
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+            )
+            try:
+                content = await process.stdout.readexactly(settings.README_MAX_BYTES)
+            except asyncio.IncompleteReadError as e:
+                content = e.partial
+            finally:
+                # Stop git once the cap is reached instead of draining the rest of a huge file
+                if process.returncode is None:
+                    process.kill()
+                await process.wait()
+            return content.decode("utf-8", errors="replace")
+        except LocalGitError:
+            return "README not available"
+
+    async def get_contributors(self, owner: str, repo: str) -> Dict[str, Any]:
+        """Commit counts per author, in GitHubService.get_contributors' shape"""
+        path = self._require(owner, repo)
+        contributors = []
+        if await self._has_commits(path):
+            # "<count>\t<name>" per author, already aggregated by git
+            async for line in self._stream(path, "shortlog", "-sn", "HEAD"):
+                count, _, name = line.strip().partition("\t")
+                if count.isdigit():
+                    contributors.append((name, int(count)))
+        contributors.sort(key=lambda item: item[1], reverse=True)
+        return {
+            "total_contributors": len(contributors),
+            "active_contributors": len([1 for _, commits in contributors if commits >= 5]),
+            "top_contributors": [
+                {"username": name, "commits": commits, "avatar_url": ""}
+                for name, commits in contributors[:5]
+            ]
+        }
+
+    async def get_head_sha(self, owner: str, repo: str) -> Optional[str]:
+        """SHA of HEAD; None for a repository without commits"""
+        path = self._require(owner, repo)
+        try:
+            lines = await self._lines(path, "rev-parse", "--verify", "HEAD")
+        except LocalGitError:
+            return None
+        return lines[0] if lines else None
+
+    async def iter_tree(self, owner: str, repo: str, sha: str) -> AsyncIterator[Tuple[str, int, str]]:
+        """Stream (path, size, blob sha) for every file in a commit's tree"""
+        path = self._require(owner, repo)
+        # quotePath off: non-ASCII paths come through as UTF-8 instead of C-style escapes
+        async for line in self._stream(path, "-c", "core.quotePath=false", "ls-tree", "-r", "-l", "--full-tree", sha):
+            meta, _, file_path = line.partition("\t")
+            parts = meta.split()
+            if len(parts) == 4 and parts[1] == "blob" and parts[3].isdigit():
+                yield file_path, int(parts[3]), parts[2]
+
+    async def get_blob(self, owner: str, repo: str, sha: str) -> bytes:
+        """Raw content of a git blob"""
+        path = self._require(owner, repo)
+        process = await asyncio.create_subprocess_exec(
+            "git", "-C", path, "cat-file", "blob", sha,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        content, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise LocalGitError(stderr.decode("utf-8", errors="replace").strip())
+        return content
+
+    @staticmethod
+    def _unavailable(section: str) -> Callable[[str, str], Awaitable[Any]]:
+        async def fetch(owner: str, repo: str) -> Any:
+            raise LocalSectionUnavailableError(f"{section} is not available for the local mirror of {owner}/{repo}")
+        return fetch
+
+    def _prefer_local(self, local: Callable[[str, str], Awaitable[Any]],
+                      remote: Callable[[str, str], Awaitable[Any]]) -> Callable[[str, str], Awaitable[Any]]:
+        async def fetch(owner: str, repo: str) -> Any:
+            if self.path_for(owner, repo) is not None:
+                return await local(owner, repo)
+            return await remote(owner, repo)
+        return fetch
+
+
+def create_local_git_service(contexts: RepoContextStore) -> Optional[LocalGitService]:
+    """Local repository backend when LOCAL_REPOS_ROOT is set and git is installed"""
+    if not settings.LOCAL_REPOS_ROOT:
+        return None
+    if shutil.which("git") is None:
+        logger.error("LOCAL_REPOS_ROOT is set but git is not installed; local analysis disabled")
+        return None
+    return LocalGitService(settings.LOCAL_REPOS_ROOT, contexts)
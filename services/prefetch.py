@@ -0,0 +1,215 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from services.concurrency import BACKGROUND, set_priority
+from services.github_service import request_meter
+from services.repo_context import SECTIONS
+
+logger = logging.getLogger(__name__)
+
+# Three completions on Groq per refreshed analysis
+GROQ_CALLS_PER_ANALYSIS = 3
+# GitHub requests per refresh vary with the repo (pagination, cache hits, manifests), so they are
+# metered; until the first refresh, assume one per section gather_inputs reads (plus dependencies)
+INITIAL_GITHUB_CALLS = len(SECTIONS) + 1
+# Weight of each metered refresh in the running GitHub cost estimate
+COST_ALPHA = 0.2
+
+
+class AccessTracker:
+    """Exponentially decaying per-repo access counter with bounded memory"""
+
+    def __init__(self, half_life: float = None, capacity: int = None):
+        self.decay = math.log(2) / (half_life or settings.PREFETCH_HALF_LIFE)
+        self.capacity = capacity or settings.PREFETCH_TRACKED_MAX
+        # "owner/repo" -> (score, last update time)
+        self._scores: Dict[str, Tuple[float, float]] = {}
+
+    def hit(self, owner: str, repo: str, weight: float = 1.0) -> None:
+        key = f"{owner}/{repo}".lower()
+        now = time.monotonic()
+        score, updated = self._scores.get(key, (0.0, now))
+        self._scores[key] = (score * math.exp(-self.decay * (now - updated)) + weight, now)
+        if len(self._scores) > 2 * self.capacity:
+            self._prune(now)
+
+    def score(self, key: str, now: Optional[float] = None) -> float:
+        now = now or time.monotonic()
+        score, updated = self._scores.get(key, (0.0, now))
+        return score * math.exp(-self.decay * (now - updated))
+
+    def hottest(self, n: int) -> List[Tuple[str, float]]:
+        now = time.monotonic()
+        return heapq.nlargest(n, ((key, self.score(key, now)) for key in self._scores), key=lambda item: item[1])
+
+    @staticmethod
+    def merge(n: int, *rankings: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        """Hottest n of several workers' rankings, summing the scores of repos they share"""
+        totals: Dict[str, float] = {}
+        for ranking in rankings:
+            for key, score in ranking:
+                totals[key] = totals.get(key, 0.0) + score
+        return heapq.nlargest(n, totals.items(), key=lambda item: item[1])
+
+    def _prune(self, now: float) -> None:
+        """Keep only the highest-scoring repos once the table doubles past capacity"""
+        keep = heapq.nlargest(self.capacity, self._scores, key=lambda key: self.score(key, now))
+        self._scores = {key: self._scores[key] for key in keep}
+
+
+class QuotaBudget:
+    """Sliding-window budget for the share of an upstream quota background work may spend"""
+
+    def __init__(self, limit_per_window: float, window: float):
+        self.limit = limit_per_window
+        self.window = window
+        self._spent: Deque[Tuple[float, int]] = deque()
+
+    def spent(self) -> int:
+        cutoff = time.monotonic() - self.window
+        while self._spent and self._spent[0][0] < cutoff:
+            self._spent.popleft()
+        return sum(cost for _, cost in self._spent)
+
+    def try_spend(self, cost: int) -> bool:
+        if self.spent() + cost > self.limit:
+            return False
+        self._spent.append((time.monotonic(), cost))
+        return True
+
+    def record(self, cost: int) -> None:
+        """Account for spending that was not reserved up front (negative to give back an over-reservation)"""
+        if cost:
+            self._spent.append((time.monotonic(), cost))
+
+
+class PrefetchScheduler:
+    """Background loop that keeps the hottest analyses warm before they expire"""
+
+    def __init__(self, analyzer, github_service, access_tracker: AccessTracker, ai_service=None):
+        self.analyzer = analyzer
+        self.contexts = analyzer.contexts
+        self.github_service = github_service
+        self.ai_service = ai_service
+        self.access_tracker = access_tracker
+        self.hot_count = settings.PREFETCH_HOT_COUNT
+        self.interval = settings.PREFETCH_INTERVAL
+        self.lead_time = settings.PREFETCH_LEAD_TIME
+        self.seed_repos = [
+            tuple(entry.strip().split("/", 1)) for entry in settings.PREFETCH_SEED_REPOS.split(",")
+            if entry.count("/") == 1
+        ]
+        self.groq_budget = QuotaBudget(settings.GROQ_REQUESTS_PER_MINUTE * settings.PREFETCH_QUOTA_SHARE, 60)
+        self.github_budget = QuotaBudget(self._github_hourly_limit() * settings.PREFETCH_QUOTA_SHARE, 3600)
+        # Running estimate of GitHub requests per refresh, corrected by metering each one
+        self.github_cost = float(INITIAL_GITHUB_CALLS)
+        self.refreshed = 0
+        self.skipped_for_quota = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _github_hourly_limit(self) -> int:
+        # Authenticated requests get 5000/hour, anonymous ones 60/hour
+        return 5000 if settings.GITHUB_TOKEN else 60
+
+    def start(self) -> None:
+        if settings.PREFETCH_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        # Refreshes queue behind interactive requests for GitHub and Groq slots
+        set_priority(BACKGROUND, "prefetch")
+        # Seed repos start with a high score so they stay warm until real traffic takes over
+        for owner, repo in self.seed_repos:
+            self.access_tracker.hit(owner, repo, weight=self.hot_count)
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning(f"Prefetch cycle failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> int:
+        """Refresh hot analyses that are missing or about to expire; returns the number refreshed"""
+        shared = self.contexts.shared
+        hottest = self.access_tracker.hottest(self.hot_count)
+        if shared is not None:
+            # Every worker sees only its own requests; the leader ranks by all of them
+            await shared.set(f"prefetch:scores:{shared.owner_id}", hottest, self.interval * 3)
+            if not await shared.acquire_lease("prefetch:leader", self.interval * 3):
+                # Another worker is the prefetch leader; one scheduler per deployment is enough
+                return 0
+            hottest = AccessTracker.merge(self.hot_count, *await shared.get_prefix("prefetch:scores:"))
+        refreshed = 0
+        for key, _ in hottest:
+            owner, repo = key.split("/", 1)
+            context = self.contexts.peek(owner, repo)
+            if context is not None and context.age("analysis") < self.contexts.ttl_for("analysis", context) - self.lead_time:
+                continue
+            reserved = self._reserve_quota()
+            if reserved is None:
+                self.skipped_for_quota += 1
+                logger.info("Prefetch quota share exhausted, deferring remaining refreshes")
+                break
+            meter = [0]
+            token = request_meter.set(meter)
+            try:
+                await self.analyzer.analyze(owner, repo, refresh=True)
+                refreshed += 1
+            except Exception as e:
+                logger.info(f"Prefetch of {key} failed: {str(e)}")
+            finally:
+                request_meter.reset(token)
+                self._settle_github_cost(reserved, meter[0])
+        self.refreshed += refreshed
+        return refreshed
+
+    def _reserve_quota(self) -> Optional[int]:
+        """Reserve one refresh's estimated quota; returns the GitHub requests reserved, None if over budget"""
+        # Back off entirely once interactive traffic has pushed the GitHub quota this low
+        remaining = self.github_service.rate_limit.get("remaining")
+        limit = self.github_service.rate_limit.get("limit")
+        if remaining is not None and limit and remaining < limit * settings.PREFETCH_QUOTA_SHARE:
+            return None
+        groq_cost = GROQ_CALLS_PER_ANALYSIS if self.ai_service is None or self.ai_service.is_available() else 0
+        if groq_cost and self.groq_budget.spent() + groq_cost > self.groq_budget.limit:
+            return None
+        github_cost = math.ceil(self.github_cost)
+        if not self.github_budget.try_spend(github_cost):
+            return None
+        if groq_cost:
+            self.groq_budget.try_spend(groq_cost)
+        return github_cost
+
+    def _settle_github_cost(self, reserved: int, used: int) -> None:
+        """Charge the budget what the refresh actually cost and fold it into the estimate"""
+        self.github_budget.record(used - reserved)
+        self.github_cost += COST_ALPHA * (used - self.github_cost)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "enabled": self._task is not None,
+            "refreshed": self.refreshed,
+            "skipped_for_quota": self.skipped_for_quota,
+            "github_budget_spent": self.github_budget.spent(),
+            "github_calls_per_refresh": round(self.github_cost, 1),
+            "groq_budget_spent": self.groq_budget.spent(),
+            "hottest": [
+                {"repo": key, "score": round(score, 2)}
+                for key, score in self.access_tracker.hottest(min(10, self.hot_count))
+            ]
+        }
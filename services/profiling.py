@@ -0,0 +1,298 @@
+import asyncio
+import cProfile
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_PATTERN = re.compile(r"^[0-9]+-[0-9a-f]{8}\.(pstats|speedscope\.json)$")
+
+# Durations remembered to estimate the slow-request threshold
+DURATION_WINDOW = 1000
+MIN_DURATIONS = 100
+THRESHOLD_REFRESH_EVERY = 50
+
+# Seconds of event-loop stack samples kept for slow-request capture
+SAMPLE_HISTORY_SECONDS = 60
+
+# cProfile allows one active profiler per process, whichever middleware instance or thread asks
+_profile_lock = threading.Lock()
+
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    """Constant-time check of an admin token; always False when ADMIN_TOKEN is unset"""
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
+
+
+class ProfileStore:
+    """Profile artifacts on disk, keeping only the newest max_artifacts"""
+
+    def __init__(self, directory: str = None, max_artifacts: int = None):
+        self.directory = directory or settings.PROFILE_DIR
+        self.max_artifacts = max_artifacts or settings.PROFILE_MAX_ARTIFACTS
+
+    def new_name(self, extension: str) -> str:
+        return f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.{extension}"
+
+    def path(self, name: str) -> Optional[str]:
+        """Resolve an artifact name to a path, rejecting anything that is not one of ours"""
+        if not ARTIFACT_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.exists(path) else None
+
+    def save_pstats(self, profile: cProfile.Profile, name: str = None) -> str:
+        name = name or self.new_name("pstats")
+        os.makedirs(self.directory, exist_ok=True)
+        profile.dump_stats(os.path.join(self.directory, name))
+        self._prune()
+        return name
+
+    def save_speedscope(self, document: Dict[str, Any]) -> str:
+        name = self.new_name("speedscope.json")
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as handle:
+            json.dump(document, handle)
+        self._prune()
+        return name
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        artifacts = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if ARTIFACT_PATTERN.match(name):
+                stat = os.stat(os.path.join(self.directory, name))
+                artifacts.append({
+                    "name": name,
+                    "format": "pstats" if name.endswith(".pstats") else "speedscope",
+                    "bytes": stat.st_size,
+                    "created_at": stat.st_mtime
+                })
+        return artifacts
+
+    def _prune(self) -> None:
+        names = sorted(name for name in os.listdir(self.directory) if ARTIFACT_PATTERN.match(name))
+        for name in names[:max(0, len(names) - self.max_artifacts)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+class StackSampler:
+    """Background thread sampling the event loop thread's stack at a fixed interval"""
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or settings.PROFILE_SAMPLE_INTERVAL
+        self.samples: "deque[Tuple[float, Tuple[int, ...]]]" = deque(
+            maxlen=int(SAMPLE_HISTORY_SECONDS / self.interval)
+        )
+        # Interned (name, file, line) frames; speedscope references them by index
+        self.frames: List[Tuple[str, str, int]] = []
+        self._frame_index: Dict[Any, int] = {}
+        self._target: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self, target_thread: int) -> None:
+        if self._thread is not None:
+            return
+        self._target = target_thread
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                self.samples.append((time.perf_counter(), self._stack(frame)))
+
+    def _stack(self, frame) -> Tuple[int, ...]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            index = self._frame_index.get(code)
+            if index is None:
+                index = self._frame_index[code] = len(self.frames)
+                self.frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def between(self, start: float, end: float) -> List[Tuple[float, Tuple[int, ...]]]:
+        return [sample for sample in list(self.samples) if start <= sample[0] <= end]
+
+    def speedscope(self, name: str, start: float, end: float) -> Dict[str, Any]:
+        """Build a speedscope "sampled" profile from the samples taken between start and end"""
+        samples = self.between(start, end)
+        used = sorted({index for _, stack in samples for index in stack})
+        remap = {index: position for position, index in enumerate(used)}
+        interval_ms = self.interval * 1000
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": settings.APP_NAME,
+            "shared": {"frames": [
+                {"name": self.frames[index][0], "file": self.frames[index][1], "line": self.frames[index][2]}
+                for index in used
+            ]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round((end - start) * 1000, 3),
+                "samples": [[remap[index] for index in stack] for _, stack in samples],
+                "weights": [interval_ms] * len(samples)
+            }]
+        }
+
+
+class SlowRequestDetector:
+    """Rolling estimate of the duration above which a request is in the slowest percentile"""
+
+    def __init__(self, percentile: float = None):
+        self.percentile = percentile or settings.PROFILE_SLOW_PERCENTILE
+        self.durations: "deque[float]" = deque(maxlen=DURATION_WINDOW)
+        self.threshold = float("inf")
+        self._since_refresh = 0
+
+    def observe(self, duration: float) -> bool:
+        """Record a duration; True if it is slow enough to keep a profile for"""
+        self.durations.append(duration)
+        self._since_refresh += 1
+        if len(self.durations) >= MIN_DURATIONS and self._since_refresh >= THRESHOLD_REFRESH_EVERY:
+            ordered = sorted(self.durations)
+            self.threshold = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+            self._since_refresh = 0
+        return duration >= self.threshold
+
+
+class ProfilingMiddleware:
+    """Profile admin-requested requests with cProfile and keep sampled stacks of the slowest ones"""
+
+    def __init__(self, app, store: ProfileStore = None, sampling: bool = None):
+        self.app = app
+        self.store = store or profile_store
+        self.sampling = settings.PROFILE_SAMPLING_ENABLED if sampling is None else sampling
+        self.sampler = StackSampler() if self.sampling else None
+        self.detector = SlowRequestDetector()
+        self.captured = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self._profile_requested(scope):
+            await self._profile(scope, receive, send)
+            return
+
+        if self.sampler is None:
+            await self.app(scope, receive, send)
+            return
+
+        self.sampler.start(threading.get_ident())
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            end = time.perf_counter()
+            if self.detector.observe(end - start):
+                await self._capture_slow(scope, start, end)
+
+    @staticmethod
+    def _profile_requested(scope) -> bool:
+        headers = dict(scope.get("headers") or [])
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        wanted = headers.get(b"x-profile", b"").decode("latin-1") == "1" or query.get("profile") == ["1"]
+        return wanted and admin_token_valid(headers.get(b"x-admin-token", b"").decode("latin-1"))
+
+    async def _profile(self, scope, receive, send):
+        """Run one request under cProfile.
+
+        cProfile hooks the event loop thread, not the request, so the profile also contains
+        whatever other requests and background tasks ran on the loop until this one finished.
+        Only one profile runs at a time; a second request is answered with 409.
+        """
+        if not _profile_lock.acquire(blocking=False):
+            await self._busy(send)
+            return
+        try:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler (a debugger, coverage) already owns the thread
+                await self._busy(send)
+                return
+            name = self.store.new_name("pstats")
+            # The name is decided up front so it can go out in the response headers
+            headers = [(b"x-profile-id", name.encode()),
+                       (b"x-profile-url", f"/api/v1/admin/profiles/{name}".encode()),
+                       (b"x-profile-scope", b"thread")]
+            try:
+                await self.app(scope, receive, self._with_headers(send, headers))
+            finally:
+                profile.disable()
+                await asyncio.to_thread(self.store.save_pstats, profile, name)
+        finally:
+            _profile_lock.release()
+
+    @staticmethod
+    async def _busy(send) -> None:
+        body = json.dumps({
+            "error": "profile_in_progress",
+            "message": "Another request is being profiled, please retry later"
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 409,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _capture_slow(self, scope, start: float, end: float) -> None:
+        label = f"{scope['method']} {scope['path']} ({(end - start) * 1000:.0f} ms)"
+        document = self.sampler.speedscope(label, start, end)
+        if not document["profiles"][0]["samples"]:
+            return
+        try:
+            name = await asyncio.to_thread(self.store.save_speedscope, document)
+            self.captured += 1
+            logger.info(f"Captured slow request profile {name}: {label}")
+        except OSError as e:
+            logger.warning(f"Could not store slow request profile: {str(e)}")
+
+    @staticmethod
+    def _with_headers(send, extra: List[Tuple[bytes, bytes]]):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *extra]}
+            await send(message)
+        return send_wrapper
+
+
+profile_store = ProfileStore()
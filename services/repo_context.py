@@ -0,0 +1,311 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import settings
+from services.github_service import RepositoryNotFoundError, is_degraded
+
+# Context sections and the GitHubService method that fills each one
+SECTION_FETCHERS = {
+    "repo_info": "get_repo_info",
+    "languages": "get_repo_languages",
+    "commit_activity": "get_commit_activity",
+    "readme": "get_repo_readme",
+    "contributors": "get_contributors",
+}
+SECTIONS = tuple(SECTION_FETCHERS)
+# Sections computed from the ones above (fetchers registered by their services)
+DERIVED_SECTIONS = ("analysis", "issue_analytics", "structure", "dependencies", "head")
+
+
+@dataclass
+class RepoDataContext:
+    """Everything fetched from GitHub for one repository, shared by all routes"""
+    owner: str
+    repo: str
+    repo_info: Optional[Dict[str, Any]] = None
+    languages: Optional[Dict[str, int]] = None
+    commit_activity: Optional[Dict[str, Any]] = None
+    readme: Optional[str] = None
+    contributors: Optional[Dict[str, Any]] = None
+    # Complete /analyze response, including AI insights
+    analysis: Optional[Dict[str, Any]] = None
+    # Issue/PR throughput metrics from the synced history
+    issue_analytics: Optional[Dict[str, Any]] = None
+    # Directory/extension/test metrics from the recursive git tree
+    structure: Optional[Dict[str, Any]] = None
+    # Dependencies parsed from manifest files in that tree
+    dependencies: Optional[Dict[str, Any]] = None
+    # Default branch head SHA both tree sections are read at ("" for an empty repository)
+    head: Optional[str] = None
+    fetched_at: Dict[str, float] = field(default_factory=dict)
+    # When this process took each value, which is later than fetched_at for values read from the shared tier
+    loaded_at: Dict[str, float] = field(default_factory=dict)
+    # Bumped on invalidation so a fetch that started earlier is not marked fresh
+    generations: Dict[str, int] = field(default_factory=dict)
+    # Until this monotonic time, webhooks keep the repo current and long TTLs apply
+    hooked_until: float = 0.0
+    inflight: Dict[str, "asyncio.Task"] = field(default_factory=dict, repr=False)
+
+    def is_fresh(self, section: str, ttl: float) -> bool:
+        return self.age(section) < ttl
+
+    def age(self, section: str) -> float:
+        """Seconds since the section was fetched (infinite if never)"""
+        fetched_at = self.fetched_at.get(section)
+        return time.monotonic() - fetched_at if fetched_at is not None else float("inf")
+
+    def invalidate(self, sections: Optional[Iterable[str]] = None) -> None:
+        for section in (*SECTIONS, *DERIVED_SECTIONS) if sections is None else sections:
+            self.fetched_at.pop(section, None)
+            self.generations[section] = self.generations.get(section, 0) + 1
+
+    @property
+    def hooked(self) -> bool:
+        return time.monotonic() < self.hooked_until
+
+
+class RepoContextStore:
+    """Short-TTL read-through cache of RepoDataContext records with single-flight fetching"""
+
+    def __init__(self, github_service, ttl: float = None, max_entries: int = None, shared_cache=None):
+        self.github_service = github_service
+        # Optional cross-process L2 (services.shared_cache.SharedCache); contexts then act as a short L1
+        self.shared = shared_cache
+        self.ttl = ttl if ttl is not None else settings.REPO_CONTEXT_TTL
+        self.max_entries = max_entries or settings.REPO_CONTEXT_MAX_ENTRIES
+        self._contexts: "OrderedDict[str, RepoDataContext]" = OrderedDict()
+        # Negative cache of confirmed 404s: key -> monotonic expiry
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        # Called as listener(context, section, value) whenever a section is refreshed
+        self.listeners: List[Callable[[RepoDataContext, str, Any], None]] = []
+        # Section name -> async fetcher(owner, repo); more can be registered (e.g. "analysis")
+        self.fetchers: Dict[str, Callable[[str, str], Awaitable[Any]]] = {
+            section: getattr(github_service, method) for section, method in SECTION_FETCHERS.items()
+        }
+        # Per-section TTL overrides; sections not listed use self.ttl
+        self.ttls: Dict[str, float] = {"analysis": settings.ANALYSIS_TTL}
+
+    @staticmethod
+    def key(owner: str, repo: str) -> str:
+        # GitHub owner and repository names are case-insensitive
+        return f"{owner}/{repo}".lower()
+
+    def context(self, owner: str, repo: str) -> RepoDataContext:
+        """Get (or create) the context record for a repository"""
+        key = self.key(owner, repo)
+        context = self._contexts.get(key)
+        if context is None:
+            context = RepoDataContext(owner=owner, repo=repo)
+            self._contexts[key] = context
+            while len(self._contexts) > self.max_entries:
+                self._contexts.popitem(last=False)
+        else:
+            self._contexts.move_to_end(key)
+        return context
+
+    def peek(self, owner: str, repo: str) -> Optional[RepoDataContext]:
+        """Return the context record if one exists, without creating it"""
+        return self._contexts.get(self.key(owner, repo))
+
+    def ttl_for(self, section: str, context: Optional[RepoDataContext] = None) -> float:
+        ttl = self.ttls.get(section, self.ttl)
+        if context is not None and context.hooked:
+            # Webhook-managed repos are invalidated precisely, so they can be cached much longer
+            return max(ttl, settings.WEBHOOK_SECTION_TTL)
+        return ttl
+
+    def local_ttl_for(self, section: str, context: Optional[RepoDataContext] = None) -> float:
+        ttl = self.ttl_for(section, context)
+        if self.shared is not None:
+            # Other workers may invalidate the shared copy; keep the in-process copy brief
+            return min(ttl, settings.SHARED_CACHE_L1_TTL)
+        return ttl
+
+    def is_fresh(self, context: RepoDataContext, section: str) -> bool:
+        """Younger than the section's TTL, and loaded into this process less than the local TTL ago"""
+        if not context.is_fresh(section, self.ttl_for(section, context)):
+            return False
+        loaded_at = context.loaded_at.get(section)
+        return loaded_at is not None and time.monotonic() - loaded_at < self.local_ttl_for(section, context)
+
+    def contexts(self) -> List[RepoDataContext]:
+        return list(self._contexts.values())
+
+    def is_missing(self, owner: str, repo: str) -> bool:
+        key = self.key(owner, repo)
+        expires = self._missing.get(key)
+        if expires is None:
+            return False
+        if time.monotonic() >= expires:
+            del self._missing[key]
+            return False
+        return True
+
+    def mark_missing(self, owner: str, repo: str) -> None:
+        key = self.key(owner, repo)
+        self._missing[key] = time.monotonic() + settings.NEGATIVE_CACHE_TTL
+        self._missing.move_to_end(key)
+        while len(self._missing) > settings.NEGATIVE_CACHE_MAX_ENTRIES:
+            self._missing.popitem(last=False)
+        # Drop the context so stale data for a deleted repo is not served
+        self._contexts.pop(key, None)
+
+    async def clear_missing(self, owner: str, repo: str) -> None:
+        self._missing.pop(self.key(owner, repo), None)
+        if self.shared is not None:
+            await self.shared.delete(self._shared_key(owner, repo, "missing"))
+
+    async def mark_hooked(self, context: RepoDataContext) -> None:
+        """Flag a repo as webhook-managed so its sections can use long TTLs"""
+        context.hooked_until = time.monotonic() + settings.WEBHOOK_HOOKED_WINDOW
+        if self.shared is not None:
+            await self.shared.set(self._shared_key(context.owner, context.repo, "hooked"), True,
+                                  settings.WEBHOOK_HOOKED_WINDOW)
+
+    async def cached(self, owner: str, repo: str, section: str, max_age: float) -> Optional[Any]:
+        """A section value from either tier if one is held, without ever fetching it"""
+        context = self.peek(owner, repo)
+        if context is not None and getattr(context, section) is not None and context.age(section) <= max_age:
+            return getattr(context, section)
+        if self.shared is not None:
+            entry = await self.shared.get(self._shared_key(owner, repo, section))
+            # Entries carry their age, so values other workers published are held to the same bound
+            if entry is not None and entry[1] <= max_age:
+                return entry[0]
+        return None
+
+    async def adopt_shared(self, owner: str, repo: str, section: str) -> bool:
+        """Take up a section value another worker published, without fetching; True if it changed ours"""
+        if self.shared is None:
+            return False
+        entry = await self.shared.get(self._shared_key(owner, repo, section))
+        context = self.context(owner, repo)
+        if entry is None or getattr(context, section) == entry[0]:
+            return False
+        self.update(context, section, entry[0], age=entry[1])
+        return True
+
+    async def get(self, owner: str, repo: str, section: str, force: bool = False) -> Any:
+        """Read one section through the cache, joining any fetch already in flight"""
+        if self.is_missing(owner, repo):
+            raise RepositoryNotFoundError(f"{owner}/{repo}")
+        context = self.context(owner, repo)
+        if not force and self.is_fresh(context, section):
+            return getattr(context, section)
+
+        task = context.inflight.get(section)
+        if task is None:
+            task = asyncio.create_task(self._fetch(context, section, force))
+            context.inflight[section] = task
+        # Shield so one cancelled caller does not abort the fetch other callers share
+        return await asyncio.shield(task)
+
+    async def get_many(self, owner: str, repo: str, sections: Iterable[str] = SECTIONS,
+                       force: bool = False) -> Dict[str, Any]:
+        """Read several sections concurrently; failed sections are returned as exceptions"""
+        sections = list(sections)
+        results = await asyncio.gather(
+            *(self.get(owner, repo, section, force=force) for section in sections),
+            return_exceptions=True
+        )
+        return dict(zip(sections, results))
+
+    async def invalidate(self, context: RepoDataContext, sections: Optional[Iterable[str]] = None) -> None:
+        """Invalidate sections locally and in the shared tier"""
+        sections = list((*SECTIONS, *DERIVED_SECTIONS) if sections is None else sections)
+        context.invalidate(sections)
+        if self.shared is not None and sections:
+            await self.shared.delete(*(self._shared_key(context.owner, context.repo, s) for s in sections))
+
+    async def store(self, context: RepoDataContext, section: str, value: Any, fresh: bool = True) -> None:
+        """Update a section from outside the fetch path (e.g. webhooks) and publish it"""
+        self.update(context, section, value, fresh=fresh)
+        if self.shared is not None:
+            # Patches keep the original expiry; fresh values start a new TTL
+            ttl = self.ttl_for(section, context) - (0 if fresh else context.age(section))
+            if ttl > 0:
+                await self.shared.set(self._shared_key(context.owner, context.repo, section), value, ttl)
+
+    def update(self, context: RepoDataContext, section: str, value: Any, fresh: bool = True, age: float = 0.0) -> None:
+        """Store a freshly obtained section value (already age seconds old) and notify listeners"""
+        setattr(context, section, value)
+        if fresh:
+            now = time.monotonic()
+            context.fetched_at[section] = now - age
+            context.loaded_at[section] = now
+        for listener in self.listeners:
+            listener(context, section, value)
+
+    async def _fetch(self, context: RepoDataContext, section: str, force: bool = False) -> Any:
+        generation = context.generations.get(section, 0)
+        try:
+            if self.shared is not None:
+                value, age = await self._fetch_shared(context, section, force)
+            else:
+                value, age = await self.fetchers[section](context.owner, context.repo), 0.0
+            if is_degraded(value):
+                # GitHub failed: keep serving what we had, or hold the stand-in only until the next read
+                previous = getattr(context, section)
+                if previous is not None:
+                    return previous
+                self.update(context, section, value, fresh=False)
+                return value
+            # Invalidated while fetching: keep the value but let the next read refetch
+            self.update(context, section, value, fresh=context.generations.get(section, 0) == generation, age=age)
+            return value
+        except RepositoryNotFoundError:
+            # Only repo_info settles existence; other endpoints 404 for their own reasons
+            if section == "repo_info":
+                self.mark_missing(context.owner, context.repo)
+            raise
+        finally:
+            context.inflight.pop(section, None)
+
+    def _shared_key(self, owner: str, repo: str, section: str) -> str:
+        return f"{self.key(owner, repo)}:{section}"
+
+    async def _fetch_shared(self, context: RepoDataContext, section: str, force: bool) -> Tuple[Any, float]:
+        """Read through the shared tier, with one process per key fetching upstream at a time; returns (value, age)"""
+        key = self._shared_key(context.owner, context.repo, section)
+        missing_key = self._shared_key(context.owner, context.repo, "missing")
+        if not force:
+            # The entry's age carries over, so it expires locally when it would have in the shared tier
+            entry = await self.shared.get(key)
+            if entry is not None:
+                return entry
+        if await self.shared.get(missing_key) is not None:
+            raise RepositoryNotFoundError(f"{context.owner}/{context.repo}")
+
+        lease_key = f"lease:{key}"
+        if await self.shared.acquire_lease(lease_key, settings.SHARED_LOCK_TIMEOUT):
+            try:
+                value = await self.fetchers[section](context.owner, context.repo)
+                # Publish before releasing the lease so waiters find the value; stand-ins are never published
+                if not is_degraded(value):
+                    await self.shared.set(key, value, await self._shared_ttl(context, section))
+                return value, 0.0
+            except RepositoryNotFoundError:
+                if section == "repo_info":
+                    await self.shared.set(missing_key, True, settings.NEGATIVE_CACHE_TTL)
+                raise
+            finally:
+                await self.shared.release_lease(lease_key)
+
+        # Another worker is fetching this key: wait for its result instead of duplicating the call
+        entry = await self.shared.wait_for(key, lease_key, settings.SHARED_LOCK_TIMEOUT)
+        if entry is not None:
+            return entry
+        if await self.shared.get(missing_key) is not None:
+            raise RepositoryNotFoundError(f"{context.owner}/{context.repo}")
+        return await self.fetchers[section](context.owner, context.repo), 0.0
+
+    async def _shared_ttl(self, context: RepoDataContext, section: str) -> float:
+        ttl = self.ttl_for(section, context)
+        if not context.hooked and await self.shared.get(self._shared_key(context.owner, context.repo, "hooked")):
+            # Another worker received this repo's webhooks
+            context.hooked_until = time.monotonic() + settings.WEBHOOK_HOOKED_WINDOW
+            ttl = self.ttl_for(section, context)
+        return ttl
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import re
+from typing import Any, Dict, Optional, Set
+
+from config.settings import settings
+from services.exporter import primary_language
+from services.history_store import HistoryStore
+from services.insight_reuse import README_MISSING
+from services.issue_analytics import HistoryUnavailableError
+from services.repo_context import RepoContextStore
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"\w+")
+
+
+def build_query(text: str) -> Optional[str]:
+    """FTS5 query from free text: every term must match, "term*" matches by prefix; None if nothing is searchable"""
+    terms = []
+    for term in text.split():
+        words = WORD.findall(term)
+        if not words:
+            continue
+        # Quoting keeps FTS5 operators and punctuation in user input from being parsed as syntax
+        phrase = '"' + " ".join(words) + '"'
+        terms.append(phrase + "*" if term.endswith("*") else phrase)
+    return " ".join(terms) or None
+
+
+def search_document(context, analysis: Dict[str, Any], readme_chars: int) -> Dict[str, str]:
+    """Searchable text of an analysis and the repository metadata it was built from"""
+    repo_info = context.repo_info or {}
+    readme = context.readme if context.readme and context.readme != README_MISSING else ""
+    insights = [
+        item.get("content", "") for item in (analysis.get("ai_insights") or {}).values()
+        # Heuristic fallbacks and error placeholders say nothing about the repository
+        if isinstance(item, dict) and item.get("source", "llm") in ("llm", "reused")
+    ]
+    return {
+        "name": f"{analysis['owner']}/{analysis['repo']}",
+        "description": repo_info.get("description") or "",
+        "topics": " ".join(repo_info.get("topics") or []),
+        "language": repo_info.get("language") or primary_language(analysis) or "",
+        "readme": readme[:readme_chars],
+        "insights": "\n".join(insights),
+    }
+
+
+class AnalysisSearch:
+    """Ranked full-text search over completed analyses, indexed as each one is stored"""
+
+    def __init__(self, history: Optional[HistoryStore], contexts: RepoContextStore):
+        self.history = history
+        self.readme_chars = settings.SEARCH_README_CHARS
+        self._pending: Set["asyncio.Task"] = set()
+        if history is not None:
+            contexts.listeners.append(self._index)
+
+    def _index(self, context, section, value) -> None:
+        if section != "analysis" or not isinstance(value, dict):
+            return
+        key = RepoContextStore.key(context.owner, context.repo)
+        document = search_document(context, value, self.readme_chars)
+        task = asyncio.get_running_loop().create_task(self._write(key, document))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _write(self, key: str, document: Dict[str, str]) -> None:
+        try:
+            await self.history.index_analysis(key, document)
+        except Exception as e:
+            logger.warning(f"Could not index analysis of {key} for search: {str(e)}")
+
+    async def search(self, text: str, limit: int = 20, offset: int = 0, org: Optional[str] = None,
+                     language: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Best matching analyzed repositories; None when the text has no searchable terms"""
+        if self.history is None:
+            raise HistoryUnavailableError(settings.HISTORY_DB_PATH)
+        match = build_query(text)
+        if match is None:
+            return None
+        rows = await self.history.search(match, limit, offset, owner=org, language=language)
+        return {
+            "query": text,
+            "results": [
+                {
+                    "repository": name,
+                    "description": description or None,
+                    "language": repo_language or None,
+                    # bm25 ranks are negative, lower being better
+                    "score": round(-rank, 6),
+                    "snippet": snippet
+                }
+                for name, description, repo_language, rank, snippet in rows
+            ]
+        }
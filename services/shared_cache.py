@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, List, Optional, Tuple
+
+from config.settings import settings
+from utils.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+class SharedCache:
+    """Cross-process key/value cache and lease table in a memory-mapped SQLite file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Identifies this process as a lease holder
+        self.owner_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections must not be shared between threads; keep one per thread
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA mmap_size={settings.SHARED_CACHE_MMAP_BYTES}")
+            self._local.connection = connection
+        return connection
+
+    # Synchronous primitives (run in a worker thread by the async wrappers below)
+
+    def get_sync(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, age in seconds) for a live entry"""
+        row = self._connect().execute(
+            "SELECT value, stored_at FROM entries WHERE key = ? AND expires > ?",
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return loads(row[0]), max(0.0, time.time() - row[1])
+
+    def set_sync(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        connection = self._connect()
+        connection.execute(
+            "INSERT OR REPLACE INTO entries (key, value, stored_at, expires) VALUES (?, ?, ?, ?)",
+            (key, dumps(value), now, now + ttl)
+        )
+        if random.random() < 0.01:
+            connection.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+
+    def get_prefix_sync(self, prefix: str) -> List[Any]:
+        """Values of every live entry whose key starts with prefix"""
+        # Range scan on the primary key: the upper bound is the prefix with its last character bumped
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        rows = self._connect().execute(
+            "SELECT value FROM entries WHERE key >= ? AND key < ? AND expires > ?",
+            (prefix, upper, time.time())
+        ).fetchall()
+        return [loads(row[0]) for row in rows]
+
+    def delete_sync(self, *keys: str) -> None:
+        self._connect().executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+
+    def acquire_lease_sync(self, key: str, ttl: float) -> bool:
+        """Take (or renew) a lease unless another live process holds it"""
+        now = time.time()
+        cursor = self._connect().execute(
+            """
+            INSERT INTO leases (key, owner, expires) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires
+            WHERE leases.expires <= ? OR leases.owner = excluded.owner
+            """,
+            (key, self.owner_id, now + ttl, now)
+        )
+        return cursor.rowcount > 0
+
+    def release_lease_sync(self, key: str) -> None:
+        self._connect().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner_id))
+
+    def lease_held_sync(self, key: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM leases WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    # Async wrappers keep SQLite I/O off the event loop
+
+    async def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await asyncio.to_thread(self.set_sync, key, value, ttl)
+
+    async def get_prefix(self, prefix: str) -> List[Any]:
+        return await asyncio.to_thread(self.get_prefix_sync, prefix)
+
+    async def delete(self, *keys: str) -> None:
+        await asyncio.to_thread(self.delete_sync, *keys)
+
+    async def acquire_lease(self, key: str, ttl: float) -> bool:
+        return await asyncio.to_thread(self.acquire_lease_sync, key, ttl)
+
+    async def release_lease(self, key: str) -> None:
+        await asyncio.to_thread(self.release_lease_sync, key)
+
+    async def wait_for(self, key: str, lease_key: str, timeout: float) -> Optional[Tuple[Any, float]]:
+        """Wait for another process to publish key while it holds lease_key"""
+        deadline = time.monotonic() + timeout
+        delay = 0.02
+        while time.monotonic() < deadline:
+            entry = await self.get(key)
+            if entry is not None:
+                return entry
+            if not await asyncio.to_thread(self.lease_held_sync, lease_key):
+                return await self.get(key)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.25)
+        return None
+
+
+def create_shared_cache() -> Optional[SharedCache]:
+    """Shared cache tier for multi-worker deployments; None when running single-process"""
+    if not settings.SHARED_CACHE_PATH:
+        return None
+    try:
+        return SharedCache(settings.SHARED_CACHE_PATH)
+    except sqlite3.Error as e:
+        logger.error(f"Shared cache unavailable at {settings.SHARED_CACHE_PATH}: {str(e)}")
+        return None
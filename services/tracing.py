@@ -0,0 +1,347 @@
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# httpcore trace events ("connection.connect_tcp.started", "http11.receive_response_headers.complete", ...)
+# mapped to the request phases worth reporting
+HTTP_PHASES = {
+    "connect_tcp": "connect",
+    "start_tls": "tls",
+    "send_request_headers": "send",
+    "send_request_body": "send",
+    "receive_response_headers": "wait",
+    "receive_response_body": "receive",
+}
+
+MAX_BUFFERED_SPANS = 10000
+EXPORT_BATCH_SIZE = 512
+
+
+class Span:
+    """One timed operation; only sampled spans record attributes and get exported"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "kind",
+                 "start_ns", "end_ns", "attributes", "events", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool,
+                 kind: str = "internal"):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes) -> None:
+        if self.sampled:
+            self.events.append({"name": name, "time_unix_nano": time.time_ns(), "attributes": attributes})
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+# Stand-in yielded when tracing is off, so call sites never need to check
+_NOOP_SPAN = Span("noop", "0" * 32, None, sampled=False)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """Parse a W3C traceparent header into (trace_id, parent_span_id, sampled)"""
+    if not header:
+        return None
+    parts = header.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff" or (parts[0] == "00" and len(parts) != 4):
+        return None
+    _, trace_id, parent_id, flags = parts[:4]
+    if len(trace_id) != 32 or len(parent_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        int(trace_id, 16), int(parent_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, sampled
+
+
+class JsonlSink:
+    """Append finished spans to a local file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write("".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans))
+
+
+class OtlpHttpSink:
+    """Post spans as OTLP/JSON to a collector's /v1/traces endpoint"""
+
+    KINDS = {"internal": 1, "server": 2, "client": 3}
+
+    def __init__(self, endpoint: str, service_name: str):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.client = httpx.Client(timeout=5.0)
+
+    def export(self, spans: List[Span]) -> None:
+        response = self.client.post(self.endpoint, json=self._payload(spans))
+        response.raise_for_status()
+
+    def _payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": self._attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [self._span(span) for span in spans]
+                }]
+            }]
+        }
+
+    def _span(self, span: Span) -> Dict[str, Any]:
+        otlp = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": self.KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": self._attributes(span.attributes),
+            "events": [
+                {"name": event["name"], "timeUnixNano": str(event["time_unix_nano"]),
+                 "attributes": self._attributes(event["attributes"])}
+                for event in span.events
+            ],
+            "status": {"code": 2 if span.status == "error" else 1},
+        }
+        if span.parent_id:
+            otlp["parentSpanId"] = span.parent_id
+        return otlp
+
+    @staticmethod
+    def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+        encoded = []
+        for key, value in attributes.items():
+            if isinstance(value, bool):
+                encoded_value = {"boolValue": value}
+            elif isinstance(value, int):
+                encoded_value = {"intValue": str(value)}
+            elif isinstance(value, float):
+                encoded_value = {"doubleValue": value}
+            else:
+                encoded_value = {"stringValue": str(value)}
+            encoded.append({"key": key, "value": encoded_value})
+        return encoded
+
+
+class Tracer:
+    """Creates spans linked through a context variable and exports them in background batches"""
+
+    def __init__(self, sink=None, sample_ratio: float = 1.0, flush_interval: float = 2.0,
+                 trust_remote_sampling: bool = False):
+        self.sink = sink
+        self.sample_ratio = sample_ratio
+        self.trust_remote_sampling = trust_remote_sampling
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.sink is not None
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", remote: Optional[Tuple[str, str, bool]] = None,
+             activate: bool = True, **attributes) -> Iterator[Span]:
+        """Time the enclosed block as a child of the current span (or of a remote parent); with
+        activate=False the span does not become current, for blocks that yield to their caller"""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        if parent is not None:
+            span = Span(name, parent.trace_id, parent.span_id, parent.sampled, kind)
+        elif remote is not None:
+            # Keep the caller's trace; an untrusted caller may veto sampling but not force it past the ratio
+            sampled = remote[2] and (self.trust_remote_sampling or random.random() < self.sample_ratio)
+            span = Span(name, remote[0], remote[1], sampled, kind)
+        else:
+            trace_id = "%032x" % random.getrandbits(128)
+            span = Span(name, trace_id, None, random.random() < self.sample_ratio, kind)
+        if span.sampled:
+            span.attributes.update(attributes)
+
+        token = _current_span.set(span) if activate else None
+        try:
+            yield span
+        except GeneratorExit:
+            # The consumer of a generator stopped early; that is not a failure of the span
+            raise
+        except BaseException as e:
+            if span.sampled:
+                span.status = "error"
+                span.add_event("exception", type=type(e).__name__, message=str(e))
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            if token is not None:
+                _current_span.reset(token)
+            if span.sampled:
+                self._enqueue(span)
+
+    def httpx_trace(self, span: Span) -> Optional[Callable]:
+        """httpx "trace" extension that adds per-phase timings (connect, tls, wait, ...) to span"""
+        if not span.sampled:
+            return None
+        started: Dict[str, int] = {}
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            prefix, _, stage = event_name.rpartition(".")
+            phase = HTTP_PHASES.get(prefix.partition(".")[2])
+            if phase is None:
+                return
+            now = time.time_ns()
+            if stage == "started":
+                started[phase] = now
+            elif phase in started:
+                key = f"http.{phase}_ms"
+                elapsed = (now - started.pop(phase)) / 1e6
+                span.attributes[key] = round(span.attributes.get(key, 0.0) + elapsed, 3)
+                if stage == "failed":
+                    span.add_event(f"http.{phase}.failed")
+
+        return trace
+
+    def _enqueue(self, span: Span) -> None:
+        with self._lock:
+            if len(self._buffer) >= MAX_BUFFERED_SPANS:
+                self.dropped += 1
+                return
+            self._buffer.append(span)
+            if len(self._buffer) >= EXPORT_BATCH_SIZE:
+                self._wakeup.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._export_loop, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _export_loop(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Export everything buffered so far (called by the exporter thread and at shutdown)"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        try:
+            self.sink.export(batch)
+        except Exception as e:
+            logger.warning(f"Dropping {len(batch)} spans, export failed: {str(e)}")
+
+
+class TracingMiddleware:
+    """Open a server span per HTTP request, continuing any incoming traceparent"""
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        tracer = self.tracer
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        remote = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        with tracer.span(f"{scope['method']} {scope['path']}", kind="server", remote=remote,
+                         **{"http.method": scope["method"], "http.target": scope["path"]}) as span:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "error"
+                    # Lets a client quote the trace of a slow response
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"x-trace-id", span.trace_id.encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                # Name by route template so spans group across owners/repos
+                span.name = f"{scope['method']} {route.path}"
+
+
+def create_tracer() -> Tracer:
+    """Build the process tracer from settings; tracing is off unless TRACE_EXPORTER is set"""
+    exporter = settings.TRACE_EXPORTER.lower()
+    if exporter == "jsonl":
+        sink = JsonlSink(settings.TRACE_JSONL_PATH)
+    elif exporter == "otlp":
+        sink = OtlpHttpSink(settings.TRACE_OTLP_ENDPOINT, settings.TRACE_SERVICE_NAME)
+    else:
+        if exporter:
+            logger.warning(f"Unknown TRACE_EXPORTER {exporter!r}, tracing disabled")
+        sink = None
+    return Tracer(sink, settings.TRACE_SAMPLE_RATIO, settings.TRACE_FLUSH_INTERVAL,
+                  settings.TRACE_TRUST_REMOTE_SAMPLING)
+
+
+tracer = create_tracer()
@@ -0,0 +1,268 @@
+import asyncio
+import heapq
+import logging
+import re
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.settings import settings
+from services.github_service import GitHubService
+from services.local_git_service import EXTENSION_LANGUAGES, LocalGitService
+from services.repo_context import RepoContextStore
+
+logger = logging.getLogger(__name__)
+
+# Directory names whose contents count as tests
+TEST_DIRS = {"test", "tests", "__tests__", "spec", "specs", "testing", "e2e"}
+# test_foo.py, foo_test.go, foo.test.ts, foo.spec.js, FooTest.java, FooTests.cs
+TEST_FILE = re.compile(r"^(test_.+|.+_test|.+\.test|.+\.spec|.+Tests?)\.[^.]+$")
+
+TOP_N = 10
+
+
+class CompactTree:
+    """Files of one git tree in parallel arrays, about 40 bytes per file instead of a dict per entry"""
+
+    __slots__ = ("sha", "truncated", "dirs", "dir_parent", "file_dir", "sizes", "blob_shas",
+                 "_names", "_name_ends", "_dir_ids")
+
+    def __init__(self, sha: str):
+        self.sha = sha
+        # GitHub stops listing very large trees part way; counts are then lower bounds
+        self.truncated = False
+        # Directory paths, with the root at index 0; parents always precede their children
+        self.dirs: List[str] = [""]
+        self.dir_parent = array("i", [-1])
+        # Per file: directory index, size in bytes, 20-byte blob SHA and UTF-8 basename
+        self.file_dir = array("I")
+        self.sizes = array("Q")
+        self.blob_shas = bytearray()
+        self._names = bytearray()
+        self._name_ends = array("Q")
+        self._dir_ids: Optional[Dict[str, int]] = {"": 0}
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def add(self, path: str, size: int, blob_sha: str) -> None:
+        directory, _, name = path.rpartition("/")
+        self.file_dir.append(self._dir_id(directory))
+        self.sizes.append(size)
+        self.blob_shas += bytes.fromhex(blob_sha)
+        self._names += name.encode("utf-8")
+        self._name_ends.append(len(self._names))
+
+    def _dir_id(self, directory: str) -> int:
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            parent = self._dir_id(directory.rpartition("/")[0])
+            dir_id = len(self.dirs)
+            self.dirs.append(directory)
+            self.dir_parent.append(parent)
+            self._dir_ids[directory] = dir_id
+        return dir_id
+
+    def freeze(self) -> "CompactTree":
+        """Drop the build-time directory index once all files are added"""
+        self._dir_ids = None
+        return self
+
+    def name(self, index: int) -> str:
+        start = self._name_ends[index - 1] if index else 0
+        return self._names[start:self._name_ends[index]].decode("utf-8", errors="replace")
+
+    def names(self) -> Iterator[str]:
+        start = 0
+        for end in self._name_ends:
+            yield self._names[start:end].decode("utf-8", errors="replace")
+            start = end
+
+    def path(self, index: int) -> str:
+        directory = self.dirs[self.file_dir[index]]
+        return f"{directory}/{self.name(index)}" if directory else self.name(index)
+
+    def blob_sha(self, index: int) -> str:
+        return self.blob_shas[index * 20:index * 20 + 20].hex()
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the arrays (directory strings excluded)"""
+        arrays = (self.dir_parent, self.file_dir, self.sizes, self._name_ends)
+        return sum(len(a) * a.itemsize for a in arrays) + len(self.blob_shas) + len(self._names)
+
+
+def summarize(tree: CompactTree) -> Dict[str, Any]:
+    """Structure metrics over every file of a tree"""
+    dir_count = len(tree.dirs)
+    dir_files = [0] * dir_count
+    dir_bytes = [0] * dir_count
+    dir_depth = [0] * dir_count
+    dir_is_test = [False] * dir_count
+    for d in range(1, dir_count):
+        parent = tree.dir_parent[d]
+        dir_depth[d] = dir_depth[parent] + 1
+        dir_is_test[d] = dir_is_test[parent] or tree.dirs[d].rpartition("/")[2].lower() in TEST_DIRS
+
+    extensions: Dict[str, List[int]] = {}
+    test_files = source_files = 0
+    for index, name in enumerate(tree.names()):
+        d = tree.file_dir[index]
+        size = tree.sizes[index]
+        dir_files[d] += 1
+        dir_bytes[d] += size
+
+        dot = name.rfind(".")
+        extension = name[dot:].lower() if dot > 0 else ""
+        stats = extensions.get(extension)
+        if stats is None:
+            extensions[extension] = [1, size]
+        else:
+            stats[0] += 1
+            stats[1] += size
+
+        if extension in EXTENSION_LANGUAGES:
+            if dir_is_test[d] or TEST_FILE.match(name):
+                test_files += 1
+            else:
+                source_files += 1
+
+    direct_files = sorted(dir_files)
+    # Roll totals up to every ancestor; children always have higher indexes than their parents
+    total_files, total_bytes = list(dir_files), list(dir_bytes)
+    for d in range(dir_count - 1, 0, -1):
+        parent = tree.dir_parent[d]
+        total_files[parent] += total_files[d]
+        total_bytes[parent] += total_bytes[d]
+
+    top_level = [d for d in range(1, dir_count) if tree.dir_parent[d] == 0]
+    top_level.sort(key=lambda d: total_bytes[d], reverse=True)
+    largest = heapq.nlargest(TOP_N, range(len(tree)), key=tree.sizes.__getitem__)
+    return {
+        "sha": tree.sha,
+        "truncated": tree.truncated,
+        "files": len(tree),
+        "directories": dir_count - 1,
+        "total_bytes": total_bytes[0],
+        "max_depth": max(dir_depth) + 1 if len(tree) else 0,
+        "top_directories": [
+            {
+                "path": tree.dirs[d],
+                "files": total_files[d],
+                "bytes": total_bytes[d],
+                "share": round(total_bytes[d] / total_bytes[0] * 100, 2) if total_bytes[0] else 0.0
+            }
+            for d in top_level[:TOP_N]
+        ],
+        # Files directly inside each directory, the spread of a flat vs deeply nested layout
+        "files_per_directory": {
+            "median": direct_files[len(direct_files) // 2],
+            "p90": direct_files[min(len(direct_files) - 1, int(len(direct_files) * 0.9))],
+            "max": direct_files[-1]
+        },
+        "extensions": [
+            {"extension": extension or "(none)", "files": files, "bytes": size}
+            for extension, (files, size) in sorted(extensions.items(), key=lambda item: item[1][0], reverse=True)[:15]
+        ],
+        "tests": {
+            "test_files": test_files,
+            "source_files": source_files,
+            "test_to_source_ratio": round(test_files / source_files, 3) if source_files else None
+        },
+        "largest_files": [{"path": tree.path(index), "bytes": tree.sizes[index]} for index in largest]
+    }
+
+
+class TreeAnalyzer:
+    """Repository structure from the recursive git tree, fetched once per commit and cached by SHA"""
+
+    def __init__(self, github_service: GitHubService, local: Optional[LocalGitService], contexts: RepoContextStore):
+        self.github_service = github_service
+        self.local = local
+        self.max_files = settings.TREE_CACHE_MAX_FILES
+        # Trees are immutable, so entries never go stale; the bound is on total files held
+        self._trees: "OrderedDict[str, CompactTree]" = OrderedDict()
+        self._cached_files = 0
+        self._inflight: Dict[str, "asyncio.Task"] = {}
+        self.contexts = contexts
+        contexts.fetchers["structure"] = self._build
+        contexts.ttls["structure"] = settings.STRUCTURE_TTL
+        # Resolved once per refresh cycle and shared by the structure and dependencies sections
+        contexts.fetchers["head"] = self._head
+        contexts.ttls["head"] = settings.STRUCTURE_TTL
+
+    async def _build(self, owner: str, repo: str) -> Dict[str, Any]:
+        tree = await self.tree(owner, repo)
+        if tree is None:
+            return summarize(CompactTree("").freeze())
+        # Millions of entries take a while to walk; keep that off the event loop
+        return await asyncio.to_thread(summarize, tree)
+
+    def _is_local(self, owner: str, repo: str) -> bool:
+        return self.local is not None and self.local.path_for(owner, repo) is not None
+
+    async def _head(self, owner: str, repo: str) -> str:
+        source = self.local if self._is_local(owner, repo) else self.github_service
+        return await source.get_head_sha(owner, repo) or ""
+
+    async def tree(self, owner: str, repo: str) -> Optional[CompactTree]:
+        """Tree of the default branch head; None for an empty repository"""
+        sha = await self.contexts.get(owner, repo, "head")
+        if not sha:
+            return None
+        local = self._is_local(owner, repo)
+
+        tree = self._trees.get(sha)
+        if tree is not None:
+            self._trees.move_to_end(sha)
+            return tree
+        task = self._inflight.get(sha)
+        if task is None:
+            load = self._load_local(owner, repo, sha) if local else self._load_github(owner, repo, sha)
+            task = asyncio.ensure_future(load)
+            self._inflight[sha] = task
+            task.add_done_callback(lambda _: self._inflight.pop(sha, None))
+        # Shielded so one cancelled caller does not abort the fetch for the others
+        tree = await asyncio.shield(task)
+        self._remember(tree)
+        return tree
+
+    async def _load_github(self, owner: str, repo: str, sha: str) -> CompactTree:
+        data = await self.github_service.get_tree(owner, repo, sha)
+        return await asyncio.to_thread(self._from_github, sha, data)
+
+    @staticmethod
+    def _from_github(sha: str, data: Dict[str, Any]) -> CompactTree:
+        tree = CompactTree(sha)
+        tree.truncated = bool(data.get("truncated"))
+        for entry in data.get("tree") or []:
+            # Trees are implied by file paths; "commit" entries are submodules
+            if entry.get("type") == "blob":
+                tree.add(entry["path"], entry.get("size") or 0, entry["sha"])
+        return tree.freeze()
+
+    async def _load_local(self, owner: str, repo: str, sha: str) -> CompactTree:
+        tree = CompactTree(sha)
+        async for path, size, blob_sha in self.local.iter_tree(owner, repo, sha):
+            tree.add(path, size, blob_sha)
+        return tree.freeze()
+
+    def _remember(self, tree: CompactTree) -> None:
+        if tree.sha in self._trees:
+            self._trees.move_to_end(tree.sha)
+            return
+        if len(tree) > self.max_files:
+            logger.info(f"Tree {tree.sha} has {len(tree)} files, over TREE_CACHE_MAX_FILES; not cached")
+            return
+        self._trees[tree.sha] = tree
+        self._cached_files += len(tree)
+        while self._cached_files > self.max_files:
+            _, evicted = self._trees.popitem(last=False)
+            self._cached_files -= len(evicted)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "trees": len(self._trees),
+            "files": self._cached_files,
+            "bytes": sum(tree.nbytes for tree in self._trees.values())
+        }
@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from models.schemas import CommitActivity, ContributorData
+from services.concurrency import BACKGROUND, set_priority
+from services.repo_context import RepoContextStore, RepoDataContext
+
+logger = logging.getLogger(__name__)
+
+# GitHub webhook event -> repo context sections it makes stale
+EVENT_SECTIONS = {
+    "push": ("commit_activity", "contributors", "structure", "dependencies", "head"),
+    "star": ("repo_info",),
+    "watch": ("repo_info",),
+    "fork": ("repo_info",),
+    "release": ("repo_info",),
+    "repository": ("repo_info",),
+    "public": ("repo_info",),
+    "member": ("contributors",),
+    "issues": ("repo_info", "issue_analytics"),
+    "pull_request": ("repo_info", "issue_analytics"),
+    "issue_comment": ("issue_analytics",),
+}
+
+# Sections the cached analysis embeds, and how the analysis response normalises each
+ANALYSIS_SECTIONS = {
+    "commit_activity": lambda value: CommitActivity(**value).model_dump(),
+    "contributors": lambda value: ContributorData(**value).model_dump(),
+}
+
+
+def verify_signature(secret: str, body: bytes, signature_header: Optional[str]) -> bool:
+    """Check the X-Hub-Signature-256 header against an HMAC-SHA256 of the raw body"""
+    if not secret or not signature_header or not signature_header.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header[len("sha256="):])
+
+
+def _on_default_branch(payload: Dict[str, Any], repository: Dict[str, Any]) -> bool:
+    """Whether a push moved the default branch (assumed when the payload does not name it)"""
+    default_branch = repository.get("default_branch") or repository.get("master_branch")
+    return not default_branch or payload.get("ref") == f"refs/heads/{default_branch}"
+
+
+def _week_label(day: datetime) -> str:
+    """GitHub commit statistics bucket weeks starting on Sunday"""
+    week_start = day - timedelta(days=(day.weekday() + 1) % 7)
+    return week_start.strftime("%Y-%m-%d")
+
+
+class WebhookProcessor:
+    """Apply GitHub webhook events to the repo context cache, section by section"""
+
+    def __init__(self, contexts: RepoContextStore, incremental_commits: bool = False):
+        self.contexts = contexts
+        # With CommitHistory the section is rebuilt from stored daily counts, topped up from its cursor
+        self.incremental_commits = incremental_commits
+        self._pending: Set["asyncio.Task"] = set()
+
+    async def handle(self, event: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        repository = payload.get("repository") or {}
+        full_name = repository.get("full_name", "")
+        if event not in EVENT_SECTIONS or full_name.count("/") != 1:
+            return {"status": "ignored", "event": event}
+
+        owner, repo = full_name.split("/")
+        # A hook delivery proves the repository exists
+        await self.contexts.clear_missing(owner, repo)
+        context = self.contexts.context(owner, repo)
+        await self.contexts.mark_hooked(context)
+
+        updated: List[str] = []
+        invalidated: List[str] = []
+
+        if "repo_info" in EVENT_SECTIONS[event]:
+            if "stargazers_count" in repository:
+                await self._update_repo_info(context, repository)
+                updated.append("repo_info")
+            else:
+                invalidated.append("repo_info")
+
+        # Commit statistics, contributors and the tree all follow the default branch
+        if event == "push" and _on_default_branch(payload, repository):
+            if self.incremental_commits:
+                invalidated.append("commit_activity")
+            elif await self._apply_push(context, payload):
+                updated.append("commit_activity")
+            else:
+                invalidated.append("commit_activity")
+            # Pushes can add contributors; their counts are only known to GitHub
+            invalidated.append("contributors")
+            # New head commit; the tree for it is fetched (once) on the next read
+            invalidated.extend(("structure", "dependencies", "head"))
+
+        if event == "member":
+            invalidated.append("contributors")
+
+        if "issue_analytics" in EVENT_SECTIONS[event]:
+            # The next read syncs just the changed items from the stored cursor
+            invalidated.append("issue_analytics")
+
+        await self.contexts.invalidate(context, invalidated)
+        stale = [section for section in invalidated if section in ANALYSIS_SECTIONS]
+        if stale and context.analysis is not None:
+            self._refresh_analysis(context, stale)
+        return {
+            "status": "processed",
+            "event": event,
+            "repository": full_name,
+            "updated": updated,
+            "invalidated": invalidated
+        }
+
+    async def _update_repo_info(self, context: RepoDataContext, repository: Dict[str, Any]) -> None:
+        # The webhook repository object carries the same counters as GET /repos/{owner}/{repo}
+        repo_info = {**(context.repo_info or {}), **repository}
+        await self.contexts.store(context, "repo_info", repo_info)
+
+        if context.analysis is not None:
+            stats = {
+                **context.analysis["stats"],
+                "stars": repo_info.get("stargazers_count", 0),
+                "forks": repo_info.get("forks_count", 0),
+                "open_issues": repo_info.get("open_issues_count", 0)
+            }
+            # Patch in place of a refetch; the analysis keeps its original age
+            await self.contexts.store(context, "analysis", {**context.analysis, "stats": stats}, fresh=False)
+
+    def _refresh_analysis(self, context: RepoDataContext, sections: List[str]) -> None:
+        """Refetch invalidated sections after the response is sent and patch them into the cached analysis"""
+        task = asyncio.get_running_loop().create_task(self._patch_analysis(context, sections))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _patch_analysis(self, context: RepoDataContext, sections: List[str]) -> None:
+        set_priority(BACKGROUND, "webhook")
+        values = await self.contexts.get_many(context.owner, context.repo, sections)
+        patch = {}
+        for section, value in values.items():
+            if isinstance(value, dict):
+                patch[section] = ANALYSIS_SECTIONS[section](value)
+            else:
+                logger.warning(f"Could not refresh {section} of {context.owner}/{context.repo}: {str(value)}")
+        if patch and context.analysis is not None:
+            await self.contexts.store(context, "analysis", {**context.analysis, **patch}, fresh=False)
+
+    async def _apply_push(self, context: RepoDataContext, payload: Dict[str, Any]) -> bool:
+        """Add pushed commits to the cached activity; False means the section must be refetched"""
+        if context.commit_activity is None or payload.get("forced") or payload.get("deleted"):
+            return False
+
+        # Commits already seen on another branch are not distinct but are still new to this one
+        pushed = len(payload.get("commits", []))
+        if pushed == 0:
+            return True
+
+        activity = self._add_commits(context.commit_activity, pushed)
+        await self.contexts.store(context, "commit_activity", activity)
+        if context.analysis is not None:
+            await self.contexts.store(context, "analysis", {**context.analysis, "commit_activity": activity}, fresh=False)
+        return True
+
+    @staticmethod
+    def _add_commits(activity: Dict[str, Any], pushed: int) -> Dict[str, Any]:
+        week = _week_label(datetime.now(timezone.utc))
+        weekly_data = [dict(entry) for entry in activity.get("weekly_data", [])]
+        weeks = max(len(weekly_data), 1)
+        if weekly_data and weekly_data[-1]["week"] == week:
+            weekly_data[-1]["commits"] += pushed
+        else:
+            weekly_data.append({"week": week, "commits": pushed})
+        return {
+            **activity,
+            "total_commits": activity.get("total_commits", 0) + pushed,
+            "last_30_days": activity.get("last_30_days", 0) + pushed,
+            # A new week slides the series along; it keeps whatever span it was fetched with
+            "weekly_data": weekly_data[-weeks:]
+        }
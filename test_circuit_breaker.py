@@ -0,0 +1,100 @@
+"""Offline checks of the circuit breaker's half-open probe slot.
+
+Run with: python -m pytest -q test_circuit_breaker.py
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.github_service import GitHubService
+
+
+def _half_open(breaker: CircuitBreaker) -> CircuitBreaker:
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker._opened_at = time.monotonic() - breaker.recovery_timeout
+    assert breaker.state == breaker.HALF_OPEN
+    return breaker
+
+
+def test_only_one_probe_while_half_open():
+    breaker = _half_open(CircuitBreaker("test", failure_threshold=2, recovery_timeout=30))
+    assert breaker.check() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_released_probe_lets_the_next_call_through():
+    breaker = _half_open(CircuitBreaker("test", failure_threshold=2, recovery_timeout=30))
+    breaker.check()
+    breaker.release_probe()
+    assert breaker.check() is True
+
+
+def test_release_after_an_outcome_is_a_no_op():
+    breaker = _half_open(CircuitBreaker("test", failure_threshold=2, recovery_timeout=30))
+    breaker.check()
+    breaker.record_failure()
+    breaker.release_probe()
+    assert breaker.state == breaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_closed_calls_do_not_hold_probe_slots():
+    assert CircuitBreaker("test").check() is False
+
+
+def test_cancelled_github_probe_gives_the_slot_back():
+    service = GitHubService()
+    breaker = service.rest_breaker = _half_open(CircuitBreaker("test", failure_threshold=2, recovery_timeout=30))
+    started = asyncio.Event()
+
+    async def handler(request):
+        started.set()
+        await asyncio.sleep(60)
+        return httpx.Response(200, json={})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            task = asyncio.create_task(service._get(client, "https://api.github.com/repos/a/b"))
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(run())
+    assert breaker.state == breaker.HALF_OPEN
+    assert breaker.check() is True
+
+
+def test_abandoned_groq_stream_gives_the_slot_back():
+    from services.ai_service import AIService
+
+    class Chunk:
+        def __init__(self, text):
+            self.choices = [type("Choice", (), {"delta": type("Delta", (), {"content": text})()})()]
+
+    async def stream():
+        for text in ("one", "two", "three"):
+            yield Chunk(text)
+
+    async def create(**kwargs):
+        return stream()
+
+    service = AIService()
+    breaker = service.breaker = _half_open(CircuitBreaker("test", failure_threshold=2, recovery_timeout=30))
+    service.client.chat.completions.create = create
+
+    async def run():
+        tokens = service._stream_groq_api("prompt")
+        assert await tokens.__anext__() == "one"
+        # The consumer walks away after the first token
+        await tokens.aclose()
+
+    asyncio.run(run())
+    assert breaker.state == breaker.HALF_OPEN
+    assert breaker.check() is True
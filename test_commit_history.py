@@ -0,0 +1,166 @@
+"""Offline checks of commit activity kept from stored daily counts and topped up from the last head seen.
+
+Run with: python -m pytest -q test_commit_history.py
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from services.commit_history import CommitHistory, _week_start
+from services.github_service import GitHubService
+from services.history_store import HistoryStore
+from services.repo_context import RepoContextStore
+
+TODAY = int(time.time() // 86400)
+WEEK = _week_start(TODAY)
+
+
+def _date(day: int) -> str:
+    return datetime.fromtimestamp(day * 86400 + 3600, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _commit(sha: str, day: int):
+    return {"sha": sha, "commit": {"committer": {"date": _date(day)}}}
+
+
+class GitHub:
+    """Mock GitHub serving commit statistics, the head SHA and comparisons between commits"""
+
+    def __init__(self, weeks):
+        self.weeks = weeks
+        self.head = "a1"
+        # (base, head) -> (status, commits oldest first); anything else is an unknown commit
+        self.comparisons = {}
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append(path)
+        if path.endswith("/stats/commit_activity"):
+            return httpx.Response(200, json=self.weeks)
+        if path.endswith("/commits/HEAD"):
+            return httpx.Response(200, text=self.head)
+        if path.endswith("/commits"):
+            return httpx.Response(200, json=[_commit(self.head, TODAY)])
+        if "/compare/" in path:
+            base, head = path.rsplit("/", 1)[1].split("...")
+            if (base, head) not in self.comparisons:
+                return httpx.Response(404, json={"message": "Not Found"})
+            status, commits = self.comparisons[base, head]
+            return httpx.Response(200, json={"status": status, "commits": commits})
+        return httpx.Response(404)
+
+    def history(self):
+        service = GitHubService()
+        service._client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        store = HistoryStore(os.path.join(tempfile.mkdtemp(prefix="commit-history-"), "history.sqlite3"))
+        return CommitHistory(service, store, RepoContextStore(service))
+
+
+def _stats():
+    # Two statistics weeks: three commits on the Monday four weeks ago, one today
+    return [
+        {"week": (WEEK - 28) * 86400, "total": 3, "days": [0, 3, 0, 0, 0, 0, 0]},
+        {"week": WEEK * 86400, "total": 1, "days": [1 if WEEK + offset == TODAY else 0 for offset in range(7)]},
+    ]
+
+
+def _cursor(history):
+    cursor, _ = history.history.get_cursor_sync("acme/widget", "commits")
+    return json.loads(cursor)
+
+
+def _activity(history):
+    return asyncio.run(history.get_commit_activity("acme", "widget"))
+
+
+def test_bootstrap_seeds_days_from_the_statistics_and_records_the_head():
+    github = GitHub(_stats())
+    history = github.history()
+    activity = _activity(history)
+    assert _cursor(history) == {"sha": "a1"}
+    assert activity["total_commits"] == 4
+    assert activity["last_30_days"] == 4
+    # Zero-filled weekly from the first statistics week up to the current one
+    assert [week["commits"] for week in activity["weekly_data"]] == [3, 0, 0, 0, 1]
+
+
+def test_merged_branch_commits_older_than_the_head_are_counted():
+    github = GitHub(_stats())
+    history = github.history()
+    _activity(history)
+
+    github.head = "m1"
+    # A branch started weeks ago, merged today: its commits keep their old dates
+    github.comparisons["a1", "m1"] = ("ahead", [_commit("b1", WEEK - 20), _commit("b2", WEEK - 19),
+                                                 _commit("m1", TODAY)])
+    activity = _activity(history)
+    assert _cursor(history) == {"sha": "m1"}
+    assert activity["total_commits"] == 7
+    assert [week["commits"] for week in activity["weekly_data"]] == [3, 2, 0, 0, 2]
+
+
+def test_unchanged_head_skips_the_comparison():
+    github = GitHub(_stats())
+    history = github.history()
+    _activity(history)
+    github.requests.clear()
+    assert _activity(history)["total_commits"] == 4
+    assert github.requests == ["/repos/acme/widget/commits/HEAD"]
+
+
+def test_force_push_rebuilds_from_the_statistics():
+    github = GitHub(_stats())
+    history = github.history()
+    _activity(history)
+
+    # The old head is gone, so the comparison 404s
+    github.head = "f1"
+    github.weeks = _stats()[1:]
+    activity = _activity(history)
+    assert _cursor(history) == {"sha": "f1"}
+    assert any(path.endswith("/stats/commit_activity") for path in github.requests[-4:])
+    # The rebuilt range replaced the days it covers; older stored days still count
+    assert activity["total_commits"] == 4
+
+
+def test_rewritten_history_rebuilds_from_the_statistics():
+    github = GitHub(_stats())
+    history = github.history()
+    _activity(history)
+
+    github.head = "d1"
+    github.comparisons["a1", "d1"] = ("diverged", [_commit("d1", TODAY)])
+    _activity(history)
+    assert _cursor(history) == {"sha": "d1"}
+    assert github.requests[-1] == "/repos/acme/widget/commits"
+
+
+def test_date_cursor_from_earlier_versions_is_rebuilt():
+    github = GitHub(_stats())
+    history = github.history()
+    history.history.replace_commit_days_sync("acme/widget", {WEEK: 9}, WEEK,
+                                             json.dumps({"date": _date(WEEK), "shas": ["old"]}))
+    assert _activity(history)["total_commits"] == 4
+    assert _cursor(history) == {"sha": "a1"}
+
+
+def test_summary_counts_weeks_and_the_last_30_days():
+    github = GitHub([])
+    history = github.history()
+    history.history.replace_commit_days_sync(
+        "acme/widget", {WEEK - 35: 0, WEEK - 34: 5, TODAY - 1: 2, TODAY: 1}, WEEK - 35, json.dumps({"sha": "a1"})
+    )
+    activity = asyncio.run(history._summarize("acme/widget"))
+    assert activity["total_commits"] == 8
+    assert activity["last_30_days"] == 3
+    assert activity["weekly_data"][0] == {
+        "week": datetime.fromtimestamp((WEEK - 35) * 86400, tz=timezone.utc).strftime("%Y-%m-%d"), "commits": 5
+    }
+    assert len(activity["weekly_data"]) == 6
+    assert sum(week["commits"] for week in activity["weekly_data"][-2:]) == 3
@@ -0,0 +1,143 @@
+"""Offline checks of the fair queue, the AIMD limiter and how requests are assigned to flows.
+
+Run with: python -m pytest -q test_concurrency.py
+"""
+import asyncio
+
+from services.concurrency import (
+    BACKGROUND, INTERACTIVE, AdaptiveLimiter, FairQueue, PriorityMiddleware, client_key, request_lane
+)
+
+
+def _drain(queue, futures):
+    order = []
+    while True:
+        waiter = queue.pop()
+        if waiter is None:
+            return order
+        order.append(futures[waiter])
+
+
+def test_lanes_share_by_weight():
+    async def run():
+        loop = asyncio.get_running_loop()
+        queue = FairQueue({INTERACTIVE: 4, BACKGROUND: 1})
+        futures = {}
+        for index in range(8):
+            for lane in (BACKGROUND, INTERACTIVE):
+                waiter = loop.create_future()
+                futures[waiter] = lane
+                queue.push(waiter, lane, "client")
+        return _drain(queue, futures)
+
+    order = asyncio.run(run())
+    # Four interactive waiters are served for every background one
+    assert order[:5].count(INTERACTIVE) == 4
+
+
+def test_clients_in_a_lane_alternate():
+    async def run():
+        loop = asyncio.get_running_loop()
+        queue = FairQueue({INTERACTIVE: 1})
+        futures = {}
+        for client, count in (("greedy", 6), ("polite", 2)):
+            for _ in range(count):
+                waiter = loop.create_future()
+                futures[waiter] = client
+                queue.push(waiter, INTERACTIVE, client)
+        return _drain(queue, futures)
+
+    assert asyncio.run(run())[:4] == ["greedy", "polite", "greedy", "polite"]
+
+
+def test_cancelled_waiters_are_skipped():
+    async def run():
+        loop = asyncio.get_running_loop()
+        queue = FairQueue({INTERACTIVE: 1})
+        first, second = loop.create_future(), loop.create_future()
+        queue.push(first, INTERACTIVE, "a")
+        queue.push(second, INTERACTIVE, "b")
+        first.cancel()
+        return queue.pop() is second and queue.pop() is None
+
+    assert asyncio.run(run())
+
+
+def test_limit_grows_additively_while_used():
+    limiter = AdaptiveLimiter("test", initial=2, max_limit=10, tolerance=2.0)
+    limiter.in_flight = 1
+    for _ in range(10):
+        limiter._update(0.1, dropped=False)
+    assert 2 < limiter.limit < 10
+
+
+def test_limit_backs_off_on_pushback():
+    limiter = AdaptiveLimiter("test", initial=10, max_limit=10, backoff=0.5)
+    limiter._update(0.1, dropped=True)
+    assert limiter.limit == 5
+    assert limiter.decreases == 1
+
+
+def test_limit_backs_off_on_latency():
+    limiter = AdaptiveLimiter("test", initial=10, max_limit=10, backoff=0.5, tolerance=2.0)
+    limiter._update(0.1, dropped=False)
+    limiter._last_decrease = -1.0
+    limiter._update(1.0, dropped=False)
+    assert limiter.limit == 5
+
+
+def test_waiters_get_slots_as_they_free_up():
+    async def run():
+        limiter = AdaptiveLimiter("test", initial=1, max_limit=1)
+        order = []
+
+        async def call(name):
+            async with limiter.acquire():
+                order.append(name)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(call(index) for index in range(3)))
+        return order, limiter.in_flight
+
+    order, in_flight = asyncio.run(run())
+    assert order == [0, 1, 2]
+    assert in_flight == 0
+
+
+def _flow(middleware, headers, client=("10.0.0.1", 1234)):
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["lane"], seen["key"] = request_lane.get(), client_key.get()
+
+    middleware.app = app
+    scope = {"type": "http", "client": client, "headers": [(k.encode(), v.encode()) for k, v in headers.items()]}
+    asyncio.run(middleware(scope, None, None))
+    return seen
+
+
+def test_configured_api_keys_are_trusted():
+    middleware = PriorityMiddleware(None, api_keys=frozenset({"secret"}), proxy_hops=0)
+    assert _flow(middleware, {"x-api-key": "secret"})["key"] == "key:secret"
+
+
+def test_unknown_api_keys_fall_back_to_the_ip():
+    middleware = PriorityMiddleware(None, api_keys=frozenset({"secret"}), proxy_hops=0)
+    assert _flow(middleware, {"x-api-key": "made-up"})["key"] == "ip:10.0.0.1"
+
+
+def test_forwarded_ip_is_read_past_trusted_proxies_only():
+    middleware = PriorityMiddleware(None, api_keys=frozenset(), proxy_hops=1)
+    # The client claims to be 1.1.1.1; the proxy appended the address it actually saw
+    seen = _flow(middleware, {"x-forwarded-for": "1.1.1.1, 203.0.113.7"})
+    assert seen["key"] == "ip:203.0.113.7"
+
+
+def test_forwarded_header_ignored_without_proxies():
+    middleware = PriorityMiddleware(None, api_keys=frozenset(), proxy_hops=0)
+    assert _flow(middleware, {"x-forwarded-for": "1.1.1.1"})["key"] == "ip:10.0.0.1"
+
+
+def test_background_header_selects_the_lane():
+    middleware = PriorityMiddleware(None, api_keys=frozenset(), proxy_hops=0)
+    assert _flow(middleware, {"x-priority": "background"})["lane"] == BACKGROUND
@@ -0,0 +1,135 @@
+"""Offline checks of the manifest parsers and of blob fetching shared across repositories.
+
+Run with: python -m pytest -q test_dependency_analyzer.py
+"""
+import asyncio
+
+import httpx
+
+from services.dependency_analyzer import (
+    DependencyAnalyzer, parse_cargo_toml, parse_go_mod, parse_package_json, parse_pom_xml, parse_pyproject,
+    parse_requirements,
+)
+from services.github_service import GitHubService
+from services.repo_context import RepoContextStore
+from services.tree_analyzer import TreeAnalyzer
+
+
+def test_package_json():
+    content = b"""{
+        "dependencies": {"react": "^18.2.0"},
+        "peerDependencies": {"react-dom": ">=18"},
+        "devDependencies": {"jest": "29"}
+    }"""
+    assert parse_package_json(content) == [
+        ("react", "^18.2.0", False), ("react-dom", ">=18", False), ("jest", "29", True),
+    ]
+
+
+def test_requirements_skip_options_comments_and_urls():
+    content = b"""
+# pinned
+Requests[socks] >=2.0 ; python_version < "3.8"
+-r dev.txt
+-e .
+fastapi==0.110  # web
+git+https://github.com/acme/lib.git
+"""
+    assert parse_requirements(content) == [("requests", ">=2.0", False), ("fastapi", "==0.110", False)]
+
+
+def test_pyproject_pep621_and_poetry():
+    content = b"""
+[project]
+dependencies = ["httpx>=0.28", "pydantic"]
+[project.optional-dependencies]
+test = ["pytest>=8"]
+
+[tool.poetry.dependencies]
+python = "^3.11"
+Django = {version = "^5.0", extras = ["argon2"]}
+[tool.poetry.dev-dependencies]
+black = "24.1"
+[tool.poetry.group.docs.dependencies]
+mkdocs = "*"
+"""
+    assert parse_pyproject(content) == [
+        ("httpx", ">=0.28", False), ("pydantic", "", False), ("pytest", ">=8", True),
+        ("django", "^5.0", False), ("black", "24.1", True), ("mkdocs", "*", True),
+    ]
+
+
+def test_go_mod_blocks_single_lines_and_indirect():
+    content = b"""module example.com/widget
+
+go 1.22
+
+require github.com/spf13/cobra v1.8.0
+
+require (
+    golang.org/x/sync v0.6.0
+    // a comment
+    golang.org/x/sys v0.17.0 // indirect
+)
+"""
+    assert parse_go_mod(content) == [
+        ("github.com/spf13/cobra", "v1.8.0", False), ("golang.org/x/sync", "v0.6.0", False),
+        ("golang.org/x/sys", "v0.17.0", True),
+    ]
+
+
+def test_cargo_toml():
+    content = b"""
+[package]
+name = "widget"
+[dependencies]
+serde = { version = "1.0", features = ["derive"] }
+tokio = "1"
+[dev-dependencies]
+proptest = "1.4"
+[build-dependencies]
+cc = "1"
+"""
+    assert parse_cargo_toml(content) == [
+        ("serde", "1.0", False), ("tokio", "1", False), ("proptest", "1.4", True), ("cc", "1", True),
+    ]
+
+
+def test_pom_xml_reads_only_project_dependencies():
+    content = b"""<project xmlns="http://maven.apache.org/POM/4.0.0">
+  <dependencyManagement><dependencies>
+    <dependency><groupId>org.managed</groupId><artifactId>bom</artifactId><version>1</version></dependency>
+  </dependencies></dependencyManagement>
+  <dependencies>
+    <dependency><groupId>com.google.guava</groupId><artifactId>guava</artifactId><version>33.0</version></dependency>
+    <dependency>
+      <groupId>junit</groupId><artifactId>junit</artifactId><version>4.13</version><scope>test</scope>
+    </dependency>
+  </dependencies>
+</project>"""
+    assert parse_pom_xml(content) == [("com.google.guava:guava", "33.0", False), ("junit:junit", "4.13", True)]
+
+
+def test_concurrent_analyses_fetch_a_shared_blob_once():
+    blob_requests = []
+
+    async def handler(request):
+        blob_requests.append(request.url.path)
+        # Both callers are waiting before the first fetch completes
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, content=b"httpx>=0.28\n")
+
+    service = GitHubService()
+    service._client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    contexts = RepoContextStore(service)
+    analyzer = DependencyAnalyzer(service, None, TreeAnalyzer(service, None, contexts), contexts)
+
+    async def run():
+        return await asyncio.gather(
+            analyzer._blob("acme", "widget", "01" * 20), analyzer._blob("fork", "widget", "01" * 20)
+        )
+
+    assert asyncio.run(run()) == [b"httpx>=0.28\n", b"httpx>=0.28\n"]
+    assert len(blob_requests) == 1
+    assert asyncio.run(analyzer._blob("acme", "widget", "01" * 20)) == b"httpx>=0.28\n"
+    assert len(blob_requests) == 1
@@ -0,0 +1,133 @@
+"""Offline checks of the bulk export encoders and of what each dataset reads.
+
+Run with: python -m pytest -q test_exporter.py
+"""
+import asyncio
+import json
+import os
+import tempfile
+from datetime import date
+
+import pytest
+
+from services.exporter import DATASETS, Exporter, ExportFilters, encode_arrow, encode_csv, encode_ndjson
+from services.github_service import GitHubService
+from services.growth_tracker import GrowthTracker
+from services.history_store import HistoryStore
+from services.repo_context import RepoContextStore
+from utils.serialization import dumps
+
+COLUMNS = (("repository", "string"), ("commits", "int"), ("analyzed_at", "timestamp"))
+
+
+async def _rows(rows):
+    for row in rows:
+        yield row
+
+
+def _collect(chunks) -> bytes:
+    async def run():
+        return b"".join([chunk async for chunk in chunks])
+    return asyncio.run(run())
+
+
+def _epoch_day(day: date) -> int:
+    return (day - date(1970, 1, 1)).days
+
+
+def test_ndjson_writes_one_object_per_row_with_iso_timestamps():
+    body = _collect(encode_ndjson(COLUMNS, _rows([("acme/a", 3, 0), ("acme/b", None, None)]), batch_rows=1))
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert lines == [
+        {"repository": "acme/a", "commits": 3, "analyzed_at": "1970-01-01T00:00:00Z"},
+        {"repository": "acme/b", "commits": None, "analyzed_at": None},
+    ]
+
+
+def test_csv_writes_a_header_and_quotes_values():
+    body = _collect(encode_csv(COLUMNS, _rows([("acme/a,b", 3, 86400)]), batch_rows=10))
+    assert body.decode().splitlines() == ["repository,commits,analyzed_at", '"acme/a,b",3,1970-01-02T00:00:00Z']
+
+
+def test_empty_csv_export_is_just_the_header():
+    assert _collect(encode_csv(COLUMNS, _rows([]), batch_rows=10)) == b"repository,commits,analyzed_at\n"
+
+
+@pytest.mark.parametrize("parquet", [False, True])
+def test_arrow_and_parquet_read_back_with_typed_columns(parquet):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    rows = [("acme/a", 3, 0), ("acme/b", None, None), ("acme/c", 7, 86400)]
+    body = _collect(encode_arrow(COLUMNS, _rows(rows), batch_rows=2, parquet=parquet))
+    if parquet:
+        reader = pyarrow.parquet.ParquetFile(pyarrow.BufferReader(body))
+        # One row group per chunk of rows; Parquet has no second resolution, so it stores milliseconds
+        assert reader.metadata.num_row_groups == 2
+        table = reader.read()
+    else:
+        table = pyarrow.ipc.open_stream(pyarrow.BufferReader(body)).read_all()
+        assert len(table.to_batches()) == 2
+    assert table.schema.field("commits").type == pyarrow.int64()
+    assert table.schema.field("analyzed_at").type.tz == "UTC"
+    assert table.column("repository").to_pylist() == ["acme/a", "acme/b", "acme/c"]
+    assert table.column("commits").to_pylist() == [3, None, 7]
+    timestamps = table.column("analyzed_at").to_pylist()
+    assert [value.timestamp() if value else None for value in timestamps] == [0, None, 86400]
+
+
+def _exporter():
+    history = HistoryStore(os.path.join(tempfile.mkdtemp(prefix="export-"), "history.sqlite3"))
+    exporter = Exporter(history, GrowthTracker(max_repos=10), RepoContextStore(GitHubService()))
+    analysis = {
+        "owner": "acme", "repo": "widget",
+        "languages": {"languages": {"Python": 100.0}},
+        # The cached analysis only has the last few weeks
+        "commit_activity": {"weekly_data": [{"week": "2024-03-03", "commits": 1}]},
+        "contributors": {"top_contributors": [{"username": "dev", "commits": 4, "avatar_url": ""}]},
+    }
+    history.save_analysis_sync("acme/widget", "Python", 1700000000.0, dumps(analysis))
+    return exporter, history
+
+
+def _ndjson(exporter, dataset, filters=ExportFilters()):
+    body = _collect(exporter.stream(dataset, "ndjson", filters))
+    return [json.loads(line) for line in body.decode().splitlines()]
+
+
+def test_commits_come_from_the_stored_daily_counts():
+    exporter, history = _exporter()
+    # Two commits in the week of Sunday 2021-01-03, years before the analysis' own series starts
+    counts = {_epoch_day(date(2021, 1, 4)): 1, _epoch_day(date(2021, 1, 8)): 1, _epoch_day(date(2021, 1, 12)): 5}
+    history.replace_commit_days_sync("acme/widget", counts, min(counts), "{}")
+    rows = _ndjson(exporter, "commits", ExportFilters(until=1610928000.0))  # 2021-01-18
+    assert rows == [
+        {"repository": "acme/widget", "week": "2021-01-03", "commits": 2},
+        {"repository": "acme/widget", "week": "2021-01-10", "commits": 5},
+        {"repository": "acme/widget", "week": "2021-01-17", "commits": 0},
+    ]
+
+
+def test_commits_fall_back_to_the_analysis_when_never_synced():
+    exporter, _ = _exporter()
+    assert _ndjson(exporter, "commits") == [{"repository": "acme/widget", "week": "2024-03-03", "commits": 1}]
+
+
+def test_contributors_are_the_latest_analysis_snapshot():
+    exporter, _ = _exporter()
+    rows = _ndjson(exporter, "contributors")
+    assert [tuple(row) for row in rows] == [tuple(name for name, _ in DATASETS["contributors"])]
+    assert rows[0]["username"] == "dev"
+    assert rows[0]["analyzed_at"] == "2023-11-14T22:13:20Z"
+
+
+def test_ndjson_and_arrow_agree_on_a_dataset():
+    pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+
+    exporter, _ = _exporter()
+    table = pyarrow.ipc.open_stream(_collect(exporter.stream("contributors", "arrow", ExportFilters()))).read_all()
+    assert table.to_pylist() == [
+        {**row, "analyzed_at": table.column("analyzed_at")[0].as_py()} for row in _ndjson(exporter, "contributors")
+    ]
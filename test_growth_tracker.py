@@ -0,0 +1,82 @@
+"""Offline checks of the delta-encoded growth series and the trending ranking.
+
+Run with: python -m pytest -q test_growth_tracker.py
+"""
+import time
+
+from services.growth_tracker import GrowthTracker, RepoSeries
+
+DAY = 86400
+
+
+def _info(repo_id, stars, forks=0, issues=0):
+    return {"id": repo_id, "full_name": f"acme/repo{repo_id}", "stargazers_count": stars,
+            "forks_count": forks, "open_issues_count": issues}
+
+
+def test_series_round_trips_through_deltas():
+    series = RepoSeries(1, "acme/repo1", 1000, (10, 2, 5))
+    series.append(5000, (15, 3, 4), min_interval=0, max_samples=100)
+    series.append(9000, (12, 3, 9), min_interval=0, max_samples=100)
+    assert series.samples() == [(1000, 10, 2, 5), (5000, 15, 3, 4), (9000, 12, 3, 9)]
+    assert series.value_at(6000) == [5000, 15, 3, 4]
+    assert series.value_at(0) == [1000, 10, 2, 5]
+
+
+def test_close_samples_fold_into_the_previous_one():
+    series = RepoSeries(1, "acme/repo1", 0, (10, 0, 0))
+    series.append(3600, (11, 0, 0), min_interval=3600, max_samples=100)
+    series.append(4000, (13, 1, 0), min_interval=3600, max_samples=100)
+    assert series.samples() == [(0, 10, 0, 0), (4000, 13, 1, 0)]
+
+
+def test_compaction_keeps_the_newest_samples():
+    series = RepoSeries(1, "acme/repo1", 0, (0, 0, 0))
+    for step in range(1, 10):
+        series.append(step * 100, (step, 0, 0), min_interval=0, max_samples=4)
+    assert series.samples() == [(600, 6, 0, 0), (700, 7, 0, 0), (800, 8, 0, 0), (900, 9, 0, 0)]
+
+
+def test_growth_per_day_over_the_window():
+    series = RepoSeries(1, "acme/repo1", 0, (100, 0, 0))
+    series.append(DAY, (110, 0, 0), min_interval=0, max_samples=100)
+    series.append(2 * DAY, (130, 0, 0), min_interval=0, max_samples=100)
+    assert series.growth("stars", DAY, 2 * DAY) == (20, 20.0)
+    assert series.growth("stars", 2 * DAY, 2 * DAY) == (30, 15.0)
+
+
+def test_trending_orders_by_velocity():
+    tracker = GrowthTracker(max_repos=10, max_samples=50, min_interval=0, window=7 * DAY, top_k=5)
+    now = int(time.time())
+    for repo_id, gained in ((1, 10), (2, 50), (3, 30)):
+        tracker.record(_info(repo_id, 100), timestamp=now - DAY)
+        tracker.record(_info(repo_id, 100 + gained), timestamp=now)
+    assert [entry["repo"] for entry in tracker.trending(limit=3)] == ["acme/repo2", "acme/repo3", "acme/repo1"]
+
+
+def test_trending_velocity_decays_when_sampling_stops():
+    window = 7 * DAY
+    tracker = GrowthTracker(max_repos=10, max_samples=50, min_interval=0, window=window, top_k=5)
+    now = int(time.time())
+    # repo1 grew fast but was last seen before the window started; repo2 grows slowly and is current
+    tracker.record(_info(1, 0), timestamp=now - window - 2 * DAY)
+    tracker.record(_info(1, 1000), timestamp=now - window - DAY)
+    tracker.record(_info(2, 0), timestamp=now - DAY)
+    tracker.record(_info(2, 5), timestamp=now)
+
+    ranked = tracker.trending(limit=2)
+    assert ranked[0]["repo"] == "acme/repo2"
+    assert ranked[1]["growth_per_day"] == 0
+
+
+def test_default_and_explicit_rankings_agree():
+    tracker = GrowthTracker(max_repos=10, max_samples=50, min_interval=0, window=7 * DAY, top_k=5)
+    now = int(time.time())
+    tracker.record(_info(1, 0), timestamp=now - 10 * DAY)
+    tracker.record(_info(1, 500), timestamp=now - 9 * DAY)
+    tracker.record(_info(2, 0), timestamp=now - 2 * DAY)
+    tracker.record(_info(2, 20), timestamp=now)
+    cached = [entry["repo"] for entry in tracker.trending(limit=2)]
+    # A window one second longer takes the uncached path, which evaluates every series against now
+    fresh = [entry["repo"] for entry in tracker.trending(limit=2, window=7 * DAY + 1)]
+    assert cached == fresh
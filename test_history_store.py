@@ -0,0 +1,75 @@
+"""Offline checks of the SQLite history store: sync cursors, issues, daily commits and stored analyses.
+
+Run with: python -m pytest -q test_history_store.py
+"""
+import os
+import tempfile
+
+from services.history_store import HistoryStore
+
+
+def _store():
+    return HistoryStore(os.path.join(tempfile.mkdtemp(prefix="history-"), "history.sqlite3"))
+
+
+def _issue(number, author="alice", created_at=1000, updated_at=1000, open_=1):
+    # (number, is_pr, open, author, created_at, updated_at, closed_at, merged_at)
+    return (number, 0, open_, author, created_at, updated_at, None, None)
+
+
+def test_cursor_defaults_and_round_trips():
+    store = _store()
+    assert store.get_cursor_sync("acme/widget", "issues") == (None, False)
+    store.set_cursor_sync("acme/widget", "issues", "2024-01-01T00:00:00Z", True)
+    assert store.get_cursor_sync("acme/widget", "issues") == ("2024-01-01T00:00:00Z", True)
+    assert store.get_cursor_sync("acme/widget", "issue_comments") == (None, False)
+
+
+def test_first_response_is_the_earliest_reply_from_someone_else():
+    store = _store()
+    store.upsert_issues_sync("acme/widget", [_issue(1)])
+    store.record_responses_sync("acme/widget", [(1, "alice", 1100), (1, "bob", 1500), (2, "bob", 1200)])
+    store.record_responses_sync("acme/widget", [(1, "carol", 1300), (1, "dave", 1900)])
+    window = store.issue_window_sync("acme/widget", 0, 0)
+    assert window["first_responses"] == [300]
+
+    # Refreshing the issue keeps the response already recorded
+    store.upsert_issues_sync("acme/widget", [_issue(1, updated_at=2000, open_=0)])
+    window = store.issue_window_sync("acme/widget", 0, 0)
+    assert window["first_responses"] == [300]
+    assert window["open_issues"] == 0
+    assert window["tracked"] == 1
+
+
+def test_commit_days_add_up_and_replace_from_a_day():
+    store = _store()
+    store.replace_commit_days_sync("acme/widget", {10: 1, 11: 2, 12: 3}, 10, '{"sha": "a"}')
+    store.add_commit_days_sync("acme/widget", {12: 4, 13: 1}, '{"sha": "b"}')
+    assert store.commit_days_sync("acme/widget", 0) == [(10, 1), (11, 2), (12, 7), (13, 1)]
+    assert store.get_cursor_sync("acme/widget", "commits") == ('{"sha": "b"}', True)
+
+    store.replace_commit_days_sync("acme/widget", {12: 5}, 12, '{"sha": "c"}')
+    assert store.commit_days_sync("acme/widget", 11) == [(11, 2), (12, 5)]
+    assert store.commit_days_sync("other/repo", 0) == []
+
+
+def test_analyses_page_by_key_with_filters():
+    store = _store()
+    for repo, language, analyzed_at in (("acme/a", "Python", 10.0), ("acme/b", "Go", 20.0),
+                                        ("zeta/c", "Python", 30.0)):
+        store.save_analysis_sync(repo, language, analyzed_at, b"{}")
+    store.save_analysis_sync("acme/a", "Python", 40.0, b'{"v": 2}')
+
+    assert [row[0] for row in store.analyses_page_sync("", 2)] == ["acme/a", "acme/b"]
+    assert [row[0] for row in store.analyses_page_sync("acme/b", 2)] == ["zeta/c"]
+    assert [row[0] for row in store.analyses_page_sync("", 10, owner="ACME", language="python")] == ["acme/a"]
+    assert store.analyses_page_sync("", 10, since=35.0) == [("acme/a", 40.0, b'{"v": 2}')]
+    assert [row[0] for row in store.analyses_page_sync("", 10, until=30.0)] == ["acme/b"]
+
+
+def test_search_document_is_replaced_not_duplicated():
+    store = _store()
+    store.index_analysis_sync("acme/widget", {"name": "acme/widget", "description": "old parser"})
+    store.index_analysis_sync("acme/widget", {"name": "acme/widget", "description": "new renderer"})
+    assert store.search_sync('"parser"', 10) == []
+    assert [row[0] for row in store.search_sync('"renderer"', 10)] == ["acme/widget"]
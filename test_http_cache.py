@@ -0,0 +1,93 @@
+"""Offline checks of ETag validation and negotiated compression.
+
+Run with: python -m pytest -q test_http_cache.py
+"""
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from utils.compression import CompressionMiddleware, negotiate_encoding
+from utils.http_cache import cached_json_response, compute_etag, etag_matches
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+
+@app.get("/big")
+async def big(request: Request):
+    return cached_json_response(request, {"items": list(range(200))}, "stats")
+
+
+@app.get("/small")
+async def small(request: Request):
+    return cached_json_response(request, {"ok": True}, "stats")
+
+
+@app.get("/degraded")
+async def degraded(request: Request):
+    return cached_json_response(request, {"total_contributors": 0, "top_contributors": [], "degraded": True},
+                                "contributors")
+
+
+client = TestClient(app)
+
+
+def test_etag_matches_weakly_and_across_encodings():
+    etag = compute_etag(b"body")
+    assert etag_matches(etag, etag)
+    assert etag_matches("W/" + etag, etag)
+    assert etag_matches(etag[:-1] + '-gzip"', etag)
+    assert etag_matches('"other", ' + etag[:-1] + '-br"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches("", etag)
+
+
+def test_encoding_negotiation():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("") is None
+
+
+def test_compressed_response_has_an_encoding_specific_etag():
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_uncompressed_responses_still_vary():
+    small_response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small_response.headers
+    assert small_response.headers["vary"] == "Accept-Encoding"
+
+    identity = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["vary"] == "Accept-Encoding"
+
+
+def test_not_modified_repeats_the_encoded_etag():
+    first = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["etag"]
+    revalidated = client.get("/big", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.headers["vary"] == "Accept-Encoding"
+
+
+def test_not_modified_keeps_the_identity_etag():
+    first = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    revalidated = client.get("/small", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == first.headers["etag"]
+
+
+def test_compressed_body_round_trips():
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    # The client decodes the gzip body transparently
+    assert response.json() == {"items": list(range(200))}
+
+
+def test_degraded_payload_is_not_stored_by_caches():
+    response = client.get("/degraded")
+    assert response.headers["cache-control"] == "no-store"
+    assert client.get("/small").headers["cache-control"].startswith("public, max-age=")
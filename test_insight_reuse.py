@@ -0,0 +1,98 @@
+"""Offline checks of README MinHash signatures, the LSH index and which insights may be reused.
+
+Run with: python -m pytest -q test_insight_reuse.py
+"""
+from models.records import ContributorSummary
+from services.insight_reuse import (
+    README_MISSING, InsightReuse, ReadmeIndex, readme_signature, similarity
+)
+
+README = " ".join(f"word{i}" for i in range(400))
+INSIGHT = {"content": "Summary", "source": "llm"}
+
+
+def _analysis():
+    contributors = {"total_contributors": 1, "active_contributors": 1,
+                    "top_contributors": [{"username": "dev", "commits": 3, "avatar_url": ""}]}
+    return {
+        "languages": {"languages": {"Python": 100.0}},
+        "dependencies": None,
+        "contributors": contributors,
+        "ai_insights": {name: dict(INSIGHT) for name in InsightReuse.INSIGHTS},
+    }
+
+
+def _inputs(repo_info):
+    analysis = _analysis()
+    return {
+        "repo_info": repo_info,
+        "languages": {"Python": 100.0},
+        "dependencies": None,
+        "contributors": ContributorSummary.from_dict(analysis["contributors"]),
+    }
+
+
+def _info(**overrides):
+    return {"name": "widget", "description": "A widget", "language": "Python", "topics": ["tools"],
+            "stargazers_count": 10, **overrides}
+
+
+def test_identical_readmes_have_identical_signatures():
+    assert similarity(readme_signature(README), readme_signature(README)) == 1.0
+
+
+def test_unrelated_readmes_are_dissimilar():
+    other = " ".join(f"other{i}" for i in range(400))
+    assert similarity(readme_signature(README), readme_signature(other)) < 0.1
+
+
+def test_small_edits_stay_similar():
+    edited = README.replace("word200", "changed")
+    assert similarity(readme_signature(README), readme_signature(edited)) > 0.8
+
+
+def test_missing_readme_has_no_signature():
+    assert readme_signature(None) is None
+    assert readme_signature(README_MISSING) is None
+    assert similarity(None, readme_signature(README)) == 0.0
+
+
+def test_signature_only_reads_the_first_chars():
+    capped = readme_signature(README, max_chars=1000)
+    assert capped == readme_signature(README[:1000])
+    assert capped == readme_signature(README + " tail" * 1000, max_chars=1000)
+
+
+def test_lsh_finds_near_duplicates_only():
+    index = ReadmeIndex(max_entries=10)
+    index.add("acme/original", readme_signature(README))
+    index.add("acme/unrelated", readme_signature(" ".join(f"other{i}" for i in range(400))))
+    assert index.candidates(readme_signature(README.replace("word10", "x"))) == {"acme/original"}
+
+
+def test_lsh_index_is_bounded():
+    index = ReadmeIndex(max_entries=2)
+    for i in range(3):
+        index.add(f"acme/repo{i}", readme_signature(f"{README} extra{i}"))
+    assert index.get("acme/repo0") is None
+    assert index.get("acme/repo2") is not None
+
+
+def test_summary_reused_when_readme_and_metadata_match():
+    reuse = InsightReuse(contexts=None)
+    reused = reuse._reusable("acme/original", _inputs(_info()), _analysis(), 1.0, _info(stargazers_count=99))
+    assert set(reused) == set(InsightReuse.INSIGHTS)
+    assert reused["repository_summary"]["reused_from"] == "acme/original"
+
+
+def test_summary_regenerated_when_metadata_differs():
+    reuse = InsightReuse(contexts=None)
+    for changed in (_info(name="gadget"), _info(description="Something else"), _info(topics=["games"])):
+        reused = reuse._reusable("acme/original", _inputs(_info()), _analysis(), 1.0, changed)
+        assert "repository_summary" not in reused
+        assert "language_analysis" in reused
+
+
+def test_summary_not_reused_without_the_sources_metadata():
+    reuse = InsightReuse(contexts=None)
+    assert "repository_summary" not in reuse._reusable("acme/original", _inputs(_info()), _analysis(), 1.0, None)
@@ -0,0 +1,106 @@
+"""Offline checks that concurrent insight streams and blocking analyses share one LLM run.
+
+Run with: python -m pytest -q test_insight_stream.py
+"""
+import asyncio
+
+from models.records import ContributorSummary, RepoStatsRecord
+from services.analyzer import RepositoryAnalyzer
+from services.github_service import GitHubService
+from services.repo_context import RepoContextStore
+
+NAMES = ("repository_summary", "language_analysis", "contribution_patterns")
+REPO_INFO = {"name": "widget", "html_url": "https://github.com/acme/widget", "stargazers_count": 3}
+
+
+class AI:
+    """Streams two tokens per insight, pausing after the first until released"""
+
+    def __init__(self, fail=False):
+        self.runs = 0
+        self.fail = fail
+        self.release = asyncio.Event()
+
+    async def stream_three_insights(self, repo_info, readme, language_data, contributors, reuse):
+        self.runs += 1
+        for name in NAMES:
+            yield "delta", name, "a"
+            await self.release.wait()
+            if self.fail:
+                raise RuntimeError("groq went away")
+            yield "delta", name, "b"
+            yield "done", name, "ab"
+
+
+def _inputs():
+    return {
+        "repo_info": REPO_INFO,
+        "stats": RepoStatsRecord.from_repo_info(REPO_INFO),
+        "languages": {"Python": 100.0},
+        "commit_activity": {"total_commits": 0, "last_30_days": 0, "weekly_data": []},
+        "readme": "",
+        "contributors": ContributorSummary.from_dict({}),
+        "dependencies": None,
+    }
+
+
+def _analyzer(ai):
+    contexts = RepoContextStore(GitHubService())
+    return RepositoryAnalyzer(contexts, ai), contexts
+
+
+async def _collect(stream):
+    return [event async for event in stream.subscribe()]
+
+
+def test_concurrent_streams_share_one_run():
+    async def run():
+        ai = AI()
+        analyzer, contexts = _analyzer(ai)
+        first = analyzer.stream_analysis("acme", "widget", _inputs())
+        reading = asyncio.create_task(_collect(first))
+        await asyncio.sleep(0)
+        # A second client arrives after the first token went out
+        assert analyzer.insight_stream("acme", "widget") is first
+        late = asyncio.create_task(_collect(analyzer.stream_analysis("acme", "widget", _inputs())))
+        # And a blocking analysis joins through the in-flight map
+        blocking = asyncio.create_task(analyzer.analyze("acme", "widget"))
+        await asyncio.sleep(0)
+        ai.release.set()
+        return ai, contexts, await reading, await late, await blocking
+
+    ai, contexts, first, late, blocking = asyncio.run(run())
+    assert ai.runs == 1
+    assert late == first
+    assert first[0] == ("delta", "repository_summary", "a")
+    assert first[-1] == ("analysis", None, blocking)
+    assert {name: item["content"] for name, item in blocking["ai_insights"].items()} == dict.fromkeys(NAMES, "ab")
+    assert contexts.peek("acme", "widget").analysis == blocking
+
+
+def test_run_is_forgotten_once_finished():
+    async def run():
+        ai = AI()
+        ai.release.set()
+        analyzer, contexts = _analyzer(ai)
+        await _collect(analyzer.stream_analysis("acme", "widget", _inputs()))
+        await asyncio.sleep(0)
+        return analyzer, contexts.peek("acme", "widget")
+
+    analyzer, context = asyncio.run(run())
+    assert analyzer.insight_stream("acme", "widget") is None
+    assert "analysis" not in context.inflight
+
+
+def test_failure_reaches_every_subscriber():
+    async def run():
+        ai = AI(fail=True)
+        analyzer, _ = _analyzer(ai)
+        stream = analyzer.stream_analysis("acme", "widget", _inputs())
+        readers = [asyncio.create_task(_collect(stream)) for _ in range(2)]
+        await asyncio.sleep(0)
+        ai.release.set()
+        return await asyncio.gather(*readers, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
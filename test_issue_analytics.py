@@ -0,0 +1,126 @@
+"""Offline checks of the issue/PR history sync and the throughput metrics computed from it.
+
+Run with: python -m pytest -q test_issue_analytics.py
+"""
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from services.github_service import GitHubService
+from services.history_store import HistoryStore
+from services.issue_analytics import IssueAnalytics
+from services.repo_context import RepoContextStore
+
+NOW = int(time.time())
+
+
+def _ts(seconds_ago: int) -> str:
+    return datetime.fromtimestamp(NOW - seconds_ago, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _issue(number, created_ago, updated_ago, pr=False, closed_ago=None, merged_ago=None, author="alice"):
+    return {
+        "number": number, "user": {"login": author}, "state": "open" if closed_ago is None else "closed",
+        "created_at": _ts(created_ago), "updated_at": _ts(updated_ago),
+        "closed_at": _ts(closed_ago) if closed_ago is not None else None,
+        **({"pull_request": {"merged_at": _ts(merged_ago) if merged_ago is not None else None}} if pr else {}),
+    }
+
+
+class GitHub:
+    """Mock GitHub listing issues and comments two per page, oldest update first, honouring `since`"""
+
+    PAGE = 2
+
+    def __init__(self):
+        self.issues = []
+        self.comments = []
+        self.requests = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        items = self.comments if request.url.path.endswith("/comments") else self.issues
+        since = request.url.params.get("since")
+        listed = sorted((i for i in items if not since or i["updated_at"] >= since), key=lambda i: i["updated_at"])
+        page = int(request.url.params.get("page", "1"))
+        headers = {}
+        if len(listed) > page * self.PAGE:
+            next_url = request.url.copy_set_param("page", str(page + 1))
+            headers["link"] = f'<{next_url}>; rel="next"'
+        return httpx.Response(200, json=listed[(page - 1) * self.PAGE:page * self.PAGE], headers=headers)
+
+    def analytics(self, max_pages=10):
+        service = GitHubService()
+        service._client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        history = HistoryStore(os.path.join(tempfile.mkdtemp(prefix="issues-"), "history.sqlite3"))
+        analytics = IssueAnalytics(service, history, RepoContextStore(service))
+        analytics.max_pages = max_pages
+        return analytics
+
+
+def _build(analytics):
+    return asyncio.run(analytics._build("acme", "widget"))
+
+
+def test_metrics_over_the_window():
+    github = GitHub()
+    day = 86400
+    github.issues = [
+        _issue(1, 10 * day, 9 * day),
+        _issue(2, 20 * day, 2 * day, closed_ago=2 * day),
+        _issue(3, 5 * day, 3 * day, pr=True, closed_ago=3 * day, merged_ago=3 * day),
+        _issue(4, 60 * day, 45 * day, pr=True),
+        _issue(5, 400 * day, 380 * day, closed_ago=380 * day),
+    ]
+    github.comments = [
+        # The author's own comment is not a response; the first reply from someone else is
+        {"issue_url": "https://api.github.com/repos/acme/widget/issues/1", "user": {"login": "alice"},
+         "created_at": _ts(10 * day - 60), "updated_at": _ts(10 * day - 60)},
+        {"issue_url": "https://api.github.com/repos/acme/widget/issues/1", "user": {"login": "bob"},
+         "created_at": _ts(10 * day - 7200), "updated_at": _ts(10 * day - 7200)},
+        {"issue_url": "https://api.github.com/repos/acme/widget/issues/2", "user": {"login": "ci", "type": "Bot"},
+         "created_at": _ts(20 * day - 60), "updated_at": _ts(20 * day - 60)},
+    ]
+    result = _build(github.analytics())
+    assert result["issues"]["opened"] == 2
+    assert result["issues"]["closed"] == 1
+    assert result["issues"]["open"] == 1
+    assert result["pull_requests"]["opened"] == 2
+    assert result["pull_requests"]["merged"] == 1
+    assert result["pull_requests"]["median_merge_hours"] == 48.0
+    assert result["pull_requests"]["stale"] == 1
+    assert result["responsiveness"]["median_first_response_hours"] == 2.0
+    assert result["sync"] == {"tracked_items": 5, "complete": True, "github_requests": 5}
+
+
+def test_backfill_resumes_a_few_pages_per_refresh():
+    github = GitHub()
+    github.issues = [_issue(number, 1000 - number, 1000 - number) for number in range(1, 8)]
+    analytics = github.analytics(max_pages=2)
+
+    first = _build(analytics)
+    assert first["sync"]["complete"] is False
+    assert first["sync"]["tracked_items"] == 4
+    second = _build(analytics)
+    assert second["sync"]["tracked_items"] == 7
+    assert second["sync"]["complete"] is True
+
+
+def test_falling_behind_after_a_complete_backfill_is_reported():
+    github = GitHub()
+    github.issues = [_issue(1, 1000, 1000)]
+    analytics = github.analytics(max_pages=2)
+    assert _build(analytics)["sync"]["complete"] is True
+
+    # A burst of updates larger than one refresh can read
+    github.issues += [_issue(number, 500 - number, 500 - number) for number in range(2, 10)]
+    behind = _build(analytics)
+    assert behind["sync"]["complete"] is False
+    assert analytics.history.get_cursor_sync("acme/widget", "issues")[1] is False
+    while not behind["sync"]["complete"]:
+        behind = _build(analytics)
+    assert behind["sync"]["tracked_items"] == 9
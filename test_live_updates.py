@@ -0,0 +1,107 @@
+"""Offline checks of live update polling: change detection, one poller per deployment and capacity.
+
+Run with: python -m pytest -q test_live_updates.py
+"""
+import asyncio
+import os
+import tempfile
+
+import httpx
+import pytest
+
+from services.github_service import GitHubService
+from services.live_updates import Channel, LiveCapacityError, LiveUpdates, diff
+from services.repo_context import RepoContextStore
+from services.shared_cache import SharedCache
+
+REPO_INFO = {"id": 1, "full_name": "acme/widget", "stargazers_count": 10, "forks_count": 1, "open_issues_count": 0}
+
+
+class GitHub:
+    """Mock GitHub that answers the repository with an ETag and counts every request"""
+
+    def __init__(self):
+        self.stars = 10
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.url.path)
+        etag = f'"{self.stars}"'
+        if request.url.path == "/repos/acme/widget":
+            if request.headers.get("if-none-match") == etag:
+                return httpx.Response(304)
+            return httpx.Response(200, json={**REPO_INFO, "stargazers_count": self.stars}, headers={"etag": etag})
+        # Commits and contributors never change in these tests
+        if request.headers.get("if-none-match") == '"static"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=[], headers={"etag": '"static"'})
+
+    def service(self) -> GitHubService:
+        service = GitHubService()
+        service._client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        return service
+
+
+def _channel(live: LiveUpdates) -> Channel:
+    channel = Channel("acme", "widget")
+    live._channels["acme/widget"] = channel
+    return channel
+
+
+def test_diff_keeps_only_changed_fields_and_weeks():
+    old = {"stars": 1, "forks": 2, "weekly_data": [{"week": "2024-01-07", "commits": 1},
+                                                  {"week": "2024-01-14", "commits": 2}]}
+    new = {"stars": 3, "forks": 2, "weekly_data": [{"week": "2024-01-07", "commits": 1},
+                                                  {"week": "2024-01-14", "commits": 5}]}
+    assert diff(old, new) == {"stars": 3, "weekly_data": [{"week": "2024-01-14", "commits": 5}]}
+
+
+def test_changed_stats_reuse_the_probe_body():
+    github = GitHub()
+    service = github.service()
+    live = LiveUpdates(service, RepoContextStore(service))
+    channel = _channel(live)
+
+    async def run():
+        await live.poll_once(channel)
+        github.requests.clear()
+        github.stars = 11
+        return await live.poll_once(channel)
+
+    assert asyncio.run(run()) == ["stats"]
+    # One conditional request per topic, and no second fetch of the repository
+    assert github.requests.count("/repos/acme/widget") == 1
+    assert live.contexts.peek("acme", "widget").repo_info["stargazers_count"] == 11
+
+
+def test_only_the_lease_holder_polls_github():
+    path = os.path.join(tempfile.mkdtemp(prefix="live-"), "cache.sqlite3")
+    github = GitHub()
+    workers = []
+    for _ in range(2):
+        service = github.service()
+        live = LiveUpdates(service, RepoContextStore(service, shared_cache=SharedCache(path)))
+        workers.append((live, _channel(live)))
+    (leader, leader_channel), (follower, follower_channel) = workers
+
+    async def run():
+        await leader.poll_once(leader_channel)
+        github.stars = 12
+        await leader.poll_once(leader_channel)
+        github.requests.clear()
+        return await follower.poll_once(follower_channel)
+
+    adopted = asyncio.run(run())
+    assert github.requests == []
+    assert "stats" in adopted
+    assert follower.contexts.peek("acme", "widget").repo_info["stargazers_count"] == 12
+
+
+def test_channel_cap_rejects_new_repositories():
+    service = GitHub().service()
+    live = LiveUpdates(service, RepoContextStore(service))
+    live.max_channels = 0
+
+    with pytest.raises(LiveCapacityError):
+        asyncio.run(live.subscribe(live.subscriber(), "acme", "widget"))
+    assert live.snapshot() == {"repositories": 0, "subscriptions": 0}
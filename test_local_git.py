@@ -0,0 +1,92 @@
+"""Offline checks of the LOCAL_REPOS_ROOT backend: a repository that exists only on disk, no network.
+
+Run with: python -m pytest -q test_local_git.py
+"""
+import os
+import subprocess
+import tempfile
+
+import httpx
+import pytest
+
+from config.settings import settings
+
+# Settings are read when the routers are imported, so point them at a scratch mirror first
+ROOT = tempfile.mkdtemp(prefix="local-repos-")
+settings.LOCAL_REPOS_ROOT = ROOT
+settings.HISTORY_DB_PATH = os.path.join(ROOT, "history.sqlite3")
+settings.GROQ_API_KEY = ""
+settings.SHARED_CACHE_PATH = ""
+
+from services import github_service  # noqa: E402
+
+# Every GitHub call is recorded and answered with a 404, as it would be for a repo that only exists locally
+github_calls = []
+
+
+def _github(request: httpx.Request) -> httpx.Response:
+    github_calls.append(str(request.url))
+    return httpx.Response(404, json={"message": "Not Found"})
+
+
+github_service.GitHubService._client = lambda self: httpx.AsyncClient(transport=httpx.MockTransport(_github))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from routers.github_routes import router  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+
+def _git(path, *args):
+    env = {**os.environ, "GIT_AUTHOR_NAME": "Dev", "GIT_AUTHOR_EMAIL": "dev@example.com",
+           "GIT_COMMITTER_NAME": "Dev", "GIT_COMMITTER_EMAIL": "dev@example.com"}
+    subprocess.run(["git", "-C", path, *args], check=True, capture_output=True, env=env)
+
+
+@pytest.fixture(scope="module")
+def client():
+    path = os.path.join(ROOT, "acme", "widget")
+    os.makedirs(path)
+    _git(path, "init", "-q")
+    with open(os.path.join(path, "README.md"), "w") as handle:
+        handle.write("# Widget\n\nA widget that only exists on disk.\n")
+    with open(os.path.join(path, "main.py"), "w") as handle:
+        handle.write("print('widget')\n")
+    with open(os.path.join(path, "requirements.txt"), "w") as handle:
+        handle.write("httpx>=0.28\n")
+    _git(path, "add", ".")
+    _git(path, "commit", "-q", "-m", "Initial commit")
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_analyze_local_only_repo(client):
+    response = client.post("/api/v1/analyze", json={"owner": "acme", "repo": "widget"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["languages"]["languages"] == {"Python": 100.0}
+    assert body["commit_activity"]["total_commits"] == 1
+    assert body["dependencies"]["dependencies"][0]["name"] == "httpx"
+
+
+def test_api_only_section_does_not_poison_repo(client):
+    client.post("/api/v1/analyze", json={"owner": "acme", "repo": "widget"})
+    response = client.get("/api/v1/repo/acme/widget/issues/analytics")
+    assert response.status_code == 501
+    # The repository is still there for every other endpoint
+    assert client.get("/api/v1/repo/acme/widget/stats").status_code == 200
+    assert client.get("/api/v1/repo/acme/widget/structure").status_code == 200
+    assert client.get("/api/v1/repo/acme/widget/contributors").status_code == 200
+
+
+def test_local_repo_never_calls_github(client):
+    github_calls.clear()
+    client.post("/api/v1/analyze", json={"owner": "acme", "repo": "widget"})
+    client.get("/api/v1/repo/acme/widget/issues/analytics")
+    client.get("/api/v1/repo/acme/widget/structure")
+    assert github_calls == []
+
+
+def test_unknown_repo_is_still_not_found(client):
+    assert client.get("/api/v1/repo/acme/missing/stats").status_code == 404
@@ -0,0 +1,64 @@
+"""Offline checks of the prefetch quota: budgets charge the GitHub requests a refresh actually made.
+
+Run with: python -m pytest -q test_prefetch.py
+"""
+import asyncio
+
+import httpx
+
+from services.github_service import GitHubService
+from services.prefetch import INITIAL_GITHUB_CALLS, AccessTracker, PrefetchScheduler, QuotaBudget
+from services.repo_context import RepoContextStore
+
+
+class Analyzer:
+    """Stands in for RepositoryAnalyzer: a refresh reads a few sections concurrently"""
+
+    def __init__(self, contexts, sections):
+        self.contexts = contexts
+        self.sections = sections
+
+    async def analyze(self, owner, repo, refresh=False):
+        await self.contexts.get_many(owner, repo, self.sections, force=True)
+
+
+def _scheduler(sections):
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        return httpx.Response(200, json={})
+
+    service = GitHubService()
+    service._client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    scheduler = PrefetchScheduler(Analyzer(RepoContextStore(service), sections), service, AccessTracker())
+    scheduler.github_budget = QuotaBudget(1000, 3600)
+    scheduler.groq_budget = QuotaBudget(1000, 60)
+    scheduler.access_tracker.hit("acme", "widget")
+    return scheduler, requests
+
+
+def test_budget_is_charged_the_metered_requests():
+    scheduler, requests = _scheduler(("repo_info", "languages"))
+    assert asyncio.run(scheduler.run_once()) == 1
+    assert len(requests) == 2
+    assert scheduler.github_budget.spent() == 2
+
+
+def test_estimate_follows_metered_refreshes():
+    scheduler, requests = _scheduler(("repo_info",))
+    # Refreshes are forced, so every cycle costs exactly one request
+    for _ in range(30):
+        asyncio.run(scheduler.run_once())
+    assert len(requests) == 30
+    assert INITIAL_GITHUB_CALLS > 1
+    assert round(scheduler.github_cost) == 1
+
+
+def test_quota_budget_records_corrections():
+    budget = QuotaBudget(10, 3600)
+    assert budget.try_spend(6)
+    budget.record(-4)
+    assert budget.spent() == 2
+    assert budget.try_spend(8)
+    assert not budget.try_spend(1)
@@ -0,0 +1,66 @@
+"""Offline checks of on-demand request profiling.
+
+Run with: python -m pytest -q test_profiling.py
+"""
+import asyncio
+import os
+import tempfile
+
+from config.settings import settings
+from services.profiling import ProfileStore, ProfilingMiddleware
+
+HEADERS = [(b"x-profile", b"1"), (b"x-admin-token", b"secret")]
+
+
+def _middleware(app):
+    settings.ADMIN_TOKEN = "secret"
+    store = ProfileStore(directory=tempfile.mkdtemp(prefix="profiles-"), max_artifacts=10)
+    return ProfilingMiddleware(app, store=store, sampling=False), store
+
+
+async def _request(middleware):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware({"type": "http", "method": "GET", "path": "/", "headers": HEADERS, "query_string": b""},
+                     None, send)
+    return messages[0]
+
+
+def test_concurrent_profile_is_rejected_with_409():
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware, store = _middleware(app)
+
+    async def run():
+        first = asyncio.create_task(_request(middleware))
+        await asyncio.sleep(0)
+        second = await _request(middleware)
+        release.set()
+        return await first, second
+
+    first, second = asyncio.run(run())
+    assert first["status"] == 200
+    assert (b"x-profile-scope", b"thread") in first["headers"]
+    assert second["status"] == 409
+    assert len(os.listdir(store.directory)) == 1
+
+
+def test_profiling_is_available_again_afterwards():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware, _ = _middleware(app)
+
+    async def run():
+        return [await _request(middleware), await _request(middleware)]
+
+    assert [start["status"] for start in asyncio.run(run())] == [200, 200]
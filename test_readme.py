@@ -0,0 +1,68 @@
+"""Offline checks of README fetches: raw media type, ETag revalidation and the JSON fallback.
+
+Run with: python -m pytest -q test_readme.py
+"""
+import asyncio
+import base64
+
+import httpx
+
+from services.github_service import GitHubService
+
+README = "# Widget\n"
+
+
+class GitHub:
+    """Mock GitHub README endpoint that can ignore the raw media type"""
+
+    def __init__(self, raw=True):
+        self.raw = raw
+        self.status = 200
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        accept = request.headers.get("accept", "")
+        self.requests.append((accept, request.headers.get("if-none-match")))
+        if self.status != 200:
+            return httpx.Response(self.status, json={"message": "Not Found"})
+        if self.raw and accept == "application/vnd.github.raw":
+            if request.headers.get("if-none-match") == '"raw"':
+                return httpx.Response(304)
+            return httpx.Response(200, text=README, headers={"etag": '"raw"', "content-type": "text/plain"})
+        content = base64.b64encode(README.encode()).decode()
+        return httpx.Response(200, json={"encoding": "base64", "content": content}, headers={"etag": '"json"'})
+
+    def service(self):
+        service = GitHubService()
+        service._client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        return service
+
+
+def _readme(service):
+    return asyncio.run(service.get_repo_readme("acme", "widget"))
+
+
+def test_raw_readme_is_revalidated_with_its_etag():
+    github = GitHub()
+    service = github.service()
+    assert _readme(service) == README
+    assert _readme(service) == README
+    assert github.requests == [("application/vnd.github.raw", None), ("application/vnd.github.raw", '"raw"')]
+
+
+def test_json_fallback_etag_is_not_sent_with_the_raw_request():
+    github = GitHub(raw=False)
+    service = github.service()
+    assert _readme(service) == README
+    assert _readme(service) == README
+    # Each fetch is a raw attempt answered with JSON, then the JSON request; no stray If-None-Match
+    assert [etag for _, etag in github.requests] == [None, None, None, None]
+    assert len(service._readme_cache) == 0
+
+
+def test_missing_readme():
+    github = GitHub()
+    github.status = 404
+    assert _readme(github.service()) == "README not available"
+    # A 404 is an answer, not a reason to try the JSON representation
+    assert len(github.requests) == 1
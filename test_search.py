@@ -0,0 +1,56 @@
+"""Offline checks of full-text search over stored analyses.
+
+Run with: python -m pytest -q test_search.py
+"""
+import os
+import tempfile
+
+from services.history_store import HistoryStore
+from services.search import build_query
+
+
+def test_terms_are_quoted_and_all_required():
+    assert build_query("fast  json") == '"fast" "json"'
+
+
+def test_trailing_star_matches_by_prefix():
+    assert build_query("pars* json") == '"pars"* "json"'
+
+
+def test_operators_and_punctuation_are_not_syntax():
+    assert build_query('NOT c++ "quoted" OR') == '"NOT" "c" "quoted" "OR"'
+    assert build_query("foo-bar") == '"foo bar"'
+
+
+def test_nothing_searchable_gives_none():
+    assert build_query("") is None
+    assert build_query("  -- ** ") is None
+
+
+def _history():
+    history = HistoryStore(os.path.join(tempfile.mkdtemp(prefix="search-"), "history.sqlite3"))
+    history.index_analysis_sync("acme/parser", {"name": "acme/parser", "description": "Streaming JSON parser",
+                                                "language": "Rust"})
+    history.index_analysis_sync("acme/web", {"name": "acme/web", "description": "Web framework (NOT a parser)",
+                                             "language": "Python"})
+    history.index_analysis_sync("other/parsing", {"name": "other/parsing", "description": "Parsing toolkit",
+                                                  "language": "Python"})
+    return history
+
+
+def _names(history, text, **filters):
+    return sorted(row[0] for row in history.search_sync(build_query(text), 10, **filters))
+
+
+def test_built_queries_run_against_the_index():
+    history = _history()
+    assert _names(history, "json parser") == ["acme/parser"]
+    assert _names(history, "pars*") == ["acme/parser", "acme/web", "other/parsing"]
+    # Unquoted, NOT would be an FTS5 operator and the query a syntax error
+    assert _names(history, "NOT parser") == ["acme/web"]
+
+
+def test_owner_and_language_filters():
+    history = _history()
+    assert _names(history, "pars*", owner="acme") == ["acme/parser", "acme/web"]
+    assert _names(history, "pars*", language="python") == ["acme/web", "other/parsing"]
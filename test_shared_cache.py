@@ -0,0 +1,112 @@
+"""Offline checks of the cross-process cache tier and the prefetch ranking shared through it.
+
+Run with: python -m pytest -q test_shared_cache.py
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+from services.github_service import GitHubService
+from services.prefetch import AccessTracker
+from services.repo_context import RepoContextStore
+from services.shared_cache import SharedCache
+
+
+def _cache():
+    return SharedCache(os.path.join(tempfile.mkdtemp(prefix="shared-cache-"), "cache.sqlite3"))
+
+
+def test_prefix_scan_returns_only_live_matching_entries():
+    cache = _cache()
+    cache.set_sync("prefetch:scores:a", [["acme/one", 2.0]], 60)
+    cache.set_sync("prefetch:scores:b", [["acme/two", 1.0]], 60)
+    cache.set_sync("prefetch:scoret", "neighbour", 60)
+    cache.set_sync("prefetch:scores:old", [["acme/old", 9.0]], -1)
+    assert sorted(cache.get_prefix_sync("prefetch:scores:")) == [[["acme/one", 2.0]], [["acme/two", 1.0]]]
+
+
+def test_rankings_from_several_workers_are_summed():
+    merged = AccessTracker.merge(2, [("acme/one", 2.0), ("acme/two", 1.0)], [["acme/two", 3.0], ["acme/three", 0.5]])
+    assert merged == [("acme/two", 4.0), ("acme/one", 2.0)]
+
+
+def test_shared_entry_keeps_its_age_in_the_local_tier():
+    cache = _cache()
+    contexts = RepoContextStore(GitHubService(), ttl=60, shared_cache=cache)
+    fetches = []
+
+    async def fetch(owner, repo):
+        fetches.append(repo)
+        return {"name": repo}
+
+    contexts.fetchers["languages"] = fetch
+    # Published by another worker 50 seconds ago
+    cache.set_sync("acme/widget:languages", {"name": "widget"}, 60)
+    cache._connect().execute("UPDATE entries SET stored_at = ?", (time.time() - 50,))
+
+    value = asyncio.run(contexts.get("acme", "widget", "languages"))
+    assert value == {"name": "widget"}
+    assert fetches == []
+    context = contexts.peek("acme", "widget")
+    assert 49 <= context.age("languages") <= 55
+
+
+def test_shared_entry_is_served_locally_until_either_ttl_runs_out():
+    cache = _cache()
+    contexts = RepoContextStore(GitHubService(), ttl=60, shared_cache=cache)
+    cache.set_sync("acme/widget:languages", {"Python": 1}, 60)
+    cache.set_sync("acme/nearly:languages", {"Python": 2}, 60)
+    cache._connect().execute("UPDATE entries SET stored_at = ? WHERE key = ?", (time.time() - 50, "acme/widget:languages"))
+    cache._connect().execute("UPDATE entries SET stored_at = ? WHERE key = ?", (time.time() - 59.9, "acme/nearly:languages"))
+
+    asyncio.run(contexts.get("acme", "widget", "languages"))
+    asyncio.run(contexts.get("acme", "nearly", "languages"))
+    time.sleep(0.2)
+    # Fifty seconds old but only just loaded: the short in-process TTL still applies
+    assert contexts.is_fresh(contexts.peek("acme", "widget"), "languages")
+    # Its shared lifetime ran out, however recently this process loaded it
+    assert not contexts.is_fresh(contexts.peek("acme", "nearly"), "languages")
+
+
+def _contributors_service(statuses):
+    def handler(request):
+        status = statuses.pop(0)
+        return httpx.Response(status, json=[{"login": "dev", "contributions": 9}] if status == 200 else None)
+
+    service = GitHubService()
+    service._client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service
+
+
+def test_failed_contributors_read_is_marked_degraded_and_never_published():
+    cache = _cache()
+    contexts = RepoContextStore(_contributors_service([502, 200]), ttl=60, shared_cache=cache)
+
+    degraded = asyncio.run(contexts.get("acme", "widget", "contributors"))
+    assert degraded["degraded"] is True
+    assert cache.get_sync("acme/widget:contributors") is None
+    # Not fresh, so the next read asks GitHub again
+    assert asyncio.run(contexts.get("acme", "widget", "contributors"))["total_contributors"] == 1
+
+
+def test_failed_refresh_keeps_the_previous_contributors():
+    contexts = RepoContextStore(_contributors_service([200, 503]), ttl=60)
+    first = asyncio.run(contexts.get("acme", "widget", "contributors"))
+    assert asyncio.run(contexts.get("acme", "widget", "contributors", force=True)) == first
+
+
+def test_repository_without_contributors_is_not_degraded():
+    contexts = RepoContextStore(_contributors_service([204]), ttl=60)
+    assert "degraded" not in asyncio.run(contexts.get("acme", "widget", "contributors"))
+
+
+def test_cached_lookup_respects_max_age_in_the_shared_tier():
+    cache = _cache()
+    contexts = RepoContextStore(GitHubService(), ttl=3600, shared_cache=cache)
+    cache.set_sync("acme/widget:analysis", {"owner": "acme"}, 3600)
+    cache._connect().execute("UPDATE entries SET stored_at = ?", (time.time() - 600,))
+    assert asyncio.run(contexts.cached("acme", "widget", "analysis", max_age=900)) == {"owner": "acme"}
+    assert asyncio.run(contexts.cached("acme", "widget", "analysis", max_age=300)) is None
@@ -0,0 +1,68 @@
+"""Offline checks of span nesting across async generators and of remote sampling decisions.
+
+Run with: python -m pytest -q test_tracing.py
+"""
+import asyncio
+
+from services.tracing import Tracer, current_span
+
+
+class Sink:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+def _tracer(**options):
+    return Tracer(Sink(), **options)
+
+
+def test_inactive_span_around_yields_does_not_adopt_the_consumers_spans():
+    tracer = _tracer()
+
+    async def tokens():
+        with tracer.span("llm", activate=False):
+            for token in ("a", "b", "c"):
+                yield token
+
+    async def consume():
+        with tracer.span("request") as request:
+            parents = []
+            stream = tokens()
+            async for _ in stream:
+                with tracer.span("render") as render:
+                    parents.append(render.parent_id)
+                # Stop after the first token, as a disconnected client does
+                break
+            await stream.aclose()
+            return request, parents, current_span()
+
+    request, parents, after = asyncio.run(consume())
+    assert parents == [request.span_id]
+    assert after is request
+    tracer.flush()
+    llm = next(span for span in tracer.sink.spans if span.name == "llm")
+    assert llm.parent_id == request.span_id
+    assert llm.status == "ok"
+
+
+def test_remote_sampled_flag_cannot_force_sampling():
+    tracer = _tracer(sample_ratio=0.0)
+    with tracer.span("GET /", remote=("1" * 32, "2" * 16, True)) as span:
+        assert span.trace_id == "1" * 32
+        assert span.parent_id == "2" * 16
+        assert not span.sampled
+
+
+def test_trusted_remote_sampling_is_honoured():
+    tracer = _tracer(sample_ratio=0.0, trust_remote_sampling=True)
+    with tracer.span("GET /", remote=("1" * 32, "2" * 16, True)) as span:
+        assert span.sampled
+
+
+def test_remote_veto_is_kept():
+    tracer = _tracer(sample_ratio=1.0)
+    with tracer.span("GET /", remote=("1" * 32, "2" * 16, False)) as span:
+        assert not span.sampled
@@ -0,0 +1,103 @@
+"""Offline checks of the compact git tree, its structure metrics and the head SHA shared by tree sections.
+
+Run with: python -m pytest -q test_tree_analyzer.py
+"""
+import asyncio
+
+import httpx
+
+from services.dependency_analyzer import DependencyAnalyzer, find_manifests
+from services.github_service import GitHubService
+from services.repo_context import RepoContextStore
+from services.tree_analyzer import TEST_FILE, CompactTree, TreeAnalyzer, summarize
+
+SHA = "ab" * 20
+
+
+def _tree(files):
+    tree = CompactTree("c0ffee")
+    for index, (path, size) in enumerate(files):
+        tree.add(path, size, f"{index:040x}")
+    return tree.freeze()
+
+
+def test_compact_tree_round_trips_paths_and_shas():
+    tree = _tree([("README.md", 10), ("src/app/main.py", 200), ("src/app/ü.py", 5)])
+    assert len(tree) == 3
+    assert [tree.path(index) for index in range(3)] == ["README.md", "src/app/main.py", "src/app/ü.py"]
+    assert list(tree.names()) == ["README.md", "main.py", "ü.py"]
+    assert tree.blob_sha(1) == f"{1:040x}"
+    # Parents precede children, so ancestors can be rolled up in one backwards pass
+    assert tree.dirs == ["", "src", "src/app"]
+    assert list(tree.dir_parent) == [-1, 0, 1]
+
+
+def test_summary_rolls_sizes_up_to_top_level_directories():
+    summary = summarize(_tree([
+        ("README.md", 100), ("src/a.py", 300), ("src/deep/b.py", 500), ("docs/guide.md", 100),
+    ]))
+    assert summary["files"] == 4
+    assert summary["directories"] == 3
+    assert summary["total_bytes"] == 1000
+    assert summary["max_depth"] == 3
+    assert summary["top_directories"][0] == {"path": "src", "files": 2, "bytes": 800, "share": 80.0}
+    assert summary["largest_files"][0] == {"path": "src/deep/b.py", "bytes": 500}
+    assert {"extension": ".py", "files": 2, "bytes": 800} in summary["extensions"]
+
+
+def test_test_files_are_found_by_name_and_by_directory():
+    for name in ("test_app.py", "app_test.go", "app.test.ts", "app.spec.js", "AppTest.java", "AppTests.cs"):
+        assert TEST_FILE.match(name), name
+    for name in ("app.py", "contest.py", "testing.md"):
+        assert not TEST_FILE.match(name), name
+
+    summary = summarize(_tree([
+        ("src/app.py", 1), ("src/test_app.py", 1), ("tests/helpers.py", 1), ("pkg/__tests__/unit/x.js", 1),
+        ("docs/test_plan.md", 1),
+    ]))
+    # Markdown is not source code, wherever it lives
+    assert summary["tests"] == {"test_files": 3, "source_files": 1, "test_to_source_ratio": 3.0}
+
+
+def test_empty_tree_summary():
+    summary = summarize(CompactTree("").freeze())
+    assert summary["files"] == 0
+    assert summary["max_depth"] == 0
+    assert summary["tests"]["test_to_source_ratio"] is None
+
+
+def test_vendored_manifests_are_skipped_and_shallowest_come_first():
+    tree = _tree([
+        ("web/package.json", 10), ("package.json", 10), ("node_modules/left-pad/package.json", 10),
+        ("go/vendor/x/go.mod", 10), ("third_party/lib/Cargo.toml", 10), ("dist/package.json", 10),
+        ("big/requirements.txt", 10_000),
+    ])
+    indexes, truncated = find_manifests(tree, limit=10, max_bytes=1000)
+    assert [tree.path(index) for index in indexes] == ["package.json", "web/package.json"]
+    assert not truncated
+    assert find_manifests(tree, limit=1, max_bytes=1000)[1]
+
+
+def test_structure_and_dependencies_share_one_head_lookup():
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path.endswith("/commits/HEAD"):
+            return httpx.Response(200, text=SHA)
+        if "/git/trees/" in request.url.path:
+            return httpx.Response(200, json={"sha": SHA, "tree": [
+                {"path": "requirements.txt", "type": "blob", "size": 12, "sha": "01" * 20},
+            ]})
+        return httpx.Response(200, content=b"httpx>=0.28\n")
+
+    service = GitHubService()
+    service._client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    contexts = RepoContextStore(service)
+    DependencyAnalyzer(service, None, TreeAnalyzer(service, None, contexts), contexts)
+
+    sections = asyncio.run(contexts.get_many("acme", "widget", ("structure", "dependencies")))
+    assert sections["structure"]["sha"] == SHA
+    assert sections["dependencies"]["total"] == 1
+    assert requests.count("/repos/acme/widget/commits/HEAD") == 1
+    assert sum("/git/trees/" in path for path in requests) == 1
@@ -0,0 +1,130 @@
+"""Offline checks of how webhook events patch or invalidate cached repository sections.
+
+Run with: python -m pytest -q test_webhooks.py
+"""
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+from services.github_service import GitHubService
+from services.repo_context import RepoContextStore
+from services.webhooks import WebhookProcessor, _week_label
+
+
+def _weeks(count, commits=1):
+    first = date(2020, 1, 5)
+    return [{"week": (first + timedelta(weeks=index)).isoformat(), "commits": commits} for index in range(count)]
+
+
+def _push(commits, distinct=True, branch="main"):
+    return {
+        "ref": f"refs/heads/{branch}",
+        "repository": {"full_name": "acme/widget", "default_branch": "main"},
+        "commits": [{"id": str(index), "distinct": distinct} for index in range(commits)],
+    }
+
+
+def test_add_commits_keeps_the_full_series():
+    activity = {"total_commits": 156, "last_30_days": 4, "weekly_data": _weeks(156)}
+    patched = WebhookProcessor._add_commits(activity, 3)
+    assert len(patched["weekly_data"]) == 156
+    assert patched["weekly_data"][-1] == {"week": _week_label(datetime.now(timezone.utc)), "commits": 3}
+    assert patched["weekly_data"][0] == activity["weekly_data"][1]
+    assert patched["total_commits"] == 159
+    assert patched["last_30_days"] == 7
+
+
+def test_add_commits_to_the_current_week():
+    week = _week_label(datetime.now(timezone.utc))
+    activity = {"total_commits": 5, "last_30_days": 5, "weekly_data": [{"week": week, "commits": 5}]}
+    patched = WebhookProcessor._add_commits(activity, 2)
+    assert patched["weekly_data"] == [{"week": week, "commits": 7}]
+    # The cached value is not mutated
+    assert activity["weekly_data"] == [{"week": week, "commits": 5}]
+
+
+def test_push_counts_commits_seen_on_other_branches():
+    contexts = RepoContextStore(GitHubService())
+    processor = WebhookProcessor(contexts)
+    context = contexts.context("acme", "widget")
+    contexts.update(context, "commit_activity", {"total_commits": 0, "last_30_days": 0, "weekly_data": []})
+
+    result = asyncio.run(processor.handle("push", _push(2, distinct=False)))
+    assert "commit_activity" in result["updated"]
+    assert context.commit_activity["total_commits"] == 2
+
+
+def test_push_to_another_branch_leaves_every_section_alone():
+    contexts = RepoContextStore(GitHubService())
+    processor = WebhookProcessor(contexts)
+    context = contexts.context("acme", "widget")
+    activity = {"total_commits": 5, "last_30_days": 5, "weekly_data": []}
+    contexts.update(context, "commit_activity", activity)
+    contexts.update(context, "head", "a1")
+
+    result = asyncio.run(processor.handle("push", _push(2, branch="feature")))
+    assert result["updated"] == [] and result["invalidated"] == []
+    assert context.commit_activity is activity
+    assert context.is_fresh("head", 3600)
+
+
+def test_push_invalidates_the_head_with_the_tree_sections():
+    contexts = RepoContextStore(GitHubService())
+    processor = WebhookProcessor(contexts)
+    context = contexts.context("acme", "widget")
+    contexts.update(context, "head", "a1")
+
+    result = asyncio.run(processor.handle("push", _push(1)))
+    assert {"structure", "dependencies", "head"} <= set(result["invalidated"])
+    assert not context.is_fresh("head", 3600)
+
+
+def test_push_with_commit_history_refetches_from_the_cursor():
+    contexts = RepoContextStore(GitHubService())
+    refreshed = {"total_commits": 42, "last_30_days": 2, "weekly_data": _weeks(156)}
+    fetches = []
+
+    async def fetch(owner, repo):
+        fetches.append((owner, repo))
+        return refreshed
+
+    contexts.fetchers["commit_activity"] = fetch
+    processor = WebhookProcessor(contexts, incremental_commits=True)
+    context = contexts.context("acme", "widget")
+    stale = {"total_commits": 40, "last_30_days": 0, "weekly_data": _weeks(156)}
+    contexts.update(context, "commit_activity", stale)
+    contexts.update(context, "analysis", {"stats": {}, "commit_activity": stale})
+
+    async def run():
+        result = await processor.handle("push", _push(2))
+        await asyncio.gather(*processor._pending)
+        return result
+
+    result = asyncio.run(run())
+    assert "commit_activity" in result["invalidated"]
+    assert fetches == [("acme", "widget")]
+    assert context.analysis["commit_activity"] == refreshed
+
+
+def test_member_event_refreshes_the_analysis_contributors():
+    contexts = RepoContextStore(GitHubService())
+    current = {"total_contributors": 2, "active_contributors": 2, "top_contributors": [
+        {"username": "dev", "commits": 3, "avatar_url": ""}, {"username": "new", "commits": 1, "avatar_url": ""}
+    ]}
+
+    async def fetch(owner, repo):
+        return current
+
+    contexts.fetchers["contributors"] = fetch
+    processor = WebhookProcessor(contexts)
+    context = contexts.context("acme", "widget")
+    old = {"total_contributors": 1, "active_contributors": 1, "top_contributors": current["top_contributors"][:1]}
+    contexts.update(context, "contributors", old)
+    contexts.update(context, "analysis", {"stats": {}, "contributors": old})
+
+    async def run():
+        result = await processor.handle("member", {"repository": {"full_name": "acme/widget"}})
+        await asyncio.gather(*processor._pending)
+        return result
+
+    assert "contributors" in asyncio.run(run())["invalidated"]
+    assert context.analysis["contributors"] == current
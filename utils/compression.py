@@ -0,0 +1,159 @@
+import gzip
+from typing import List, Optional, Tuple
+
+from config.settings import settings
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is always available
+    brotli = None
+
+# Content types worth compressing; images and archives are already compressed
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Streaming responses are passed through so they keep their constant-memory behaviour
+STREAMING_TYPES = ("text/event-stream",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported content-coding from an Accept-Encoding header"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = None
+    for encoding in candidates:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip compression for buffered responses above a size threshold"""
+
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = minimum_size or settings.COMPRESSION_MIN_SIZE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope.get("headers") or [])
+        encoding = negotiate_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if_none_match = request_headers.get(b"if-none-match", b"")
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                # Caches must key on Accept-Encoding even for the responses we leave uncompressed
+                start_message = self._prepare_start(message, encoding, if_none_match)
+                if encoding is None:
+                    passthrough = True
+                    await send(start_message)
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._should_compress(start_message, body):
+                # Streamed or ineligible: forward untouched
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            await send(self._rewrite_start(start_message, encoding, len(compressed)))
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _should_compress(self, start_message, body: bytes) -> bool:
+        if start_message["status"] < 200 or start_message["status"] in (204, 304):
+            return False
+        if len(body) < self.minimum_size:
+            return False
+        headers = dict(start_message.get("headers") or [])
+        if b"content-encoding" in headers:
+            return False
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        if content_type.startswith(STREAMING_TYPES):
+            return False
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _prepare_start(start_message, encoding: Optional[str], if_none_match: bytes):
+        """Add Vary to compressible responses and give 304s the ETag of the representation being revalidated"""
+        headers = dict(start_message.get("headers") or [])
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        not_modified = start_message["status"] == 304
+        if not not_modified and (not content_type.startswith(COMPRESSIBLE_TYPES)
+                                 or content_type.startswith(STREAMING_TYPES)):
+            return start_message
+
+        held = {tag.strip() for tag in if_none_match.split(b",")}
+        rewritten: List[Tuple[bytes, bytes]] = []
+        has_vary = False
+        for name, value in start_message.get("headers") or []:
+            if name == b"etag" and not_modified and encoding is not None:
+                encoded = _encoded_etag(value, encoding)
+                # A 200 with this encoding carried the suffixed tag; the 304 must repeat it to match
+                if encoded in held or b"W/" + encoded in held:
+                    value = encoded
+            elif name == b"vary":
+                has_vary = True
+                if b"accept-encoding" not in value.lower() and value.strip() != b"*":
+                    value = value + b", Accept-Encoding"
+            rewritten.append((name, value))
+        if not has_vary:
+            rewritten.append((b"vary", b"Accept-Encoding"))
+        return {**start_message, "headers": rewritten}
+
+    @staticmethod
+    def _rewrite_start(start_message, encoding: str, length: int):
+        headers: List[Tuple[bytes, bytes]] = []
+        for name, value in start_message.get("headers") or []:
+            if name == b"content-length":
+                continue
+            if name == b"etag":
+                # Keep the validator strong but distinct per representation
+                value = _encoded_etag(value, encoding)
+            headers.append((name, value))
+        headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"content-length", str(length).encode()))
+        return {**start_message, "headers": headers}
+
+
+def _encoded_etag(etag: bytes, encoding: str) -> bytes:
+    if not etag.endswith(b'"'):
+        return etag
+    return etag[:-1] + b"-" + encoding.encode() + b'"'
@@ -0,0 +1,67 @@
+import hashlib
+from typing import Any, Dict
+
+from fastapi import Request, Response
+
+from utils.serialization import dumps
+
+# Freshness per endpoint, tuned to how quickly the underlying GitHub data changes
+CACHE_POLICIES: Dict[str, Dict[str, int]] = {
+    # Star/fork/issue counters move constantly on popular repos
+    "stats": {"max_age": 60, "stale_while_revalidate": 300},
+    # GitHub recomputes contributor and commit statistics lazily
+    "contributors": {"max_age": 3600, "stale_while_revalidate": 86400},
+    "commit_activity": {"max_age": 900, "stale_while_revalidate": 3600},
+    "issue_analytics": {"max_age": 600, "stale_while_revalidate": 3600},
+    # Only changes when the default branch moves
+    "structure": {"max_age": 900, "stale_while_revalidate": 86400},
+}
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag derived from the exact response bytes"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison as required for If-None-Match (RFC 9110 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = _opaque_tag(etag)
+    for candidate in if_none_match.split(","):
+        if _opaque_tag(candidate.strip()) == opaque:
+            return True
+    return False
+
+
+def _opaque_tag(etag: str) -> str:
+    """Strip the weak prefix and the per-encoding suffix added by CompressionMiddleware"""
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for suffix in ('-br"', '-gzip"'):
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def cache_control(policy: str) -> str:
+    settings = CACHE_POLICIES[policy]
+    return f"public, max-age={settings['max_age']}, stale-while-revalidate={settings['stale_while_revalidate']}"
+
+
+def cached_json_response(request: Request, payload: Any, policy: str) -> Response:
+    """Serialize payload once, attach validators and answer conditional requests with 304"""
+    body = dumps(payload)
+    etag = compute_etag(body)
+    headers = {
+        "ETag": etag,
+        # A zero-filled stand-in for a failed GitHub read must not outlive the outage in browsers or CDNs
+        "Cache-Control": "no-store" if isinstance(payload, dict) and payload.get("degraded") else cache_control(policy),
+    }
+
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)